@@ -10,14 +10,15 @@ from app.config import DevelopmentConfig
 # 1. IMPORTAÇÃO CENTRALIZADA (SINGLETON)
 # Agora importamos o proxmox_client daqui, junto com as outras extensões
 from app.extensions import db, migrate, cors, login_manager, jwt, bcrypt, proxmox_client
+from app.db_routing import init_replicas
 
 from proxmoxer import ResourceException, AuthenticationError
 # Ajuste o import abaixo conforme onde definiu sua classe de exceção
 # Se estiver no client.py, mantenha. Se moveu, ajuste.
 from app.proxmox.client import ProxmoxTaskFailedError 
-import logging
 
 from app.api.main import main_bp
+from app.logging_setup import configure_logging
 
 def create_app(config_class=DevelopmentConfig):
     """Factory do aplicativo Flask"""
@@ -25,8 +26,15 @@ def create_app(config_class=DevelopmentConfig):
     app.config.from_object(config_class)
 
     # REGISTRO DE COMANDOS
-    from app.commands import init_db_command
+    from app.commands import (
+        init_db_command, collect_usage_command, sync_ldap_groups_command, preprovision_command,
+        seed_scale_command
+    )
     app.cli.add_command(init_db_command)
+    app.cli.add_command(collect_usage_command)
+    app.cli.add_command(sync_ldap_groups_command)
+    app.cli.add_command(preprovision_command)
+    app.cli.add_command(seed_scale_command)
 
     # Configuração do Swagger
     swagger_config = {
@@ -52,6 +60,18 @@ def create_app(config_class=DevelopmentConfig):
     
     # 3. CONFIGURAR LOGGING
     configure_logging(app)
+
+    # Tracing por requisição (só registra hooks com TRACING_ENABLED)
+    from app.tracing import init_tracing
+    init_tracing(app)
+
+    # Profiler sob demanda (header de admin ou amostragem ligada em runtime)
+    from app.profiling import init_profiling
+    init_profiling(app)
+
+    # Cronômetro por fase do deploy (chamadas ao PVE e duração; GET /api/admin/deploy-metrics)
+    from app.deploy_timing import init_deploy_timing
+    init_deploy_timing(app)
     
     # 4. REGISTRAR ROTAS
     register_blueprints(app)
@@ -71,28 +91,29 @@ def create_app(config_class=DevelopmentConfig):
 def init_extensions(app):
     """Inicializa todas as extensões do Flask."""
     db.init_app(app)
+    init_replicas(app)
     migrate.init_app(app, db)
     
     # Configuração de CORS (Mantida a sua correção anterior)
     cors.init_app(app, resources={r"/*": {
         "origins": ["http://localhost:5173", "http://127.0.0.1:5173"],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "expose_headers": ["Content-Range", "X-Total-Count"]
+        "allow_headers": ["Content-Type", "Authorization", "X-DB-Write-Mark"],
+        "expose_headers": ["Content-Range", "X-Total-Count", "X-Next-Cursor", "X-DB-Write-Mark"]
     }}, supports_credentials=True)
     
     login_manager.init_app(app)
     jwt.init_app(app)
     bcrypt.init_app(app)
 
+    # Tokens de usuários removidos são recusados (consulta servida pelo cache de identidade)
+    from app.services.identity import is_token_revoked
+    jwt.token_in_blocklist_loader(is_token_revoked)
+
     # --- INICIALIZAÇÃO DO SINGLETON PROXMOX ---
     # O objeto já existe (criado em extensions.py), aqui apenas injetamos a config do app.
     proxmox_client.init_app(app)
 
-def configure_logging(app):
-    if not app.debug:
-        logging.basicConfig(level=logging.INFO)
-
 def register_blueprints(app):
     """Registra os módulos de rotas (Blueprints)."""
     prefix = app.config.get('API_PREFIX', '/api')
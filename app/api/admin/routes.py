@@ -1,22 +1,28 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
 from flask_cors import cross_origin
 # Adicionado UserGroup aos imports
 from app.models import User, VirtualResource, ServiceTemplate, UserGroup
 from app.extensions import db
+from app.db_routing import read_replica
 from app.proxmox import proxmox_client
-import math
+from app.api.pagination import (
+    parse_page_args, parse_fields, parse_bool_arg, parse_int_arg, keyset_paginate,
+    project, paginated_response
+)
+from app.services.usage import RESOLUTIONS, get_cluster_usage
+from app.services.identity import current_identity, invalidate_policy
+from app.services.preprovision import get_preprovision_jobs
+from app.services.health import get_system_health
+from app.services.template_scan import scan_template_candidates
+from sqlalchemy import func, insert, update
 
 # Define o prefixo da URL como /api/admin
 bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
 def check_admin_permission():
-    """Helper para verificar permissão de admin."""
-    current_user_id = int(get_jwt_identity())
-    admin = User.query.get(current_user_id)
-    if not admin or not getattr(admin, 'is_admin', False):
-        return False
-    return True
+    """Helper para verificar permissão de admin (claims do token, sem query)."""
+    return current_identity().is_admin
 
 def get_current_usage(user_id):
     """Calcula o consumo atual de recursos do usuário (Interno)."""
@@ -28,6 +34,33 @@ def get_current_usage(user_id):
         'count': len(resources)
     }
 
+def get_usage_for_users(user_ids):
+    """
+    Consumo agregado de vários usuários numa única query (GROUP BY owner_id).
+    Usado pelas listagens para evitar uma query por usuário.
+    """
+    usage = {uid: {'cpu': 0, 'memory': 0, 'storage': 0, 'count': 0} for uid in user_ids}
+    if not user_ids:
+        return usage
+
+    rows = db.session.query(
+        VirtualResource.owner_id,
+        func.coalesce(func.sum(VirtualResource.cpu_cores), 0),
+        func.coalesce(func.sum(VirtualResource.memory_mb), 0),
+        func.coalesce(func.sum(VirtualResource.storage_gb), 0),
+        func.count(VirtualResource.id)
+    ).filter(VirtualResource.owner_id.in_(user_ids)).group_by(VirtualResource.owner_id).all()
+
+    for owner_id, cpu, memory, storage, count in rows:
+        usage[owner_id] = {'cpu': int(cpu), 'memory': int(memory), 'storage': int(storage), 'count': count}
+    return usage
+
+USER_LIST_FIELDS = ('id', 'username', 'email', 'is_admin', 'group_id', 'group_name', 'usage', 'limits')
+TEMPLATE_LIST_FIELDS = (
+    'id', 'name', 'type', 'proxmox_template_volid', 'category', 'deploy_mode',
+    'is_active', 'default_cpu', 'default_memory', 'default_storage'
+)
+
 # ==========================================
 #  GESTÃO DE USUÁRIOS
 # ==========================================
@@ -35,14 +68,39 @@ def get_current_usage(user_id):
 @bp.route('/users', methods=['GET', 'OPTIONS'])
 @cross_origin()
 @jwt_required()
+@read_replica
 def list_users():
     """
-    Lista todos os usuários e seus consumos de recursos.
+    Lista os usuários e seus consumos de recursos (paginado por cursor).
     ---
     tags:
       - Admin Users
     security:
       - Bearer: []
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        description: Itens por página (sem ele, a lista inteira; máximo API_MAX_PAGE_SIZE)
+      - name: cursor
+        in: query
+        type: integer
+        description: Valor do cabeçalho X-Next-Cursor da página anterior
+      - name: group
+        in: query
+        type: string
+        description: "ID do grupo, ou 'none' para usuários sem grupo"
+      - name: is_admin
+        in: query
+        type: boolean
+      - name: q
+        in: query
+        type: string
+        description: Prefixo do username
+      - name: fields
+        in: query
+        type: string
+        description: "Projeção (ex: id,username,usage)"
     responses:
       200:
         description: Lista de usuários recuperada com sucesso.
@@ -77,28 +135,58 @@ def list_users():
     """
     if not check_admin_permission(): return jsonify({"error": "Acesso negado."}), 403
 
-    users = User.query.all()
-    output = []
+    limit, cursor = parse_page_args()
+    fields = parse_fields(USER_LIST_FIELDS)
+
+    query = User.query
+    group = request.args.get('group')
+    if group:
+        if group.lower() == 'none':
+            query = query.filter(User.group_id.is_(None))
+        elif group.isdigit():
+            query = query.filter(User.group_id == int(group))
+        else:
+            return jsonify({"error": "Parâmetro 'group' deve ser um ID ou 'none'."}), 400
+
+    is_admin = parse_bool_arg('is_admin')
+    if is_admin is not None:
+        query = query.filter(User.is_admin.is_(is_admin))
+
+    prefix = request.args.get('q')
+    if prefix:
+        query = query.filter(User.username.startswith(prefix, autoescape=True))
 
+    users, next_cursor = keyset_paginate(query, User.id, limit, cursor)
+
+    # Campos caros (consumo e cota) só são calculados se pedidos na projeção
+    want_usage = fields is None or 'usage' in fields
+    want_limits = fields is None or 'limits' in fields
+    usage_map = get_usage_for_users([u.id for u in users]) if want_usage else {}
+    # Limites sem varrer os recursos de cada usuário; a cota padrão é lida uma vez
+    default_limits = User.default_quota_limits() if want_limits and any(u.group is None for u in users) else None
+
+    output = []
     for u in users:
-        usage = get_current_usage(u.id)
-        limits = u.quota.get('limit', {}) if u.quota else {}
-        
-        output.append({
+        item = {
             'id': u.id,
             'username': u.username,
             'email': u.email,
             'is_admin': u.is_admin,
+            'group_id': u.group_id,
             'group_name': u.group.name if u.group else 'Padrão (Sem Grupo)',
-            'usage': usage,
-            'limits': {
-                'cpu': limits.get('cpu', 0),
-                'memory': limits.get('memory', 0),
-                'storage': limits.get('storage', 0)
+        }
+        if want_usage:
+            item['usage'] = usage_map.get(u.id)
+        if want_limits:
+            limits = u.quota_limits(default_limits)
+            item['limits'] = {
+                'cpu': limits['cpu'] or 0,
+                'memory': limits['memory'] or 0,
+                'storage': limits['storage'] or 0
             }
-        })
+        output.append(project(item, fields))
 
-    return jsonify(output)
+    return paginated_response(output, next_cursor)
 
 @bp.route('/users/<int:user_id>/quota', methods=['PUT', 'OPTIONS'])
 @cross_origin()
@@ -165,6 +253,7 @@ def update_user_quota(user_id):
 @bp.route('/groups', methods=['GET', 'OPTIONS'])
 @cross_origin()
 @jwt_required()
+@read_replica
 def list_groups():
     """
     Lista todos os grupos de usuários.
@@ -330,6 +419,7 @@ def update_group(id):
     data = request.get_json()
 
     try:
+        renamed = 'name' in data and data['name'] != group.name
         if 'name' in data: group.name = data['name']
         if 'description' in data: group.description = data['description']
         if 'ldap_filter' in data: group.ldap_filter = data['ldap_filter']
@@ -345,7 +435,17 @@ def update_group(id):
         if 'max_memory' in data: group.max_memory = int(data['max_memory'])
         if 'max_storage' in data: group.max_storage = int(data['max_storage'])
 
+        if renamed:
+            # O nome decide se o grupo é administrativo (claim 'gadm' dos tokens dos membros)
+            db.session.execute(
+                update(User).where(User.group_id == group.id)
+                .values(policy_version=User.policy_version + 1)
+                .execution_options(synchronize_session=False)
+            )
+
         db.session.commit()
+        if renamed:
+            invalidate_policy()
         return jsonify({"msg": "Grupo atualizado com sucesso"}), 200
 
     except Exception as e:
@@ -397,6 +497,7 @@ def delete_group(id):
 @bp.route('/templates', methods=['GET', 'OPTIONS'])
 @cross_origin()
 @jwt_required()
+@read_replica
 def list_templates():
     """
     Lista todos os templates cadastrados no sistema.
@@ -405,9 +506,32 @@ def list_templates():
       - Admin Templates
     security:
       - Bearer: []
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+      - name: cursor
+        in: query
+        type: integer
+      - name: type
+        in: query
+        type: string
+        enum: ['lxc', 'qemu']
+      - name: is_active
+        in: query
+        type: boolean
+      - name: deploy_mode
+        in: query
+        type: string
+      - name: category
+        in: query
+        type: string
+      - name: fields
+        in: query
+        type: string
     responses:
       200:
-        description: Lista de templates.
+        description: Lista de templates (próxima página no cabeçalho X-Next-Cursor).
         schema:
           type: array
           items:
@@ -425,8 +549,21 @@ def list_templates():
               is_active:
                 type: boolean
     """
-    templates = ServiceTemplate.query.all()
-    return jsonify([{
+    limit, cursor = parse_page_args()
+    fields = parse_fields(TEMPLATE_LIST_FIELDS)
+
+    query = ServiceTemplate.query
+    for arg in ('type', 'deploy_mode', 'category'):
+        value = request.args.get(arg)
+        if value:
+            query = query.filter(getattr(ServiceTemplate, arg) == value)
+
+    is_active = parse_bool_arg('is_active')
+    if is_active is not None:
+        query = query.filter(ServiceTemplate.is_active.is_(is_active))
+
+    templates, next_cursor = keyset_paginate(query, ServiceTemplate.id, limit, cursor)
+    return paginated_response([project({
         'id': t.id,
         'name': t.name,
         'type': t.type, 
@@ -437,7 +574,7 @@ def list_templates():
         'default_cpu': t.default_cpu,
         'default_memory': t.default_memory,
         'default_storage': t.default_storage
-    } for t in templates])
+    }, fields) for t in templates], next_cursor)
 
 @bp.route('/templates/scan', methods=['GET', 'OPTIONS'])
 @cross_origin()
@@ -451,13 +588,20 @@ def scan_templates_pve():
     security:
       - Bearer: []
     description: >
-      Busca em 3 locais:
-      1. Storage 'local' por arquivos ISO e Vztmpl (Modo File).
-      2. Lista de VMs QEMU com flag 'template=1' (Modo Clone).
-      3. Lista de Containers LXC com flag 'template=1' (Modo Clone).
+      Busca o que o nó de deploy alcança (app/services/template_scan.py), com as listagens em paralelo:
+      1. Todo storage ativo com conteúdo vztmpl/iso visto pelo nó de deploy (Modo File).
+      2. VMs QEMU e Containers LXC com flag 'template=1' no nó de deploy (Modo Clone).
+      Respondido do índice em memória (TEMPLATE_SCAN_INTERVAL); ?fresh=1 varre na hora.
+      Cabeçalhos X-Scan-Age (s) e X-Scan-Errors trazem a idade do índice e as listagens que falharam;
+      X-Scan-Skipped conta os templates de guest em outros nós.
+    parameters:
+      - in: query
+        name: fresh
+        type: boolean
+        description: Ignora o índice e varre o cluster agora
     responses:
       200:
-        description: Lista de candidatos encontrados no Proxmox.
+        description: Lista de candidatos encontrados no Proxmox (sem os já cadastrados).
         schema:
           type: array
           items:
@@ -476,84 +620,38 @@ def scan_templates_pve():
                 enum: ['file', 'vm']
               detected_size_gb:
                 type: integer
+              node:
+                type: string
+              storage:
+                type: string
+                description: Só para origin=file
+      202:
+        description: Primeira varredura do processo em andamento (lista vazia, X-Scan-Pending)
+      500:
+        description: Falha na varredura (inclusive a primeira, em background), com o erro
     """
     if not check_admin_permission(): return jsonify({"error": "Acesso negado."}), 403
 
     try:
-        node = proxmox_client._resolve_node_id()
-        target_storage = 'local' 
-        
-        # Lista IDs/Volids já cadastrados para evitar duplicatas
-        existing_volids = [str(t.proxmox_template_volid) for t in ServiceTemplate.query.all()]
-        candidates = []
+        result = scan_template_candidates(proxmox_client, fresh=bool(parse_bool_arg('fresh')))
+        if result is None:
+            response = jsonify([])
+            response.headers['X-Scan-Pending'] = '1'
+            return response, 202
 
-        # --- 1. SCAN DE ARQUIVOS (Storage) ---
-        try:
-            contents = proxmox_client.connection.nodes(node).storage(target_storage).content.get()
-            for item in contents:
-                volid = str(item.get('volid'))
-                content_type = item.get('content') 
-                size_bytes = int(item.get('size', 0))
-                size_gb = math.ceil(size_bytes / (1024**3))
-                if size_gb < 1: size_gb = 1
-
-                if content_type in ['vztmpl', 'iso'] and volid not in existing_volids:
-                    candidates.append({
-                        'volid': volid,
-                        'name': volid.split('/')[-1].replace('.iso', '').replace('.tar.zst', ''),
-                        'type': 'lxc' if content_type == 'vztmpl' else 'qemu', # Se ISO, sugere QEMU
-                        'detected_size_gb': size_gb,
-                        'origin': 'file' # Flag para definir deploy_mode depois
-                    })
-        except Exception as e:
-            print(f"Aviso Scan Storage: {e}")
-
-        # --- 2. SCAN DE VMS QEMU (Template=1) ---
-        try:
-            qemu_list = proxmox_client.connection.nodes(node).qemu.get()
-            for vm in qemu_list:
-                is_template = vm.get('template') == 1
-                vmid = str(vm.get('vmid'))
-                
-                if is_template and vmid not in existing_volids:
-                    size_bytes = int(vm.get('maxdisk', 0))
-                    size_gb = math.ceil(size_bytes / (1024**3))
-                    
-                    candidates.append({
-                        'volid': vmid,
-                        'name': vm.get('name', f'VM-Template-{vmid}'),
-                        'type': 'qemu',
-                        'detected_size_gb': size_gb,
-                        'origin': 'vm' # Indica Clone
-                    })
-        except Exception as e:
-            print(f"Aviso Scan QEMU: {e}")
+        # Set de IDs/Volids já cadastrados (lookup O(1)); carrega só a coluna, não os objetos.
+        # Aplicado a cada requisição: o que acabou de ser importado some sem esperar o índice.
+        existing_volids = {str(v) for (v,) in db.session.query(ServiceTemplate.proxmox_template_volid)}
+        candidates = [c for c in result['candidates'] if c['volid'] not in existing_volids]
 
-        # --- 3. SCAN DE LXC CONTAINERS (Template=1) [NOVO] ---
-        try:
-            lxc_list = proxmox_client.connection.nodes(node).lxc.get()
-            for ct in lxc_list:
-                is_template = ct.get('template') == 1
-                vmid = str(ct.get('vmid'))
-
-                if is_template and vmid not in existing_volids:
-                    size_bytes = int(ct.get('maxdisk', 0))
-                    size_gb = math.ceil(size_bytes / (1024**3))
-
-                    candidates.append({
-                        'volid': vmid,
-                        'name': ct.get('name', f'LXC-Template-{vmid}'),
-                        'type': 'lxc', # Tipo correto
-                        'detected_size_gb': size_gb,
-                        'origin': 'vm' # Indica Clone (tratamos CT como VM para lógica de ID)
-                    })
-        except Exception as e:
-             print(f"Aviso Scan LXC: {e}")
-        
-        return jsonify(candidates)
+        response = jsonify(candidates)
+        response.headers['X-Scan-Age'] = str(result['age_seconds'])
+        response.headers['X-Scan-Errors'] = str(len(result['errors']))
+        response.headers['X-Scan-Skipped'] = str(result['skipped'])
+        return response
 
     except Exception as e:
-        print(f"Erro Crítico Scan: {e}")
+        current_app.logger.exception(f"Erro Crítico Scan: {e}")
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/templates/import', methods=['POST', 'OPTIONS'])
@@ -574,6 +672,10 @@ def import_selected_templates():
         schema:
           type: object
           properties:
+            mode:
+              type: string
+              enum: ['insert', 'upsert']
+              description: "insert (padrão) ignora os já cadastrados; upsert atualiza tipo, modo e disco detectado"
             templates:
               type: array
               items:
@@ -592,38 +694,94 @@ def import_selected_templates():
     responses:
       200:
         description: Templates importados com sucesso.
+      400:
+        description: Item sem volid, name ou type, ou com detected_size_gb inválido.
     """
     if not check_admin_permission(): return jsonify({"error": "Acesso negado."}), 403
 
-    data = request.get_json()
+    data = request.get_json() or {}
     selected_items = data.get('templates', []) 
-    
-    added_count = 0
+    mode = data.get('mode', 'insert')
+    if mode not in ('insert', 'upsert'):
+        return jsonify({'error': "Modo inválido. Use 'insert' ou 'upsert'."}), 400
+
+    # Deduplica o próprio payload por volid (o último item vence)
+    items_by_volid = {}
+    detected_by_volid = {}
     for item in selected_items:
-        exists = ServiceTemplate.query.filter_by(proxmox_template_volid=item['volid']).first()
-        if not exists:
-            # Lógica inteligente para definir o modo
-            # Se origin for 'vm' (IDs numéricos de VM ou CT), usamos CLONE.
-            # Se origin for 'file' (caminho de storage), usamos FILE.
-            origin = item.get('origin', 'file')
-            deploy_mode = 'clone' if origin == 'vm' else 'file'
-
-            new_tmpl = ServiceTemplate(
-                name=item['name'],
-                proxmox_template_volid=item['volid'],
-                type=item['type'],
-                deploy_mode=deploy_mode,
-                category='os',
-                is_active=False,
-                default_cpu=1,
-                default_memory=512,
-                default_storage=item.get('detected_size_gb', 5)
-            )
-            db.session.add(new_tmpl)
-            added_count += 1
-    
-    db.session.commit()
-    return jsonify({'success': True, 'message': f'{added_count} templates importados com sucesso.'})
+        if not item.get('volid') or not item.get('name') or not item.get('type'):
+            return jsonify({'error': 'Cada template precisa de volid, name e type.'}), 400
+        # null/'' viram 0; texto não numérico ou negativo é erro do payload, não 500
+        try:
+            detected = int(item.get('detected_size_gb', 5) or 0)
+        except (TypeError, ValueError):
+            detected = -1
+        if detected < 0:
+            return jsonify({'error': f"detected_size_gb inválido em '{item['volid']}'."}), 400
+        items_by_volid[str(item['volid'])] = item
+        detected_by_volid[str(item['volid'])] = detected
+
+    if not items_by_volid:
+        return jsonify({'success': True, 'created': 0, 'updated': 0, 'message': '0 templates importados com sucesso.'})
+
+    # Uma única query (IN) para descobrir o que já existe
+    existing = db.session.query(
+        ServiceTemplate.id, ServiceTemplate.proxmox_template_volid, ServiceTemplate.default_storage
+    ).filter(ServiceTemplate.proxmox_template_volid.in_(list(items_by_volid))).all()
+    existing_by_volid = {}
+    for row in existing:
+        existing_by_volid.setdefault(str(row.proxmox_template_volid), []).append(row)
+
+    new_rows = []
+    updates = []
+    for volid, item in items_by_volid.items():
+        # Lógica inteligente para definir o modo
+        # Se origin for 'vm' (IDs numéricos de VM ou CT), usamos CLONE.
+        # Se origin for 'file' (caminho de storage), usamos FILE.
+        origin = item.get('origin', 'file')
+        deploy_mode = 'clone' if origin == 'vm' else 'file'
+        detected_storage = detected_by_volid[volid]
+
+        if volid not in existing_by_volid:
+            new_rows.append({
+                'name': item['name'],
+                'proxmox_template_volid': volid,
+                'type': item['type'],
+                'deploy_mode': deploy_mode,
+                'category': 'os',
+                'is_active': False,
+                'default_cpu': 1,
+                'default_memory': 512,
+                'default_storage': detected_storage
+            })
+        elif mode == 'upsert':
+            # Atualiza só o que vem do Proxmox; nome, categoria e status são curadoria do admin.
+            # O disco nunca diminui (mesma regra do PUT /templates/<id>).
+            for row in existing_by_volid[volid]:
+                updates.append({
+                    'id': row.id,
+                    'type': item['type'],
+                    'deploy_mode': deploy_mode,
+                    'default_storage': max(row.default_storage or 0, detected_storage)
+                })
+
+    try:
+        # Inserção e atualização em lote (executemany), independente da quantidade de itens
+        if new_rows:
+            db.session.execute(insert(ServiceTemplate), new_rows)
+        if updates:
+            db.session.execute(update(ServiceTemplate), updates)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({
+        'success': True,
+        'created': len(new_rows),
+        'updated': len(updates),
+        'message': f'{len(new_rows)} templates importados com sucesso.'
+    })
 
 @bp.route('/templates/<int:id>/toggle', methods=['PUT', 'OPTIONS'])
 @cross_origin()
@@ -768,4 +926,296 @@ def manage_single_template(id):
                     tmpl.default_storage = new_storage
 
         db.session.commit()
-        return jsonify({'success': True, 'message': 'Template atualizado.', 'data': tmpl.to_dict()})
\ No newline at end of file
+        return jsonify({'success': True, 'message': 'Template atualizado.', 'data': tmpl.to_dict()})
+
+
+# ==============================================================================
+# CONSUMO REAL DO CLUSTER (Capacity Planning)
+# ==============================================================================
+
+@bp.route('/usage/nodes', methods=['GET', 'OPTIONS'])
+@cross_origin()
+@jwt_required()
+@read_replica
+def get_nodes_usage():
+    """
+    Consumo real por node e total do cluster, a partir dos rollups (sem consultar o PVE).
+    ---
+    tags:
+      - Admin Usage
+    security:
+      - Bearer: []
+    parameters:
+      - in: query
+        name: resolution
+        type: string
+        enum: [hour, day]
+        default: day
+      - in: query
+        name: days
+        type: integer
+        default: 30
+    responses:
+      200:
+        description: Séries por node e série somada do cluster
+      400:
+        description: Parâmetros inválidos
+    """
+    if not check_admin_permission(): return jsonify({"error": "Acesso negado."}), 403
+
+    resolution = request.args.get('resolution', 'day')
+    if resolution not in RESOLUTIONS:
+        return jsonify({"error": "resolution deve ser 'hour' ou 'day'."}), 400
+    days = parse_int_arg('days') or 30
+
+    return jsonify(get_cluster_usage(resolution, days)), 200
+
+
+# ==============================================================================
+# SAÚDE DETALHADA DOS SUBSISTEMAS
+# ==============================================================================
+
+@bp.route('/health', methods=['GET', 'OPTIONS'])
+@cross_origin()
+@jwt_required()
+def get_subsystems_health():
+    """
+    Health check detalhado: banco (pool), Proxmox, fila de tarefas e LDAP, com
+    percentis de latência (p50/p95/p99) das verificações recentes.
+    ---
+    tags:
+      - Admin Health
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Status global (healthy, degraded, unhealthy) e o resultado de cada provider
+    """
+    if not check_admin_permission(): return jsonify({"error": "Acesso negado."}), 403
+    return jsonify(get_system_health()), 200
+
+
+# ==============================================================================
+# PROFILER SOB DEMANDA (app/profiling.py)
+# ==============================================================================
+
+@bp.route('/profiles', methods=['GET', 'OPTIONS'])
+@cross_origin()
+@jwt_required()
+def list_profiles():
+    """
+    Perfis recentes deste processo, do mais lento para o mais rápido.
+    Para perfilar uma requisição: header X-Profile: 1 (como admin).
+    ---
+    tags:
+      - Admin Profiling
+    security:
+      - Bearer: []
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        default: 20
+      - in: query
+        name: route
+        type: string
+        description: Filtra por regra de rota (ex. /api/admin/templates/scan)
+    responses:
+      200:
+        description: Rota, método, status, duração e trace_id de cada perfil, com a amostragem atual
+    """
+    if not check_admin_permission(): return jsonify({"error": "Acesso negado."}), 403
+
+    store = current_app.extensions['profiler']
+    limit = parse_int_arg('limit') or 20
+    return jsonify(dict(store.settings(), profiles=store.slowest(limit, request.args.get('route')))), 200
+
+
+@bp.route('/profiles/settings', methods=['PUT', 'OPTIONS'])
+@cross_origin()
+@jwt_required()
+def update_profile_settings():
+    """
+    Liga/desliga a amostragem do profiler sem restart (vale para este processo).
+    ---
+    tags:
+      - Admin Profiling
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          properties:
+            sampling:
+              type: boolean
+            sample_rate:
+              type: number
+              description: Fração das requisições perfiladas (0..1)
+    responses:
+      200:
+        description: Amostragem atual (sampling, sample_rate, skipped)
+      400:
+        description: sample_rate fora de 0..1
+    """
+    if not check_admin_permission(): return jsonify({"error": "Acesso negado."}), 403
+
+    data = request.get_json(silent=True) or {}
+    store = current_app.extensions['profiler']
+    if 'sample_rate' in data:
+        try:
+            sample_rate = float(data['sample_rate'])
+        except (TypeError, ValueError):
+            sample_rate = -1
+        if not 0 <= sample_rate <= 1:
+            return jsonify({"error": "sample_rate deve estar entre 0 e 1."}), 400
+        store.sample_rate = sample_rate
+    if 'sampling' in data:
+        store.sampling = bool(data['sampling'])
+    return jsonify(store.settings()), 200
+
+
+@bp.route('/profiles/<int:profile_id>', methods=['GET', 'OPTIONS'])
+@cross_origin()
+@jwt_required()
+def get_profile(profile_id):
+    """
+    Um perfil com as funções de maior tempo acumulado.
+    ---
+    tags:
+      - Admin Profiling
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Metadados e funções (chamadas, tottime_ms, cumtime_ms)
+      404:
+        description: Perfil inexistente (ou já saiu do buffer)
+    """
+    if not check_admin_permission(): return jsonify({"error": "Acesso negado."}), 403
+
+    record = current_app.extensions['profiler'].get(profile_id)
+    if record is None:
+        return jsonify({"error": "Perfil não encontrado."}), 404
+    return jsonify(record), 200
+
+
+# ==============================================================================
+# CRONÔMETRO DO DEPLOY (app/deploy_timing.py)
+# ==============================================================================
+
+@bp.route('/deploy-metrics', methods=['GET', 'OPTIONS'])
+@cross_origin()
+@jwt_required()
+def get_deploy_metrics():
+    """
+    Duração (p50/p95/p99) e chamadas ao PVE por fase dos deploys recentes deste processo.
+    ---
+    tags:
+      - Admin Profiling
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Totais dos deploys (com falhas e estouros do orçamento) e cada fase (validation, vmid, pool_user, create, onboot, start, status, db_commit)
+    """
+    if not check_admin_permission(): return jsonify({"error": "Acesso negado."}), 403
+
+    metrics = current_app.extensions.get('deploy_metrics')
+    data = metrics.snapshot() if metrics is not None else {'deploys': {}, 'phases': {}}
+    data['budget'] = current_app.config.get('DEPLOY_PVE_CALL_BUDGET') or None
+    return jsonify(data), 200
+
+
+# ==============================================================================
+# PRÉ-PROVISIONAMENTO (início de semestre)
+# ==============================================================================
+
+@bp.route('/preprovision', methods=['POST', 'OPTIONS'])
+@cross_origin()
+@jwt_required()
+def preprovision_users():
+    """
+    Pré-cria shadow users, usuários PVE, pools e ACLs de um grupo ou filtro LDAP.
+    O diff é feito contra uma única listagem de cada coleção do PVE; só o que
+    falta é criado, em lotes paralelos. Mesma lógica do `flask preprovision`.
+    Roda em background (um job por vez): acompanhe em GET /api/admin/preprovision/<job_id>.
+    ---
+    tags:
+      - Admin Groups
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            group_id:
+              type: integer
+              description: Usuários do grupo + quem casa com o ldap_filter dele
+            ldap_filter:
+              type: string
+              example: "(employeeType=aluno)"
+            dry_run:
+              type: boolean
+              default: false
+    responses:
+      202:
+        description: Job iniciado (id e status)
+      400:
+        description: Nem group_id nem ldap_filter informados
+      404:
+        description: Grupo não encontrado
+      409:
+        description: Já existe um job rodando neste processo
+    """
+    if not check_admin_permission(): return jsonify({"error": "Acesso negado."}), 403
+
+    data = request.get_json() or {}
+    group_id = data.get('group_id')
+    ldap_filter = data.get('ldap_filter')
+    if not group_id and not ldap_filter:
+        return jsonify({"error": "Informe group_id e/ou ldap_filter."}), 400
+
+    if group_id and not db.session.get(UserGroup, group_id):
+        return jsonify({"error": "Grupo não encontrado."}), 404
+
+    try:
+        jobs = get_preprovision_jobs()
+        job = jobs.submit(current_app._get_current_object(), proxmox_client, group_id=group_id,
+                          ldap_filter=ldap_filter, dry_run=bool(data.get('dry_run')))
+        if job is None:
+            return jsonify({"error": "Já existe um pré-provisionamento em andamento.",
+                            "job": jobs.running()}), 409
+        return jsonify(job), 202
+    except Exception as e:
+        current_app.logger.exception(f"Erro ao iniciar pré-provisionamento: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/preprovision/<int:job_id>', methods=['GET', 'OPTIONS'])
+@cross_origin()
+@jwt_required()
+def get_preprovision_job(job_id):
+    """
+    Andamento de um job de pré-provisionamento deste processo.
+    ---
+    tags:
+      - Admin Groups
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: status (running, done, failed), stats ao terminar e error se falhou
+      404:
+        description: Job inexistente (ou já saiu da lista)
+    """
+    if not check_admin_permission(): return jsonify({"error": "Acesso negado."}), 403
+
+    job = get_preprovision_jobs().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado."}), 404
+    return jsonify(job), 200
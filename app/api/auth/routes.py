@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from app.services.ldap_service import LDAPService
+from app.services.credential_cache import get_credential_cache
+from app.services.identity import identity_claims
 from app.models import User
-from app.extensions import db, bcrypt
+from app.extensions import db
+from app.db_routing import read_replica
 
 bp = Blueprint('auth', __name__)
 
@@ -63,13 +66,24 @@ def login():
         return jsonify({"msg": "Username e password obrigatórios"}), 400
 
     ldap_user_data = None
-    
-    # 1. TENTATIVA VIA LDAP
-    try:
-        ldap_service = LDAPService()
-        ldap_user_data = ldap_service.authenticate(username, password)
-    except Exception as e:
-        print(f"Erro ao contactar LDAP: {e}. Tentando login local...")
+    # Diretório respondeu (sim ou não)? Só então uma senha errada pode ir para o cache.
+    ldap_answered = False
+
+    # 0. CACHE DE VERIFICAÇÃO (opcional): repete o resultado de um login recente
+    credential_cache = get_credential_cache()
+    cached = credential_cache.lookup(username, password) if credential_cache is not None else None
+    if cached is not None:
+        ok, ldap_user_data = cached
+        if not ok:
+            return jsonify({"msg": "Credenciais inválidas"}), 401
+    else:
+        # 1. TENTATIVA VIA LDAP
+        try:
+            ldap_service = LDAPService()
+            ldap_user_data = ldap_service.authenticate(username, password)
+            ldap_answered = ldap_service.last_error is None
+        except Exception as e:
+            current_app.logger.warning(f"Erro ao contactar LDAP: {e}. Tentando login local...")
 
     user = User.query.filter_by(username=username).first()
 
@@ -82,12 +96,13 @@ def login():
                 email=ldap_user_data.get('email', f'{username}@nubemox.local'),
                 is_admin=False 
             )
-            user.set_password('ldap-managed-account')
+            # Sem senha local: nenhum hash é calculado no primeiro login
+            user.set_directory_managed()
             db.session.add(user)
             db.session.commit() # Commit para gerar ID
             
             # A criação da cota agora é gerenciada pelo Model/Database ou no primeiro acesso
-            print(f"🆕 Shadow User '{username}' criado no banco local via LDAP.")
+            current_app.logger.info(f"Shadow User '{username}' criado no banco local via LDAP.")
             
         else:
             email_ldap = ldap_user_data.get('email')
@@ -95,13 +110,29 @@ def login():
                 user.email = email_ldap
                 db.session.commit()
     
+    elif cached is not None:
+        # Senha local já verificada há pouco (o usuário ainda precisa existir)
+        if not user:
+            return jsonify({"msg": "Credenciais inválidas"}), 401
+
     else:
         # Fallback Local
         if not user or not user.check_password(password):
+            if credential_cache is not None and ldap_answered:
+                credential_cache.store(username, password, ok=False)
             return jsonify({"msg": "Credenciais inválidas"}), 401
 
+        # Rehash transparente: esquema/custo configurado mudou desde o último hash
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+
+    if credential_cache is not None and cached is None:
+        credential_cache.store(username, password, ok=True, data=ldap_user_data)
+
     # 3. GERAÇÃO DO TOKEN
-    access_token = create_access_token(identity=str(user.id))
+    # As claims de permissão evitam buscar o User em cada request (app/services/identity.py)
+    access_token = create_access_token(identity=str(user.id), additional_claims=identity_claims(user))
     
     return jsonify({
         "access_token": access_token,
@@ -116,6 +147,7 @@ def login():
 
 @bp.route('/me', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_current_user_profile():
     """
     Retorna o perfil do usuário logado e o consumo de sua cota.
@@ -1,18 +1,21 @@
 from flask import Blueprint, jsonify, request, abort
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask_cors import cross_origin
-from app.models import ServiceTemplate, User
+from app.models import ServiceTemplate
 from app.extensions import db, proxmox_client
+from app.db_routing import read_replica
+from app.services.identity import current_identity
+from app.api.pagination import parse_page_args, parse_fields, keyset_paginate, project, paginated_response
 
 bp = Blueprint('catalog', __name__)
 
+CATALOG_FIELDS = ('id', 'name', 'type', 'description', 'category', 'logo_url', 'specs')
+
 # --- HELPER DE PERMISSÃO ---
 def check_admin_access():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user: abort(403)
-    if user.is_admin: return user
-    if user.group and user.group.name.lower() in ['admins', 'administradores', 'root', 'ti']: return user
+    # Admin ou membro de grupo administrativo, direto das claims do token
+    identity = current_identity()
+    if identity.can_manage_catalog: return identity
     abort(403)
 
 # ==============================================================================
@@ -22,10 +25,24 @@ def check_admin_access():
 @bp.route('/templates', methods=['GET', 'OPTIONS'])
 @cross_origin()
 @jwt_required()
+@read_replica
 def list_active_templates():
-    """Retorna lista de templates ativos para o usuário final."""
-    templates = ServiceTemplate.query.filter_by(is_active=True).all()
-    return jsonify([t.to_dict() for t in templates]), 200
+    """
+    Retorna lista de templates ativos para o usuário final.
+    Paginada por cursor (?limit=, ?cursor=), com filtros ?type= e ?category=
+    e projeção ?fields=.
+    """
+    limit, cursor = parse_page_args()
+    fields = parse_fields(CATALOG_FIELDS)
+
+    query = ServiceTemplate.query.filter_by(is_active=True)
+    for arg in ('type', 'category'):
+        value = request.args.get(arg)
+        if value:
+            query = query.filter(getattr(ServiceTemplate, arg) == value)
+
+    templates, next_cursor = keyset_paginate(query, ServiceTemplate.id, limit, cursor)
+    return paginated_response([project(t.to_dict(), fields) for t in templates], next_cursor)
 
 
 # ==============================================================================
@@ -39,6 +56,7 @@ def list_active_templates():
 @bp.route('/admin/templates', methods=['GET', 'POST', 'OPTIONS'])
 @cross_origin()
 @jwt_required()
+@read_replica
 def manage_collection():
     check_admin_access()
 
@@ -1,10 +1,15 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify, request
 from flask_cors import cross_origin
+from flask_jwt_extended import verify_jwt_in_request
 from datetime import datetime
 # Importamos o Singleton que já configuramos e sabemos que funciona (ou deveria)
 from app.extensions import db, proxmox_client 
 from sqlalchemy import text
 
+from app.services.health.runner import run_checks
+from app.services.health.snapshot import get_health_snapshot
+from app.services.identity import current_identity
+
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/', methods=['GET'])
@@ -21,46 +26,88 @@ def index():
 def health_check():
     """
     Verifica a saúde usando a MESMA conexão que o resto do sistema usa.
+    Respondido do snapshot em memória (HEALTH_CACHE_INTERVAL); ?fresh=1 força
+    uma verificação ao vivo e exige JWT de administrador (a rota é pública e
+    cada verificação ao vivo bate no banco e no Proxmox).
+    ---
+    tags:
+      - Health
+    parameters:
+      - in: query
+        name: fresh
+        type: boolean
+        required: false
+        description: Ignora o cache e verifica banco e Proxmox agora (só administrador)
+    responses:
+      200:
+        description: Estado da API, do banco e do Proxmox (com checked_at, age_seconds e stale)
+      403:
+        description: ?fresh=1 sem JWT de administrador
     """
+    fresh = request.args.get('fresh', '').lower() in ('1', 'true', 'yes')
+    if fresh and not _is_admin_request():
+        return jsonify({"error": "?fresh=1 requer token de administrador"}), 403
+
+    snapshot = get_health_snapshot(_build_health_report)
+    if snapshot is None:
+        status_report = _build_health_report()
+    else:
+        status_report = snapshot.get(fresh=fresh)
+
+    status_report['server_time'] = datetime.utcnow().isoformat()
+    return jsonify(status_report), 200
+
+
+def _is_admin_request():
+    try:
+        verify_jwt_in_request(optional=True)
+        return current_identity().is_admin
+    except Exception:
+        return False
+
+
+def _build_health_report():
     status_report = {
         "status": "online",     # Estado geral da API (Python)
         "database": "unknown",  # Estado do PostgreSQL
         "proxmox": "unknown",   # Estado do Hypervisor
-        "details": {},
-        "server_time": datetime.utcnow().isoformat()
+        "details": {}
     }
 
-    # 1. TESTE DE BANCO DE DADOS
-    try:
-        db.session.execute(text('SELECT 1'))
+    # Banco e Proxmox em paralelo, cada um com seu prazo (HEALTH_PROVIDER_TIMEOUT /
+    # HEALTH_DEADLINE): a resposta sai no tempo do mais lento, não da soma.
+    # A propriedade .connection faz o lazy loading; se falhar autenticação/rede, estoura no check.
+    outcomes = run_checks([
+        ('database', lambda: db.session.execute(text('SELECT 1')), None),
+        # Operação leve de leitura (listar nós)
+        ('nodes', lambda: proxmox_client.connection.nodes.get(), None),
+        # Versão, para garantir leitura profunda
+        ('version', lambda: proxmox_client.connection.version.get(), None),
+    ])
+
+    # 1. BANCO DE DADOS
+    database = outcomes['database']
+    if database['ok']:
         status_report['database'] = "connected"
-    except Exception as e:
+    else:
         status_report['status'] = "unstable"
-        status_report['database'] = "disconnected"
-        status_report['details']['db_error'] = str(e)
+        status_report['database'] = "degraded" if database['timed_out'] else "disconnected"
+        status_report['details']['db_error'] = database['error']
 
-    # 2. TESTE DE PROXMOX (Usando Singleton)
-    try:
-        # Acessa a propriedade .connection. Se falhar autenticação/rede, estoura erro aqui.
-        conn = proxmox_client.connection
-        
-        # Tenta uma operação leve de leitura (listar nós)
-        nodes = conn.nodes.get()
-        
+    # 2. PROXMOX (Usando Singleton)
+    nodes, version = outcomes['nodes'], outcomes['version']
+    if nodes['ok'] and version['ok']:
         status_report['proxmox'] = "connected"
-        status_report['details']['nodes_online'] = len(nodes)
-        
-        # Pega versão para garantir leitura profunda
-        version = conn.version.get()
-        status_report['details']['pve_version'] = version.get('version', 'unknown')
-
-    except Exception as e:
+        status_report['details']['nodes_online'] = len(nodes['value'])
+        status_report['details']['pve_version'] = version['value'].get('version', 'unknown')
+    else:
         # Se cair aqui, o Frontend recebe "proxmox": "disconnected" e pinta de vermelho
+        # ("degraded" quando só não respondeu a tempo)
+        failed = nodes if not nodes['ok'] else version
         status_report['status'] = "unstable"
-        status_report['proxmox'] = "disconnected"
-        status_report['details']['proxmox_error'] = str(e)
-        
-        # Log no terminal para você debugar
-        print(f"\n ERRO NO HEALTH CHECK (PROXMOX): {str(e)}\n")
+        status_report['proxmox'] = "degraded" if failed['timed_out'] else "disconnected"
+        status_report['details']['proxmox_error'] = failed['error']
+
+        current_app.logger.error(f"Erro no health check (Proxmox): {failed['error']}")
 
-    return jsonify(status_report), 200
\ No newline at end of file
+    return status_report
@@ -0,0 +1,124 @@
+"""
+Helpers de listagem para as rotas de coleção (usuários, templates, recursos).
+
+- Paginação por cursor (keyset) sobre colunas indexadas: em vez de OFFSET,
+  a próxima página é "tudo com id > último id visto", o que mantém o custo
+  da query constante independentemente da página.
+- Projeção de campos (?fields=a,b,c) para reduzir o tamanho da resposta.
+- Parsing dos filtros simples de querystring.
+
+O corpo da resposta continua sendo um array JSON (compatível com o Frontend);
+o cursor da próxima página vai no cabeçalho X-Next-Cursor.
+"""
+from flask import request, abort, current_app, jsonify
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+_TRUE_VALUES = {'1', 'true', 'yes', 'sim'}
+_FALSE_VALUES = {'0', 'false', 'no', 'nao', 'não'}
+
+
+def parse_page_args():
+    """
+    Lê ?limit= e ?cursor= da querystring.
+    Retorna (limit, cursor). Sem ?limit= o limite é None: a listagem vem inteira,
+    como antes da paginação (o Frontend atual não envia cursor). Com ?limit=,
+    nunca passa de API_MAX_PAGE_SIZE.
+    """
+    max_limit = current_app.config.get('API_MAX_PAGE_SIZE', 500)
+
+    raw_limit = request.args.get('limit')
+    limit = None
+    if raw_limit not in (None, ''):
+        try:
+            limit = int(raw_limit)
+        except (TypeError, ValueError):
+            abort(400, description="Parâmetro 'limit' deve ser um inteiro.")
+        if limit < 1:
+            abort(400, description="Parâmetro 'limit' deve ser maior que zero.")
+        limit = min(limit, max_limit)
+
+    cursor = request.args.get('cursor')
+    if cursor in (None, ''):
+        return limit, None
+    try:
+        return limit, int(cursor)
+    except (TypeError, ValueError):
+        abort(400, description="Parâmetro 'cursor' inválido.")
+
+
+def parse_fields(allowed):
+    """
+    Lê ?fields=a,b,c. Retorna None (todos os campos) ou um set validado.
+    """
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    fields = {f.strip() for f in raw.split(',') if f.strip()}
+    unknown = fields - set(allowed)
+    if unknown:
+        abort(400, description=f"Campos desconhecidos em 'fields': {', '.join(sorted(unknown))}.")
+    return fields
+
+
+def parse_bool_arg(name):
+    """Lê um filtro booleano (?is_active=true). Retorna None se ausente."""
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        return None
+    value = raw.strip().lower()
+    if value in _TRUE_VALUES:
+        return True
+    if value in _FALSE_VALUES:
+        return False
+    abort(400, description=f"Parâmetro '{name}' deve ser booleano.")
+
+
+def parse_int_arg(name):
+    """Lê um filtro inteiro (?owner=3). Retorna None se ausente."""
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        return None
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        abort(400, description=f"Parâmetro '{name}' deve ser um inteiro.")
+
+
+def keyset_paginate(query, column, limit, cursor):
+    """
+    Aplica a paginação keyset numa query SQLAlchemy.
+    `column` deve ser única e indexada (normalmente a PK). limit=None = sem limite.
+    Retorna (rows, next_cursor) — next_cursor é None na última página.
+    """
+    if cursor is not None:
+        query = query.filter(column > cursor)
+
+    query = query.order_by(column.asc())
+    if limit is None:
+        return query.all(), None
+
+    # Busca um item a mais para saber se existe próxima página sem COUNT(*)
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = getattr(rows[-1], column.key)
+    return rows, next_cursor
+
+
+def project(item, fields):
+    """Aplica a projeção de campos a um dicionário já serializado."""
+    if fields is None:
+        return item
+    return {k: v for k, v in item.items() if k in fields}
+
+
+def paginated_response(items, next_cursor, status=200):
+    """Monta a resposta JSON (array) com o cursor da próxima página no cabeçalho."""
+    response = jsonify(items)
+    response.status_code = status
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+    return response
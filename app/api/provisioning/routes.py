@@ -6,9 +6,14 @@ import re
 # Modelos e Banco de Dados
 from app.models import ServiceTemplate, VirtualResource, User
 from app.extensions import db
+from app.db_routing import read_replica
+from app.api.pagination import parse_page_args, parse_fields, parse_int_arg, keyset_paginate, project, paginated_response
 
 # Importamos a instância do Serviço Unificado (Facade)
 from app.proxmox import proxmox_client
+from app.services.usage import RESOLUTIONS, get_guest_usage
+from app.services.identity import current_identity
+from app.deploy_timing import StepTimer, record_deploy, timings_in_response
 
 # Tenta importar utils de forma robusta
 try:
@@ -18,6 +23,8 @@ except ImportError:
 
 bp = Blueprint('provisioning', __name__)
 
+RESOURCE_LIST_FIELDS = ('id', 'vmid', 'name', 'type', 'status', 'cpu', 'ram', 'storage', 'owner_id', 'created_at')
+
 @bp.route('/deploy', methods=['POST', 'OPTIONS'])
 @cross_origin()
 @jwt_required()
@@ -64,34 +71,37 @@ def deploy_resource():
     """
     new_id = None 
     resource_type = 'lxc' 
+    # Duração e chamadas ao PVE por fase (app/deploy_timing.py)
+    timer = StepTimer()
 
     try:
         # --- 1. VALIDAÇÕES E DADOS ---
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        
-        if not user:
-            return jsonify({"error": "Usuário não encontrado."}), 401
-
-        data = request.get_json() or {}
-        template_id = data.get('template_id')
-        name = data.get('name') 
-        
-        if not template_id or not name:
-            return jsonify({"error": "Campos obrigatórios ausentes."}), 400
-
-        if not re.match(r'^[a-zA-Z0-9-]+$', name):
-             return jsonify({"error": "Nome inválido."}), 400
-
-        template = ServiceTemplate.query.get(template_id)
-        if not template: return jsonify({"error": "Template não encontrado."}), 404
-        
-        req_cpu = int(data.get('cpu', template.default_cpu or 1))
-        req_ram = int(data.get('memory', template.default_memory or 512))
-        req_storage = int(data.get('storage', template.default_storage or 10))
-        
-        can_create, reason = check_user_quota(user, req_cpu, req_ram, req_storage)
-        if not can_create: return jsonify({"error": reason}), 403
+        with timer.step('validation'):
+            current_user_id = get_jwt_identity()
+            user = User.query.get(current_user_id)
+            
+            if not user:
+                return jsonify({"error": "Usuário não encontrado."}), 401
+
+            data = request.get_json() or {}
+            template_id = data.get('template_id')
+            name = data.get('name') 
+            
+            if not template_id or not name:
+                return jsonify({"error": "Campos obrigatórios ausentes."}), 400
+
+            if not re.match(r'^[a-zA-Z0-9-]+$', name):
+                 return jsonify({"error": "Nome inválido."}), 400
+
+            template = ServiceTemplate.query.get(template_id)
+            if not template: return jsonify({"error": "Template não encontrado."}), 404
+            
+            req_cpu = int(data.get('cpu', template.default_cpu or 1))
+            req_ram = int(data.get('memory', template.default_memory or 512))
+            req_storage = int(data.get('storage', template.default_storage or 10))
+            
+            can_create, reason = check_user_quota(user, req_cpu, req_ram, req_storage)
+            if not can_create: return jsonify({"error": reason}), 403
 
         # --- 2. INFRAESTRUTURA ---
         target_storage = user.group.default_storage_pool if user.group else 'local-lvm'
@@ -107,103 +117,120 @@ def deploy_resource():
 
         # --- 3. PREPARAÇÃO ---
         resource_type = template.type
-        new_id = proxmox_client.get_next_vmid()
-        target_pool = proxmox_client.ensure_user_pool(user.username)
-        proxmox_client.ensure_pve_user(user.username)
+        with timer.step('vmid'):
+            new_id = proxmox_client.get_next_vmid()
+        # Pool e usuário PVE: servidos pelo cache de existência nos deploys seguintes
+        with timer.step('pool_user'):
+            target_pool = proxmox_client.ensure_user_pool(user.username)
+            proxmox_client.ensure_pve_user(user.username)
 
         template_volid = template.proxmox_template_volid
         is_file_template = not str(template_volid).isdigit()
 
         # --- 4. DEPLOY TÉCNICO ---
-        node = proxmox_client._resolve_node_id()
+        with timer.step('create'):
+            node = proxmox_client._resolve_node_id()
 
-        if resource_type == 'lxc':
-            if template.deploy_mode == 'clone' and not is_file_template:
-                # A. CLONE
-                proxmox_client.clone_container(
-                    source_vmid=template_volid,
-                    new_vmid=new_id,
-                    name=name,
-                    poolid=target_pool,
-                    full_clone=True
-                )
-            elif (template.deploy_mode == 'file') or (is_file_template):
-                # B. CREATE FILE
-                config = {
+            if resource_type == 'lxc':
+                if template.deploy_mode == 'clone' and not is_file_template:
+                    # A. CLONE
+                    proxmox_client.clone_container(
+                        source_vmid=template_volid,
+                        new_vmid=new_id,
+                        name=name,
+                        poolid=target_pool,
+                        full_clone=True
+                    )
+                elif (template.deploy_mode == 'file') or (is_file_template):
+                    # B. CREATE FILE
+                    config = {
+                        'vmid': new_id,
+                        'template': template_volid,
+                        'name': name,
+                        'memory': req_ram,
+                        'cores': req_cpu,
+                        'storage': target_storage,  
+                        'net0': net_config_lxc,     
+                        'poolid': target_pool,
+                        'password': 'ChangeMe123!',
+                        'onboot': 1  # Define Start on Boot
+                    }
+                    proxmox_client.create_container(config)
+                else:
+                     return jsonify({"error": "Modo inválido."}), 400
+            elif resource_type == 'qemu':
+                proxmox_client.create_vm({
                     'vmid': new_id,
-                    'template': template_volid,
                     'name': name,
-                    'memory': req_ram,
                     'cores': req_cpu,
+                    'memory': req_ram,
                     'storage': target_storage,  
-                    'net0': net_config_lxc,     
-                    'poolid': target_pool,
-                    'password': 'ChangeMe123!',
-                    'onboot': 1  # Define Start on Boot
-                }
-                proxmox_client.create_container(config)
-            else:
-                 return jsonify({"error": "Modo inválido."}), 400
+                    'net0': net_config_qemu,    
+                    'poolid': target_pool
+                })
 
+        if resource_type == 'lxc':
             # --- PÓS-DEPLOY LXC ---
             try:
                 # 1. Garante persistência da config de boot
-                proxmox_client.connection.nodes(node).lxc(new_id).config.put(onboot=1)
+                with timer.step('onboot'):
+                    proxmox_client.connection.nodes(node).lxc(new_id).config.put(onboot=1)
                 # 2. Inicia imediatamente
-                proxmox_client.start_container(new_id)
+                with timer.step('start'):
+                    proxmox_client.start_container(new_id)
             except Exception as e:
                 current_app.logger.warning(f"Container criado, mas falha ao iniciar: {e}")
 
         elif resource_type == 'qemu':
-            proxmox_client.create_vm({
-                'vmid': new_id,
-                'name': name,
-                'cores': req_cpu,
-                'memory': req_ram,
-                'storage': target_storage,  
-                'net0': net_config_qemu,    
-                'poolid': target_pool
-            })
             # Pós-deploy VM
             try:
-                proxmox_client.connection.nodes(node).qemu(new_id).config.put(onboot=1)
-                if hasattr(proxmox_client, 'start_vm'):
-                    proxmox_client.start_vm(new_id)
+                with timer.step('onboot'):
+                    proxmox_client.connection.nodes(node).qemu(new_id).config.put(onboot=1)
+                with timer.step('start'):
+                    if hasattr(proxmox_client, 'start_vm'):
+                        proxmox_client.start_vm(new_id)
             except Exception:
                 pass
 
         # --- 5. PERSISTÊNCIA ---
         final_status = 'stopped'
-        try:
-            if resource_type == 'lxc':
-                status_data = proxmox_client.get_container_status(new_id)
-                final_status = status_data['data'].get('status', 'stopped')
-        except:
-            pass
+        with timer.step('status'):
+            try:
+                if resource_type == 'lxc':
+                    status_data = proxmox_client.get_container_status(new_id)
+                    final_status = status_data['data'].get('status', 'stopped')
+            except:
+                pass
 
-        resource = VirtualResource(
-            proxmox_vmid=new_id,
-            name=name,
-            type=resource_type,
-            template_id=template.id,
-            owner_id=user.id,
-            cpu_cores=req_cpu,
-            memory_mb=req_ram,
-            storage_gb=req_storage,
-            status=final_status 
-        )
-        db.session.add(resource)
-        db.session.commit()
+        with timer.step('db_commit'):
+            resource = VirtualResource(
+                proxmox_vmid=new_id,
+                name=name,
+                type=resource_type,
+                template_id=template.id,
+                owner_id=user.id,
+                cpu_cores=req_cpu,
+                memory_mb=req_ram,
+                storage_gb=req_storage,
+                status=final_status 
+            )
+            db.session.add(resource)
+            db.session.commit()
 
-        return jsonify({
+        record_deploy(timer)
+        body = {
             'success': True,
             'message': f"Recurso criado e iniciado.",
             'vmid': new_id,
             'status': final_status
-        }), 201
+        }
+        if timings_in_response():
+            body['timings'] = timer.summary()
+        return jsonify(body), 201
 
     except Exception as e:
         db.session.rollback()
+        record_deploy(timer, ok=False)
         current_app.logger.error(f"Erro Deploy: {e}")
         if new_id:
             try:
@@ -244,17 +271,18 @@ def scale_resource(vmid):
         description: Cota excedida
     """
     current_user_id = int(get_jwt_identity())
-    user = User.query.get(current_user_id)
+    identity = current_identity()
     resource = VirtualResource.query.filter_by(proxmox_vmid=vmid).first_or_404()
     
-    if resource.owner_id != current_user_id and not getattr(user, 'is_admin', False):
+    if resource.owner_id != current_user_id and not identity.is_admin:
         return jsonify({"error": "Acesso negado."}), 403
 
     data = request.get_json() or {}
     new_ram = int(data.get('memory', resource.memory_mb))
     new_cpu = int(data.get('cores', resource.cpu_cores))
     
-    # Check Quota
+    # Check Quota (aqui sim precisamos do User: a cota depende dos recursos atuais)
+    user = User.query.get(current_user_id)
     quota_data = getattr(user, 'quota', None)
     if quota_data and 'limit' in quota_data:
         limits = quota_data['limit']
@@ -318,9 +346,9 @@ def destroy_resource(vmid):
     """
     current_user_id = int(get_jwt_identity())
     resource = VirtualResource.query.filter_by(proxmox_vmid=vmid).first_or_404()
-    user = User.query.get(current_user_id)
+    identity = current_identity()
     
-    if resource.owner_id != current_user_id and not getattr(user, 'is_admin', False):
+    if resource.owner_id != current_user_id and not identity.is_admin:
          return jsonify({"error": "Sem permissão."}), 403
 
     try:
@@ -350,17 +378,43 @@ def destroy_resource(vmid):
 @bp.route('/resources', methods=['GET', 'OPTIONS'])
 @cross_origin()
 @jwt_required()
+# Sem @read_replica: a sincronização grava o status lido do PVE, e a gravação
+# tem de partir de linhas lidas do primário (réplica atrasada sobrescreveria)
 def list_user_resources():
     """
     Lista recursos do usuário com sincronização de status em tempo real.
+    Paginado por cursor (?limit=; sem ele, todos); a sincronização com o Proxmox é
+    feita só na página retornada. ?status= filtra pelo status já sincronizado, então
+    uma página pode vir com menos itens que o limite (siga o X-Next-Cursor).
     ---
     tags:
       - Leitura de Recursos
     security:
       - Bearer: []
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+      - name: cursor
+        in: query
+        type: integer
+      - name: status
+        in: query
+        type: string
+      - name: type
+        in: query
+        type: string
+        enum: ['lxc', 'qemu']
+      - name: owner
+        in: query
+        type: integer
+        description: "Somente Admin: lista recursos de outro usuário"
+      - name: fields
+        in: query
+        type: string
     responses:
       200:
-        description: Lista de recursos
+        description: Lista de recursos (próxima página no cabeçalho X-Next-Cursor)
         schema:
           type: array
           items:
@@ -378,7 +432,24 @@ def list_user_resources():
                 type: integer
     """
     current_user_id = int(get_jwt_identity())
-    resources = VirtualResource.query.filter_by(owner_id=current_user_id).all()
+    limit, cursor = parse_page_args()
+    fields = parse_fields(RESOURCE_LIST_FIELDS)
+
+    owner_id = parse_int_arg('owner')
+    if owner_id is None:
+        owner_id = current_user_id
+    elif owner_id != current_user_id:
+        if not current_identity().is_admin:
+            return jsonify({"error": "Acesso negado."}), 403
+
+    query = VirtualResource.query.filter_by(owner_id=owner_id)
+    resource_type = request.args.get('type')
+    if resource_type:
+        query = query.filter(VirtualResource.type == resource_type)
+    # O status do banco pode estar desatualizado: o filtro é aplicado depois da sincronização
+    status_filter = request.args.get('status')
+
+    resources, next_cursor = keyset_paginate(query, VirtualResource.id, limit, cursor)
     
     try:
         node = proxmox_client._resolve_node_id()
@@ -408,7 +479,10 @@ def list_user_resources():
             except Exception as e:
                 pass
 
-        output.append({
+        if status_filter and real_status != status_filter:
+            continue
+
+        output.append(project({
             'id': r.id,
             'vmid': r.proxmox_vmid,
             'name': r.name,
@@ -417,13 +491,14 @@ def list_user_resources():
             'cpu': r.cpu_cores,
             'ram': r.memory_mb,
             'storage': r.storage_gb,
+            'owner_id': r.owner_id,
             'created_at': r.created_at.isoformat() if r.created_at else None
-        })
+        }, fields))
     
     if changes_detected:
         db.session.commit()
 
-    return jsonify(output)
+    return paginated_response(output, next_cursor)
 
 
 # ----------------------------------------------------------------
@@ -452,10 +527,10 @@ def start_resource(vmid):
         description: Recurso iniciado (ou já estava rodando)
     """
     current_user_id = int(get_jwt_identity())
-    user = User.query.get(current_user_id)
+    identity = current_identity()
     resource = VirtualResource.query.filter_by(proxmox_vmid=vmid).first_or_404()
     
-    if resource.owner_id != current_user_id and not getattr(user, 'is_admin', False):
+    if resource.owner_id != current_user_id and not identity.is_admin:
          return jsonify({"error": "Acesso negado."}), 403
 
     try:
@@ -513,10 +588,10 @@ def stop_resource(vmid):
         description: Recurso parado (ou já estava parado)
     """
     current_user_id = int(get_jwt_identity())
-    user = User.query.get(current_user_id)
+    identity = current_identity()
     resource = VirtualResource.query.filter_by(proxmox_vmid=vmid).first_or_404()
     
-    if resource.owner_id != current_user_id and not getattr(user, 'is_admin', False):
+    if resource.owner_id != current_user_id and not identity.is_admin:
          return jsonify({"error": "Acesso negado."}), 403
 
     try:
@@ -574,10 +649,10 @@ def reboot_resource(vmid):
         description: Comando de reboot enviado
     """
     current_user_id = int(get_jwt_identity())
-    user = User.query.get(current_user_id)
+    identity = current_identity()
     resource = VirtualResource.query.filter_by(proxmox_vmid=vmid).first_or_404()
     
-    if resource.owner_id != current_user_id and not getattr(user, 'is_admin', False):
+    if resource.owner_id != current_user_id and not identity.is_admin:
          return jsonify({"error": "Acesso negado."}), 403
 
     try:
@@ -608,6 +683,58 @@ def reboot_resource(vmid):
         return jsonify({'error': str(e)}), 500
 
 
+# ----------------------------------------------------------------
+# CONSUMO REAL (rollups do rrddata)
+# ----------------------------------------------------------------
+
+@bp.route('/resources/<int:vmid>/usage', methods=['GET', 'OPTIONS'])
+@cross_origin()
+@jwt_required()
+@read_replica
+def get_resource_usage(vmid):
+    """
+    Histórico de consumo real do recurso (CPU, memória, disco, rede).
+    Servido dos rollups gravados por `flask collect-usage`; não consulta o Proxmox.
+    ---
+    tags:
+      - Provisionamento
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: vmid
+        type: integer
+        required: true
+      - in: query
+        name: resolution
+        type: string
+        enum: [hour, day]
+        default: hour
+      - in: query
+        name: days
+        type: integer
+        description: Janela em dias (padrão 1 para hour, 30 para day)
+    responses:
+      200:
+        description: Série temporal e resumo (média, p95, pico)
+      400:
+        description: Parâmetros inválidos
+    """
+    current_user_id = int(get_jwt_identity())
+    identity = current_identity()
+    resource = VirtualResource.query.filter_by(proxmox_vmid=vmid).first_or_404()
+
+    if resource.owner_id != current_user_id and not identity.is_admin:
+         return jsonify({"error": "Acesso negado."}), 403
+
+    resolution = request.args.get('resolution', 'hour')
+    if resolution not in RESOLUTIONS:
+        return jsonify({"error": "resolution deve ser 'hour' ou 'day'."}), 400
+    days = parse_int_arg('days') or (1 if resolution == 'hour' else 30)
+
+    return jsonify(get_guest_usage(vmid, resolution, days)), 200
+
+
 # ----------------------------------------------------------------
 # ROTAS DE SNAPSHOTS
 # ----------------------------------------------------------------
@@ -615,6 +742,7 @@ def reboot_resource(vmid):
 @bp.route('/resources/<int:vmid>/snapshots', methods=['GET', 'OPTIONS'])
 @cross_origin()
 @jwt_required()
+@read_replica
 def list_snapshots(vmid):
     """
     Lista snapshots de um recurso.
@@ -633,10 +761,10 @@ def list_snapshots(vmid):
         description: Lista de snapshots disponíveis
     """
     current_user_id = int(get_jwt_identity())
-    user = User.query.get(current_user_id)
+    identity = current_identity()
     resource = VirtualResource.query.filter_by(proxmox_vmid=vmid).first_or_404()
     
-    if resource.owner_id != current_user_id and not getattr(user, 'is_admin', False):
+    if resource.owner_id != current_user_id and not identity.is_admin:
          return jsonify({"error": "Acesso negado."}), 403
 
     try:
@@ -680,10 +808,10 @@ def create_snapshot(vmid):
         description: Snapshot criado com sucesso
     """
     current_user_id = int(get_jwt_identity())
-    user = User.query.get(current_user_id)
+    identity = current_identity()
     resource = VirtualResource.query.filter_by(proxmox_vmid=vmid).first_or_404()
     
-    if resource.owner_id != current_user_id and not getattr(user, 'is_admin', False):
+    if resource.owner_id != current_user_id and not identity.is_admin:
          return jsonify({"error": "Acesso negado."}), 403
 
     data = request.get_json()
@@ -728,10 +856,10 @@ def rollback_snapshot(vmid, snapname):
         description: Rollback iniciado
     """
     current_user_id = int(get_jwt_identity())
-    user = User.query.get(current_user_id)
+    identity = current_identity()
     resource = VirtualResource.query.filter_by(proxmox_vmid=vmid).first_or_404()
     
-    if resource.owner_id != current_user_id and not getattr(user, 'is_admin', False):
+    if resource.owner_id != current_user_id and not identity.is_admin:
          return jsonify({"error": "Acesso negado."}), 403
 
     try:
@@ -769,10 +897,10 @@ def get_vnc_console(vmid):
         description: Credenciais do ticket VNC retornadas
     """
     current_user_id = int(get_jwt_identity())
-    user = User.query.get(current_user_id)
+    identity = current_identity()
     resource = VirtualResource.query.filter_by(proxmox_vmid=vmid).first_or_404()
 
-    if resource.owner_id != current_user_id and not getattr(user, 'is_admin', False):
+    if resource.owner_id != current_user_id and not identity.is_admin:
          return jsonify({"error": "Acesso negado."}), 403
 
     try:
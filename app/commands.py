@@ -1,5 +1,6 @@
 import click
 from flask.cli import with_appcontext
+from flask_migrate import stamp
 from app.extensions import db
 # CORREÇÃO: Removemos UserQuota e adicionamos SystemSetting
 from app.models import User, ServiceTemplate, VirtualResource, SystemSetting 
@@ -12,6 +13,8 @@ def init_db_command():
     # 1. Limpar Banco (Cuidado em produção!)
     db.drop_all()
     db.create_all()
+    # O schema criado já inclui todos os índices: marca as migrações como aplicadas
+    stamp()
     click.echo('Banco de dados recriado.')
 
     # 2. Criar Configurações Padrão do Sistema (System Settings)
@@ -71,4 +74,110 @@ def init_db_command():
     db.session.add(tmpl_vm)
 
     db.session.commit()
-    click.echo('Usuários e Templates criados com sucesso.')
\ No newline at end of file
+    click.echo('Usuários e Templates criados com sucesso.')
+
+@click.command('collect-usage')
+@click.option('--timeframe', default='hour', show_default=True,
+              help="Janela do rrddata no PVE ('hour' = pontos de 1 minuto).")
+@click.option('--skip-rollup', is_flag=True, help='Não recalcula os rollups diários.')
+@click.option('--skip-prune', is_flag=True, help='Não aplica a retenção.')
+@with_appcontext
+def collect_usage_command(timeframe, skip_rollup, skip_prune):
+    """Coleta o consumo real (rrddata) de guests e nodes. Agendar de hora em hora (cron)."""
+    from app.proxmox import proxmox_client
+    from app.services.usage import UsageCollector
+
+    collector = UsageCollector(proxmox_client)
+    stats = collector.collect(timeframe=timeframe)
+    click.echo(f"{stats['targets']} alvos lidos, {stats['rows']} pontos horários gravados.")
+
+    if not skip_rollup:
+        click.echo(f"{collector.rollup_daily()} pontos diários recalculados.")
+    if not skip_prune:
+        click.echo(f"{collector.prune()} pontos removidos pela retenção.")
+
+
+@click.command('sync-ldap-groups')
+@click.option('--dry-run', is_flag=True, help='Só mostra o que mudaria, sem gravar.')
+@click.option('--no-prune', is_flag=True, help='Não tira do grupo quem deixou de casar com o filtro.')
+@with_appcontext
+def sync_ldap_groups_command(dry_run, no_prune):
+    """Aplica o ldap_filter de cada grupo aos usuários (cria shadow users). Agendar via cron."""
+    from app.services.group_sync import LDAPGroupSync
+
+    stats = LDAPGroupSync().run(dry_run=dry_run, prune=not no_prune)
+    prefix = '[dry-run] ' if dry_run else ''
+    click.echo(
+        f"{prefix}{stats['groups']} grupos, {stats['entries']} entradas no LDAP: "
+        f"{stats['created']} criados, {stats['assigned']} atribuídos, "
+        f"{stats['removed']} removidos, {stats['skipped']} ignorados."
+    )
+    for error in stats['errors']:
+        click.echo(f"  Erro no grupo {error['group']}: {error['error']}", err=True)
+
+
+@click.command('preprovision')
+@click.option('--group', 'group_ref', help='Nome ou id do grupo (usuários do grupo + o ldap_filter dele).')
+@click.option('--ldap-filter', help='Filtro LDAP avulso, ex.: "(employeeType=aluno)".')
+@click.option('--dry-run', is_flag=True, help='Só mostra o que seria criado.')
+@click.option('--workers', type=int, help='Requisições simultâneas ao PVE (padrão: PREPROVISION_WORKERS).')
+@with_appcontext
+def preprovision_command(group_ref, ldap_filter, dry_run, workers):
+    """Pré-cria shadow users, usuários PVE, pools e ACLs de um grupo ou filtro LDAP."""
+    from app.models import UserGroup
+    from app.proxmox import proxmox_client
+    from app.services.preprovision import PreProvisioner
+
+    if not group_ref and not ldap_filter:
+        raise click.UsageError('Informe --group e/ou --ldap-filter.')
+
+    group = None
+    if group_ref:
+        group = (UserGroup.query.get(int(group_ref)) if group_ref.isdigit()
+                 else UserGroup.query.filter_by(name=group_ref).first())
+        if group is None:
+            raise click.BadParameter(f"Grupo '{group_ref}' não encontrado.", param_hint='--group')
+
+    stats = PreProvisioner(proxmox_client, workers=workers).run(group=group, ldap_filter=ldap_filter, dry_run=dry_run)
+    prefix = '[dry-run] ' if dry_run else ''
+    click.echo(
+        f"{prefix}{stats['users']} usuários: {stats['shadow_created']} shadow users, "
+        f"{stats['pve_users_created']} usuários PVE, {stats['pools_created']} pools e "
+        f"{stats['acls_created']} ACLs criados ({stats['skipped']} ignorados)."
+    )
+    for error in stats['errors']:
+        click.echo(f"  Erro em {error['username']}: {error['error']}", err=True)
+
+
+@click.command('seed-scale')
+@click.option('--groups', type=int, default=50, show_default=True)
+@click.option('--users', type=int, default=10000, show_default=True)
+@click.option('--templates', type=int, default=100, show_default=True)
+@click.option('--resources', type=int, default=100000, show_default=True)
+@click.option('--prefix', default='scale', show_default=True, help='Prefixo dos nomes (permite rodar mais de uma vez).')
+@click.option('--batch-size', type=int, default=50000, show_default=True, help='Linhas por COPY/INSERT.')
+@click.option('--seed', 'seed_value', type=int, default=42, show_default=True, help='Semente do gerador.')
+@click.option('--pve', is_flag=True, help='Cria os mesmos guests no PVE stand-in (benchmarks/pve_standin.py).')
+@click.option('--pve-url', help='URL da API do stand-in (padrão: https://PROXMOX_HOST/api2/json).')
+@with_appcontext
+def seed_scale_command(groups, users, templates, resources, prefix, batch_size, seed_value, pve, pve_url):
+    """Popula o banco com um dataset sintético grande (carga em lote / COPY). Só para dev/benchmark."""
+    import time
+    from flask import current_app
+    from app.services.seed_scale import ScaleSeeder
+
+    seeder = ScaleSeeder(prefix=prefix, batch_size=batch_size, seed=seed_value)
+    start = time.perf_counter()
+    stats = seeder.run(groups=groups, users=users, templates=templates, resources=resources, pve=pve)
+    loader = 'COPY' if seeder.use_copy else 'INSERT em lote'
+    click.echo(
+        f"{stats['groups']} grupos, {stats['users']} usuários, {stats['templates']} templates e "
+        f"{stats['resources']} recursos em {time.perf_counter() - start:.1f}s ({loader})."
+    )
+
+    if pve:
+        url = pve_url or f"https://{current_app.config['PROXMOX_HOST']}/api2/json"
+        start = time.perf_counter()
+        sent = seeder.populate_pve(url)
+        click.echo(f"PVE stand-in ({url}): {sent['guests']} guests e {sent['volumes']} volumes "
+                   f"em {time.perf_counter() - start:.1f}s.")
@@ -0,0 +1,153 @@
+# app/db_routing.py
+"""
+Roteamento de leitura para réplicas do Postgres.
+
+- As réplicas vêm de SQLALCHEMY_REPLICA_URIS (env DATABASE_REPLICA_URLS) e têm
+  engines próprias, criadas em init_replicas(app). Não são binds do
+  Flask-SQLAlchemy: create_all/drop_all nunca tocam nas réplicas.
+- Somente rotas marcadas com @read_replica, em requisições GET/HEAD, leem das réplicas.
+- Qualquer escrita (flush ou INSERT/UPDATE/DELETE em massa via session.execute)
+  fixa o resto da requisição no primário, e o mesmo usuário continua no primário
+  por SQLALCHEMY_REPLICA_STICKY_SECONDS (read-after-write: quem acabou de gravar
+  não lê dado atrasado da réplica).
+- A marca da última escrita viaja com o cliente, não fica no processo: a resposta
+  leva um token assinado (identidade + horário) no cookie WRITE_MARK_COOKIE e no
+  header X-DB-Write-Mark. A próxima requisição pode cair em outro worker ou
+  réplica da API; o navegador devolve o cookie, e clientes sem cookie podem ecoar
+  o header.
+
+Sem réplicas configuradas, tudo vai para o primário e nada muda.
+"""
+import random
+from functools import wraps
+
+from flask import g, has_request_context, request, current_app
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event
+import sqlalchemy as sa
+
+WRITE_MARK_COOKIE = 'nubemox_db_write'
+WRITE_MARK_HEADER = 'X-DB-Write-Mark'
+
+
+def init_replicas(app):
+    """Cria uma engine por réplica configurada. Chamado em app/__init__.py."""
+    engines = [
+        sa.create_engine(uri, pool_pre_ping=True)
+        for uri in app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    ]
+    app.extensions['db_replicas'] = engines
+    if engines:
+        app.after_request(_send_write_mark)
+
+
+def _current_identity():
+    try:
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='nubemox-db-write')
+
+
+def _wrote_recently(identity):
+    """O cliente trouxe uma marca de escrita deste usuário dentro da janela?"""
+    if identity is None:
+        return False
+    window = current_app.config.get('SQLALCHEMY_REPLICA_STICKY_SECONDS', 5)
+    for token in (request.headers.get(WRITE_MARK_HEADER), request.cookies.get(WRITE_MARK_COOKIE)):
+        if not token:
+            continue
+        try:
+            if _serializer().loads(token, max_age=window) == identity:
+                return True
+        except BadSignature:  # Inclui marca expirada (SignatureExpired)
+            continue
+    return False
+
+
+def _mark_write():
+    g.db_pinned_primary = True
+    identity = _current_identity()
+    if identity is not None:
+        g.db_write_identity = identity
+
+
+def _send_write_mark(response):
+    identity = g.get('db_write_identity')
+    if identity is not None:
+        token = _serializer().dumps(identity)
+        window = current_app.config.get('SQLALCHEMY_REPLICA_STICKY_SECONDS', 5)
+        response.set_cookie(WRITE_MARK_COOKIE, token, max_age=window, httponly=True,
+                            secure=request.is_secure, samesite='Lax')
+        response.headers[WRITE_MARK_HEADER] = token
+    return response
+
+
+def read_replica(view):
+    """
+    Marca uma rota somente-leitura como elegível para réplica.
+    Deve ficar ABAIXO de @jwt_required() para enxergar a identidade do token.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method in ('GET', 'HEAD') and not _wrote_recently(_current_identity()):
+            g.db_read_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """
+    Session do Flask-SQLAlchemy que direciona leituras para uma réplica
+    quando a requisição atual permite (ver @read_replica).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and self._replica_allowed(mapper):
+            engine = self._replica_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    @staticmethod
+    def _replica_allowed(mapper):
+        if not has_request_context():
+            return False
+        if not g.get('db_read_replica') or g.get('db_pinned_primary'):
+            return False
+        # Modelos com bind_key próprio continuam no seu bind
+        if mapper is not None:
+            table = sa.inspect(mapper).local_table
+            if table.metadata.info.get('bind_key') is not None:
+                return False
+        return True
+
+    @staticmethod
+    def _replica_engine():
+        # Escolhe uma réplica por requisição (leituras da mesma requisição ficam consistentes)
+        engine = g.get('db_replica_engine')
+        if engine is None:
+            replicas = current_app.extensions.get('db_replicas')
+            if not replicas:
+                return None
+            engine = g.db_replica_engine = random.choice(replicas)
+        return engine
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _pin_primary_after_write(session, flush_context):
+    if has_request_context():
+        _mark_write()
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _pin_primary_on_bulk_write(orm_execute_state):
+    # INSERT/UPDATE/DELETE via session.execute não passam pelo flush
+    if has_request_context() and (orm_execute_state.is_insert or orm_execute_state.is_update
+                                  or orm_execute_state.is_delete):
+        _mark_write()
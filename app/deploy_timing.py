@@ -0,0 +1,167 @@
+# app/deploy_timing.py
+"""
+Cronômetro por fase do deploy (POST /api/provisioning/deploy).
+
+Cada fase (validation, vmid, pool_user, create, onboot, start, status, db_commit)
+registra a duração e quantas chamadas HTTP ao PVE fez. 'pool_user' só garante
+que o pool e o usuário PVE existem (a ACL fica com o pré-provisionamento). O polling de tarefas
+(GET .../tasks/<upid>/status) é contado à parte: depende de quanto a tarefa
+demora no cluster, não do código.
+
+- Resposta: com DEBUG (ou DEPLOY_TIMING_IN_RESPONSE) o JSON do deploy traz 'timings'.
+- Métricas: janela dos últimos DEPLOY_TIMING_WINDOW deploys do processo, com
+  p50/p95/p99 e média/máximo de chamadas por fase (GET /api/admin/deploy-metrics).
+- Orçamento: deploy com mais de DEPLOY_PVE_CALL_BUDGET chamadas (sem o polling)
+  gera um warning no log e conta em 'over_budget'. tests/test_deploy_budget.py
+  falha com o mesmo orçamento, rodando o deploy contra o PVE stand-in.
+
+Com tracing ligado, cada fase também vira um span 'deploy.<fase>'.
+"""
+from collections import deque
+from contextlib import contextmanager
+import contextvars
+import logging
+import threading
+import time
+
+from flask import current_app
+
+from app import pve_instrumentation
+from app.services.health.base import latency_summary
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Contador da fase corrente; None fora de uma fase (chamadas não são contadas)
+_current_counter = contextvars.ContextVar('nubemox_deploy_counter', default=None)
+
+
+class _Counter:
+    __slots__ = ('calls', 'task_polls')
+
+    def __init__(self):
+        self.calls = 0
+        self.task_polls = 0
+
+
+class StepTimer:
+    """Duração e chamadas ao PVE de cada fase, na ordem em que rodaram."""
+
+    def __init__(self):
+        self.steps = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def step(self, name):
+        counter = _Counter()
+        token = _current_counter.set(counter)
+        start = time.perf_counter()
+        try:
+            with span(f'deploy.{name}'):
+                yield
+        finally:
+            _current_counter.reset(token)
+            self.steps.append({
+                'name': name,
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+                'pve_calls': counter.calls,
+                'task_polls': counter.task_polls,
+            })
+
+    @property
+    def pve_calls(self):
+        return sum(s['pve_calls'] for s in self.steps)
+
+    @property
+    def task_polls(self):
+        return sum(s['task_polls'] for s in self.steps)
+
+    def summary(self):
+        return {
+            'total_ms': round((time.perf_counter() - self._start) * 1000, 3),
+            'pve_calls': self.pve_calls,
+            'task_polls': self.task_polls,
+            'steps': list(self.steps),
+        }
+
+
+class DeployMetrics:
+    """Janela dos últimos deploys do processo, agregada por fase."""
+
+    def __init__(self, window=200):
+        self._deploys = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.failed = 0
+        self.over_budget = 0
+
+    def record(self, timer, ok=True, over_budget=False):
+        with self._lock:
+            if not ok:
+                self.failed += 1
+                return
+            self._deploys.append(timer.summary())
+            if over_budget:
+                self.over_budget += 1
+
+    def snapshot(self):
+        with self._lock:
+            deploys = list(self._deploys)
+            failed, over_budget = self.failed, self.over_budget
+
+        phases = {}
+        for deploy in deploys:
+            for step in deploy['steps']:
+                phases.setdefault(step['name'], []).append(step)
+
+        def aggregate(rows, key_ms='ms'):
+            calls = [r['pve_calls'] for r in rows]
+            return {
+                'count': len(rows),
+                'latency_ms': latency_summary([r[key_ms] for r in rows]),
+                'pve_calls_avg': round(sum(calls) / len(calls), 2) if calls else None,
+                'pve_calls_max': max(calls, default=None),
+                'task_polls_avg': round(sum(r['task_polls'] for r in rows) / len(rows), 2) if rows else None,
+            }
+
+        return {
+            'deploys': dict(aggregate(deploys, 'total_ms'), failed=failed, over_budget=over_budget),
+            'phases': {name: aggregate(rows) for name, rows in phases.items()},
+        }
+
+
+def timings_in_response():
+    return current_app.debug or current_app.config.get('DEPLOY_TIMING_IN_RESPONSE', False)
+
+
+def record_deploy(timer, ok=True):
+    """Guarda o deploy nas métricas e confere o orçamento de chamadas. Devolve True se estourou."""
+    budget = current_app.config.get('DEPLOY_PVE_CALL_BUDGET') or 0
+    over_budget = ok and budget > 0 and timer.pve_calls > budget
+    if over_budget:
+        logger.warning(
+            f"Deploy com {timer.pve_calls} chamadas ao PVE (orçamento: {budget}): "
+            + ', '.join(f"{s['name']}={s['pve_calls']}" for s in timer.steps)
+        )
+    metrics = current_app.extensions.get('deploy_metrics')
+    if metrics is not None:
+        metrics.record(timer, ok, over_budget)
+    return over_budget
+
+
+def init_deploy_timing(app):
+    """Métricas de deploy do processo e contagem das chamadas do proxmoxer. Chamado em app/__init__.py."""
+    app.extensions['deploy_metrics'] = DeployMetrics(app.config.get('DEPLOY_TIMING_WINDOW', 200))
+    pve_instrumentation.subscribe(_count_pve_call)
+    return app.extensions['deploy_metrics']
+
+
+def _count_pve_call(method, path):
+    """Conta as chamadas HTTP do proxmoxer feitas dentro de uma fase (inscrito em app.pve_instrumentation)."""
+    counter = _current_counter.get()
+    if counter is None:
+        return None
+    if method == 'GET' and '/tasks/' in path and path.endswith('/status'):
+        counter.task_polls += 1
+    else:
+        counter.calls += 1
+    return None
@@ -5,10 +5,12 @@ from flask_login import LoginManager
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 from app.proxmox import ProxmoxService
+from app.db_routing import RoutingSession
 
 # Inicialização das extensões
 # Nota: A vinculação com o app (init_app) é feita no __init__.py
-db = SQLAlchemy()
+# RoutingSession permite ler de réplicas nas rotas marcadas com @read_replica
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 cors = CORS()
 login_manager = LoginManager()
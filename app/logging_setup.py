@@ -0,0 +1,204 @@
+# app/logging_setup.py
+"""
+Logging da aplicação: fila + thread de escrita (QueueHandler / QueueListener).
+
+- Quem loga (a thread da requisição) só coloca o registro numa fila em memória;
+  a escrita no stdout / arquivo fica com a thread do QueueListener. Um terminal
+  lento ou um disco cheio não seguram a requisição.
+- LOG_FORMAT=json: um objeto por linha, com request_id (X-Request-Id), trace_id
+  (app/tracing.py), método e path, prontos para o coletor de logs.
+  LOG_FORMAT=text: formato legível para desenvolvimento.
+- LOG_LEVEL é o nível geral; LOG_LEVELS ajusta por módulo, por exemplo
+  'app.services.ldap_service=DEBUG,proxmoxer=WARNING,werkzeug=WARNING'.
+- LOG_FILE (opcional): arquivo com rotação por tamanho, além do stdout.
+
+Os ids de requisição/trace são lidos na thread que loga (filtro no QueueHandler),
+antes de o registro ir para a fila.
+"""
+import atexit
+import copy
+from datetime import datetime, timezone
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import os
+import queue
+import sys
+import uuid
+
+from flask import has_request_context, request
+from flask.logging import default_handler
+
+from app.tracing import current_trace_id
+
+REQUEST_ID_ENVIRON_KEY = 'nubemox.request_id'
+
+# Atributos padrão de um LogRecord (o que sobrar veio de extra={...})
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+_CONTEXT_ATTRS = ('request_id', 'trace_id', 'http_method', 'http_path')
+
+# Pipeline instalado no processo (um só, mesmo com vários create_app)
+_installed = None
+
+
+def current_request_id():
+    if not has_request_context():
+        return None
+    return request.environ.get(REQUEST_ID_ENVIRON_KEY)
+
+
+class RequestContextFilter(logging.Filter):
+    """Anexa request_id, trace_id, método e path ao registro (na thread que loga)."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = request.environ.get(REQUEST_ID_ENVIRON_KEY)
+            record.http_method = request.method
+            record.http_path = request.path
+        else:
+            record.request_id = record.http_method = record.http_path = None
+        record.trace_id = current_trace_id()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for attr in _CONTEXT_ATTRS:
+            value = getattr(record, attr, None)
+            if value is not None:
+                data[attr] = value
+        # Campos extras: logger.info('...', extra={'vmid': 101})
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in _CONTEXT_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = None
+        return super().format(record)
+
+
+class LogQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Como o QueueHandler padrão (mensagem já formatada, sem objetos de traceback
+        # na fila), mas o traceback vai em exc_text e não colado na mensagem
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+def parse_levels(value):
+    """'app.x=DEBUG, proxmoxer=warning' -> {'app.x': 'DEBUG', 'proxmoxer': 'WARNING'}"""
+    levels = {}
+    for item in (value or '').split(','):
+        name, sep, level = item.strip().partition('=')
+        if not sep or not name.strip():
+            continue
+        level = level.strip().upper()
+        if not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"LOG_LEVELS: nível inválido '{level}' para '{name.strip()}'")
+        levels[name.strip()] = level
+    return levels
+
+
+def _build_handlers(config):
+    formatter = JSONFormatter() if config.get('LOG_FORMAT', 'json') == 'json' else TextFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    log_file = config.get('LOG_FILE')
+    if log_file:
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handlers.append(RotatingFileHandler(
+            log_file, maxBytes=config.get('LOG_FILE_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=config.get('LOG_FILE_BACKUPS', 5), encoding='utf-8'
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def install_logging(config, handlers=None):
+    """
+    Instala o pipeline no logger raiz (substitui um anterior, se houver).
+    `handlers` permite trocar o destino (testes).
+    """
+    global _installed
+    shutdown_logging()
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = LogQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    listener = QueueListener(log_queue, *(handlers or _build_handlers(config)), respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(config.get('LOG_LEVEL', 'INFO'))
+    for name, level in parse_levels(config.get('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level)
+
+    listener.start()
+    _installed = (queue_handler, listener)
+    return listener
+
+
+def shutdown_logging():
+    """Esvazia a fila e remove o pipeline (no fim do processo ou antes de reinstalar)."""
+    global _installed
+    if _installed is None:
+        return
+    queue_handler, listener = _installed
+    logging.getLogger().removeHandler(queue_handler)
+    listener.stop()
+    _installed = None
+
+
+atexit.register(shutdown_logging)
+
+
+def init_request_id(app):
+    """X-Request-Id: reaproveita o do proxy/load balancer ou gera um, e devolve na resposta."""
+
+    @app.before_request
+    def _assign_request_id():
+        incoming = request.headers.get('X-Request-Id', '')
+        # Só aceita ids curtos e imprimíveis vindos de fora
+        if not incoming or len(incoming) > 128 or not incoming.isprintable():
+            incoming = uuid.uuid4().hex
+        request.environ[REQUEST_ID_ENVIRON_KEY] = incoming
+
+    @app.after_request
+    def _return_request_id(response):
+        request_id = current_request_id()
+        if request_id:
+            response.headers['X-Request-Id'] = request_id
+        return response
+
+
+def configure_logging(app):
+    """Chamado em app/__init__.py. Nos testes (TESTING) o logging do pytest fica intacto."""
+    init_request_id(app)
+    if app.testing:
+        return
+    # O handler padrão do Flask escreveria de forma síncrona (e em duplicidade)
+    app.logger.removeHandler(default_handler)
+    install_logging(app.config)
@@ -1,4 +1,5 @@
 from .settings import SystemSetting
 from .user import User, UserGroup
 from .catalog import ServiceTemplate
-from .provisioning import VirtualResource
\ No newline at end of file
+from .provisioning import VirtualResource
+from .usage import UsageRollup
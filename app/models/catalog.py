@@ -7,11 +7,11 @@ class ServiceTemplate(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     type = db.Column(db.String(20), nullable=False) # 'lxc' ou 'qemu'
-    proxmox_template_volid = db.Column(db.String(100), nullable=False) # ex: 100 ou local:vztmpl/...
+    proxmox_template_volid = db.Column(db.String(100), nullable=False, index=True) # ex: 100 ou local:vztmpl/...
     deploy_mode = db.Column(db.String(20), default='clone')
     
     description = db.Column(db.String(255))
-    is_active = db.Column(db.Boolean, default=True)
+    is_active = db.Column(db.Boolean, default=True, index=True)
     logo_url = db.Column(db.String(255))
     category = db.Column(db.String(50), default='os')
     
@@ -3,6 +3,14 @@ from datetime import datetime
 
 class VirtualResource(db.Model):
     __tablename__ = 'virtual_resource'
+    __table_args__ = (
+        # Índice das rotas de cota/listagem (filtram por dono, tipo e status).
+        # No Postgres as specs entram como INCLUDE: a soma da cota vira index-only scan.
+        db.Index(
+            'ix_virtual_resource_owner_type_status', 'owner_id', 'type', 'status',
+            postgresql_include=['cpu_cores', 'memory_mb', 'storage_gb']
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     proxmox_vmid = db.Column(db.Integer, unique=True, nullable=True)
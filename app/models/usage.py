@@ -0,0 +1,45 @@
+from app.extensions import db
+from datetime import datetime
+
+class UsageRollup(db.Model):
+    """
+    Série temporal de consumo REAL (vindo do rrddata do Proxmox), já agregada.
+    Uma linha por alvo (guest ou node) por intervalo: 'hour' ou 'day'.
+    Os valores seguem as unidades do PVE: cpu em fração (0..1), memória/disco em bytes,
+    rede em bytes/s.
+    """
+    __tablename__ = 'usage_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'target', 'resolution', 'bucket', name='uq_usage_rollup_point'),
+        # Retenção apaga por (resolution, bucket)
+        db.Index('ix_usage_rollup_resolution_bucket', 'resolution', 'bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(10), nullable=False)       # 'guest' ou 'node'
+    target = db.Column(db.String(64), nullable=False)      # VMID (guest) ou nome do node
+    resolution = db.Column(db.String(5), nullable=False)   # 'hour' ou 'day'
+    bucket = db.Column(db.DateTime, nullable=False)        # Início do intervalo (UTC)
+    samples = db.Column(db.Integer, default=0)             # Pontos do rrddata agregados
+
+    cpu_avg = db.Column(db.Float)
+    cpu_max = db.Column(db.Float)
+    mem_avg = db.Column(db.Float)
+    mem_max = db.Column(db.Float)
+    maxmem = db.Column(db.Float)
+    disk_avg = db.Column(db.Float)
+    maxdisk = db.Column(db.Float)
+    netin_avg = db.Column(db.Float)
+    netout_avg = db.Column(db.Float)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'bucket': self.bucket.isoformat(),
+            'samples': self.samples,
+            'cpu': {'avg': self.cpu_avg, 'max': self.cpu_max},
+            'memory': {'avg': self.mem_avg, 'max': self.mem_max, 'total': self.maxmem},
+            'disk': {'avg': self.disk_avg, 'total': self.maxdisk},
+            'network': {'in': self.netin_avg, 'out': self.netout_avg}
+        }
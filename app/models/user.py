@@ -1,6 +1,13 @@
+from flask import has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.base import NO_VALUE, NEVER_SET
+
 from app.extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.models.settings import SystemSetting 
+from app.services.credential_cache import invalidate_credentials
+from app.services.identity import invalidate_policy
+from app.services.passwords import DIRECTORY_MANAGED, LEGACY_SHADOW_PASSWORD, get_password_policy
 
 # --- NOVO MODELO: GRUPO DE USUÁRIOS ---
 class UserGroup(db.Model):
@@ -38,6 +45,10 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(256))
     is_admin = db.Column(db.Boolean, default=False)
+
+    # Incrementada a cada mudança de admin/grupo: tokens com versão antiga
+    # passam a usar o estado atual (ver app/services/identity.py)
+    policy_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Novo campo: Link para o Grupo
     group_id = db.Column(db.Integer, db.ForeignKey('user_group.id'), nullable=True)
@@ -55,34 +66,80 @@ class User(db.Model):
     quota_vms_override = db.Column(db.Integer, nullable=True)     
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # Esquema e custo vêm da configuração (app/services/passwords.py)
+        self.password_hash = get_password_policy().hash(password)
+        # Verificações em cache da senha antiga deixam de valer
+        invalidate_credentials(self.username)
 
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+    def set_directory_managed(self):
+        """Conta sem senha local: só autentica pelo LDAP (nenhum hash é calculado)."""
+        self.password_hash = DIRECTORY_MANAGED
+        invalidate_credentials(self.username)
 
     @property
-    def quota(self):
+    def is_directory_managed(self):
+        return self.password_hash == DIRECTORY_MANAGED
+
+    def check_password(self, password):
+        # A senha-marcador antiga dos shadow users nunca vale como senha local
+        if password == LEGACY_SHADOW_PASSWORD:
+            return False
+        return get_password_policy().verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """Hash gravado com esquema/custo diferente do configurado (refazer no login)."""
+        return get_password_policy().needs_rehash(self.password_hash)
+
+    def bump_policy_version(self):
         """
-        Calcula a cota efetiva baseada na hierarquia:
-        User Override > User Group > System Settings
+        Invalida as claims dos tokens já emitidos. Chamado automaticamente quando
+        is_admin, group_id ou group mudam pelo ORM (ver _policy_changed); as
+        atualizações em lote (UPDATE) incrementam a coluna por conta própria.
+        """
+        self.policy_version = (self.policy_version or 0) + 1
+
+    @staticmethod
+    def default_quota_limits():
+        """Cota base de quem não tem grupo (System Settings). Leia uma vez por listagem."""
+        return {
+            "vms": SystemSetting.get_int('default_quota_vms', 2),
+            "cpu": SystemSetting.get_int('default_quota_cpu', 2),
+            "memory": SystemSetting.get_int('default_quota_memory', 2048),
+            "storage": SystemSetting.get_int('default_quota_storage', 20),
+        }
+
+    def quota_limits(self, defaults=None):
+        """
+        Limites efetivos (User Override > User Group > System Settings), sem
+        olhar os recursos. `defaults`: default_quota_limits() já lido, para listagens.
         """
         # 1. Determina os valores base (Do Grupo ou do Sistema)
         if self.group:
-            base_vms = self.group.max_vms
-            base_cpu = self.group.max_cpu
-            base_mem = self.group.max_memory
-            base_store = self.group.max_storage
+            base = {
+                "vms": self.group.max_vms,
+                "cpu": self.group.max_cpu,
+                "memory": self.group.max_memory,
+                "storage": self.group.max_storage,
+            }
         else:
-            base_vms = SystemSetting.get_int('default_quota_vms', 2)
-            base_cpu = SystemSetting.get_int('default_quota_cpu', 2)
-            base_mem = SystemSetting.get_int('default_quota_memory', 2048)
-            base_store = SystemSetting.get_int('default_quota_storage', 20)
+            base = defaults if defaults is not None else self.default_quota_limits()
 
         # 2. Aplica Overrides (se existirem)
-        limit_vms = self.quota_vms_override if self.quota_vms_override is not None else base_vms
-        limit_cpu = self.quota_cpu_override if self.quota_cpu_override is not None else base_cpu
-        limit_mem = self.quota_memory_override if self.quota_memory_override is not None else base_mem
-        limit_store = self.quota_storage_override if self.quota_storage_override is not None else base_store
+        overrides = {
+            "vms": self.quota_vms_override,
+            "cpu": self.quota_cpu_override,
+            "memory": self.quota_memory_override,
+            "storage": self.quota_storage_override,
+        }
+        return {key: overrides[key] if overrides[key] is not None else base[key] for key in base}
+
+    @property
+    def quota(self):
+        """
+        Calcula a cota efetiva baseada na hierarquia:
+        User Override > User Group > System Settings
+        """
+        limit = self.quota_limits()
 
         # 3. Calcular uso atual (soma do banco de dados)
         # Nota: Idealmente usamos COALESCE no SQL, mas aqui fazemos em Python para simplificar
@@ -100,16 +157,57 @@ class User(db.Model):
             used_store += (res.storage_gb or 0)
 
         return {
-            "limit": {
-                "vms": limit_vms,
-                "cpu": limit_cpu,
-                "memory": limit_mem,
-                "storage": limit_store
-            },
+            "limit": limit,
             "used": {
                 "vms": used_vms,
                 "cpu": used_cpu,
                 "memory": used_mem,
                 "storage": used_store
             }
-        }
\ No newline at end of file
+        }
+
+
+# --- VERSÃO DE POLÍTICA (app/services/identity.py) ---
+# Mudou admin ou grupo pelo ORM: a versão sobe uma vez por transação e a entrada
+# do usuário sai do cache de políticas deste processo depois do commit.
+def _bump_once(user):
+    if user.id is None:
+        return  # Usuário novo: nenhum token foi emitido ainda
+    session = object_session(user)
+    changed = session.info.setdefault('policy_changed', set()) if session is not None else set()
+    if user.id not in changed:
+        user.bump_policy_version()
+        changed.add(user.id)
+
+
+@event.listens_for(User.is_admin, 'set')
+@event.listens_for(User.group_id, 'set')
+def _policy_column_changed(target, value, oldvalue, initiator):
+    if oldvalue not in (NO_VALUE, NEVER_SET) and value != oldvalue:
+        _bump_once(target)
+
+
+def _policy_group_changed(target, value, oldvalue, initiator):
+    # O valor antigo do relacionamento pode não estar carregado: compara pelo group_id
+    if value is None or value.id is None or value.id != target.group_id:
+        if value is not None or target.group_id is not None:
+            _bump_once(target)
+
+
+@event.listens_for(User, 'mapper_configured')
+def _listen_group_changes(mapper, cls):
+    # User.group é backref de UserGroup.users: só existe depois da configuração dos mappers
+    event.listen(cls.group, 'set', _policy_group_changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_policies(session):
+    changed = session.info.pop('policy_changed', None)
+    if changed and has_app_context():
+        for user_id in changed:
+            invalidate_policy(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_policies(session):
+    session.info.pop('policy_changed', None)
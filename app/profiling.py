@@ -0,0 +1,196 @@
+# app/profiling.py
+"""
+Profiler sob demanda por requisição, controlado em runtime (sem restart).
+
+Uma requisição é perfilada (cProfile) quando:
+- um admin envia o header PROFILING_HEADER (padrão `X-Profile: 1`), sempre, ou
+- a amostragem está ligada e a requisição cai na taxa (0..1). A amostragem começa
+  como PROFILING_ENABLED/PROFILING_SAMPLE_RATE e muda em
+  PUT /api/admin/profiles/settings (vale para o processo que atendeu).
+
+Um perfil por vez no processo: o cProfile é global ao interpretador (no Python
+3.12+ um segundo Profile ativo estoura "Another profiling tool is already
+active"), então uma requisição que chega com outro perfil rodando segue sem
+perfil e conta em 'skipped'.
+
+O resultado (rota, método, status, duração, usuário, trace_id e as funções mais
+caras) fica num buffer em memória com os últimos PROFILING_MAX_PROFILES perfis do
+processo; com PROFILING_DIR, o .prof completo também vai para disco (abre com
+`python -m pstats` ou snakeviz). A resposta perfilada traz X-Profile-Id.
+
+Admin: GET /api/admin/profiles (mais lentos primeiro) e GET /api/admin/profiles/<id>.
+
+Só a thread da requisição é perfilada (threads do health check e do
+pré-provisionamento ficam de fora).
+"""
+from collections import deque
+import cProfile
+import itertools
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from datetime import datetime
+
+from flask import g, request
+from flask_jwt_extended import verify_jwt_in_request
+
+from app.services.identity import IDENTITY_ENVIRON_KEY, current_identity
+from app.tracing import current_trace_id
+
+logger = logging.getLogger(__name__)
+
+# Um cProfile ativo por interpretador (ver docstring do módulo)
+_profiler_lock = threading.Lock()
+
+
+class ProfileStore:
+    """Últimos perfis do processo (buffer circular)."""
+
+    def __init__(self, max_profiles=50, directory=None, top=30, sampling=False, sample_rate=0.0):
+        self.directory = directory
+        self.top = top
+        self.sampling = sampling
+        self.sample_rate = sample_rate
+        self.skipped = 0  # Pedidos de perfil descartados por já haver um rodando
+        self._profiles = deque(maxlen=max_profiles)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def settings(self):
+        return {'sampling': self.sampling, 'sample_rate': self.sample_rate, 'skipped': self.skipped}
+
+    def sampled(self):
+        return self.sampling and self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def skip(self):
+        with self._lock:
+            self.skipped += 1
+
+    def next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, profiler, metadata):
+        stats = pstats.Stats(profiler)
+        record = dict(metadata, functions=self._top_functions(stats))
+        if self.directory:
+            path = os.path.join(self.directory, f"{metadata['started_at'][:19].replace(':', '')}-{metadata['id']}.prof")
+            stats.dump_stats(path)
+            record['file'] = path
+        with self._lock:
+            self._profiles.append(record)
+        return record
+
+    def _top_functions(self, stats):
+        """As `top` funções de maior tempo acumulado."""
+        rows = []
+        for (filename, line, function), (calls, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                'function': f"{function} ({os.path.basename(filename)}:{line})",
+                'calls': ncalls,
+                'tottime_ms': round(tottime * 1000, 3),
+                'cumtime_ms': round(cumtime * 1000, 3),
+            })
+        rows.sort(key=lambda r: r['cumtime_ms'], reverse=True)
+        return rows[:self.top]
+
+    def slowest(self, limit=20, route=None):
+        """Resumo dos perfis (sem a lista de funções), do mais lento para o mais rápido."""
+        with self._lock:
+            profiles = list(self._profiles)
+        if route:
+            profiles = [p for p in profiles if p['route'] == route]
+        profiles.sort(key=lambda p: p['duration_ms'], reverse=True)
+        return [{k: v for k, v in p.items() if k != 'functions'} for p in profiles[:limit]]
+
+    def get(self, profile_id):
+        with self._lock:
+            return next((p for p in self._profiles if p['id'] == profile_id), None)
+
+
+def _requested_by_admin(header):
+    if request.headers.get(header) not in ('1', 'true'):
+        return False
+    try:
+        verify_jwt_in_request(optional=True)
+        return current_identity().is_admin
+    except Exception:
+        return False
+
+
+def init_profiling(app):
+    """Registra os hooks do profiler. Chamado em app/__init__.py."""
+    store = ProfileStore(
+        max_profiles=app.config.get('PROFILING_MAX_PROFILES', 50),
+        directory=app.config.get('PROFILING_DIR'),
+        top=app.config.get('PROFILING_TOP', 30),
+        sampling=bool(app.config.get('PROFILING_ENABLED')),
+        sample_rate=app.config.get('PROFILING_SAMPLE_RATE', 0.0),
+    )
+    app.extensions['profiler'] = store
+    header = app.config.get('PROFILING_HEADER', 'X-Profile')
+
+    @app.before_request
+    def _start_profile():
+        reason = 'header' if _requested_by_admin(header) else 'sample' if store.sampled() else None
+        if reason is None:
+            return
+        if not _profiler_lock.acquire(blocking=False):
+            store.skip()
+            return
+        profiler = cProfile.Profile()
+        g.profile = {'id': store.next_id(), 'profiler': profiler, 'reason': reason,
+                     'start': time.perf_counter(), 'started_at': datetime.utcnow().isoformat()}
+        try:
+            profiler.enable()
+        except Exception as e:
+            # Outra ferramenta (debugger, coverage no 3.12+) já ocupa o profiler
+            g.pop('profile', None)
+            _profiler_lock.release()
+            store.skip()
+            logger.warning(f"Profiler indisponível em {request.path}: {e}")
+
+    @app.after_request
+    def _profile_status(response):
+        profile = g.get('profile')
+        if profile is not None:
+            profile['status'] = response.status_code
+            response.headers['X-Profile-Id'] = str(profile['id'])
+        return response
+
+    @app.teardown_request
+    def _finish_profile(error=None):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+        profile['profiler'].disable()
+        _profiler_lock.release()
+        duration_ms = (time.perf_counter() - profile['start']) * 1000
+        try:
+            store.add(profile['profiler'], {
+                'id': profile['id'],
+                'route': request.url_rule.rule if request.url_rule is not None else None,
+                'path': request.path,
+                'method': request.method,
+                'status': profile.get('status', 500),
+                'duration_ms': round(duration_ms, 2),
+                'started_at': profile['started_at'],
+                'reason': profile['reason'],
+                'user_id': _user_id(),
+                'trace_id': current_trace_id(),
+            })
+        except Exception as e:
+            logger.warning(f"Falha ao guardar o perfil de {request.path}: {e}")
+
+    return store
+
+
+def _user_id():
+    # Só existe se a rota (ou o header de profile) já resolveu a identidade do JWT
+    identity = request.environ.get(IDENTITY_ENVIRON_KEY)
+    return identity.id if identity is not None else None
@@ -0,0 +1,60 @@
+# app/proxmox/cache.py
+import threading
+import time
+
+
+class ExistenceCache:
+    """
+    Cache de existência de objetos do PVE que só o Nubemox cria/remove:
+    pools e usuários (userid), checados no deploy, e ACLs (path, userid, role),
+    usadas pelo pré-provisionamento (o deploy não concede ACL).
+
+    Cada coleção é carregada inteira de uma vez (uma listagem) e vale por
+    `ttl` segundos. Nossas próprias escritas atualizam o cache na hora
+    (add/discard), então deploys repetidos do mesmo usuário não tocam no PVE.
+    Objetos removidos por fora do Nubemox só são percebidos após o TTL.
+    """
+
+    KINDS = ('pools', 'users', 'acls')
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._items = {kind: set() for kind in self.KINDS}
+        self._loaded_at = {kind: None for kind in self.KINDS}
+        self._lock = threading.Lock()
+
+    def is_fresh(self, kind):
+        loaded_at = self._loaded_at[kind]
+        return loaded_at is not None and (time.monotonic() - loaded_at) < self.ttl
+
+    def load(self, kind, keys):
+        """Substitui a coleção inteira (resultado de uma listagem)."""
+        with self._lock:
+            self._items[kind] = set(keys)
+            self._loaded_at[kind] = time.monotonic()
+
+    def contains(self, kind, key, loader=None):
+        """
+        True/False se a coleção estiver carregada. Se estiver vencida, chama
+        `loader()` (que deve devolver todas as chaves) e recarrega antes de responder.
+        """
+        if not self.is_fresh(kind):
+            if loader is None:
+                return False
+            self.load(kind, loader())
+        with self._lock:
+            return key in self._items[kind]
+
+    def add(self, kind, key):
+        with self._lock:
+            self._items[kind].add(key)
+
+    def discard(self, kind, key):
+        with self._lock:
+            self._items[kind].discard(key)
+
+    def invalidate(self, kind=None):
+        with self._lock:
+            for k in ([kind] if kind else self.KINDS):
+                self._items[k] = set()
+                self._loaded_at[k] = None
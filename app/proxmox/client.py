@@ -1,9 +1,13 @@
 from proxmoxer import ProxmoxAPI, ResourceException
 from flask import current_app
 import logging
+import threading
 import time
 import urllib3
 
+from app.tracing import span
+from .cache import ExistenceCache
+
 # Silencia avisos de certificado auto-assinado (comum em Proxmox)
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -22,6 +26,11 @@ class ProxmoxClient:
         self.config = None
         self._connection = None
         self._cached_first_node_id = None
+        # Pools/usuários/ACLs já existentes no PVE (ver app/proxmox/cache.py)
+        self.existence = ExistenceCache()
+        # Tarefas do PVE que este processo está aguardando agora (health check)
+        self._tasks_waiting = 0
+        self._tasks_lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
 
     def init_app(self, app):
@@ -30,6 +39,7 @@ class ProxmoxClient:
         Chamado em app/__init__.py.
         """
         self.config = app.config
+        self.existence.ttl = self.config.get('PROXMOX_EXISTENCE_CACHE_TTL', 300)
         
         # Validação básica
         if not self.config.get('PROXMOX_HOST'):
@@ -113,7 +123,21 @@ class ProxmoxClient:
         """
         if not task_upid or not str(task_upid).startswith('UPID:'):
             return # Não é uma tarefa válida, ignora
-        
+
+        with self._tasks_lock:
+            self._tasks_waiting += 1
+        try:
+            with span('pve.task_wait', 'pve', **{'pve.upid': str(task_upid), 'pve.node': node_id}):
+                return self._poll_task(task_upid, node_id, timeout)
+        finally:
+            with self._tasks_lock:
+                self._tasks_waiting -= 1
+
+    @property
+    def tasks_waiting(self):
+        return self._tasks_waiting
+
+    def _poll_task(self, task_upid, node_id, timeout):
         start_time = time.time()
         
         # Tenta ler timeout da config ou usa padrão
@@ -1,5 +1,8 @@
 # app/proxmox/resources/access.py
 from flask import current_app
+from proxmoxer import ResourceException
+from app.tracing import traced
+
 
 class AccessManager:
     """Mixin para gerenciamento de Usuários e Permissões (ACLs) no PVE."""
@@ -7,28 +10,48 @@ class AccessManager:
     def get_users(self):
         return {'data': self.connection.access.users.get()}
 
+    @staticmethod
+    def pve_userid(username, realm=None):
+        """ID do usuário no PVE (ex: 'tiago@pve-ldap')."""
+        # Se não passar realm, tenta pegar do config ou usa 'pam'
+        if not realm:
+            realm = current_app.config.get('PROXMOX_AUTH_REALM', 'pam')
+        return f"{username}@{realm}"
+
+    @traced()
     def ensure_pve_user(self, username, realm=None):
         """
         Garante que o usuário exista no PVE mapeado para o Realm correto.
         Ex: cria 'tiago@pve-ldap' se não existir.
         """
-        # Se não passar realm, tenta pegar do config ou usa 'pam'
-        if not realm:
-            realm = current_app.config.get('PROXMOX_AUTH_REALM', 'pam')
-            
-        pve_userid = f"{username}@{realm}"
-        
-        # Verifica se já existe (para evitar erro 400 ou 500 desnecessário)
-        users = self.connection.access.users.get()
-        exists = any(u.get('userid') == pve_userid for u in users)
-        
-        if not exists:
-            # Cria o usuário. Não definimos senha pois a autenticação é delegada ao Realm.
+        pve_userid = self.pve_userid(username, realm)
+
+        # Existência vem do cache (uma listagem de /access/users por TTL, não uma por deploy)
+        if self.existence.contains('users', pve_userid, loader=self.list_pve_userids):
+            return pve_userid
+
+        # Cria o usuário. Não definimos senha pois a autenticação é delegada ao Realm.
+        try:
             self.connection.access.users.post(userid=pve_userid, enable=1, comment="Gerenciado pelo Nubemox")
-            print(f"Usuário PVE {pve_userid} criado.")
-        
+            self.logger.info(f"Usuário PVE {pve_userid} criado.")
+        except ResourceException as e:
+            # Criado por outro worker entre a listagem e agora
+            if 'already exists' not in str(e):
+                raise
+        self.existence.add('users', pve_userid)
+
         return pve_userid
 
+    def list_pve_userids(self):
+        return [u.get('userid') for u in self.connection.access.users.get()]
+
+    def list_user_acls(self):
+        """ACLs de usuários como (path, userid, role)."""
+        return [
+            (a.get('path'), a.get('ugid'), a.get('roleid'))
+            for a in self.connection.access.acl.get() if a.get('type') == 'user'
+        ]
+
     def set_pool_permission(self, poolid, pve_userid, role='PVEVMUser'):
         """
         Define permissão (ACL) sobre um Pool.
@@ -43,8 +66,8 @@ class AccessManager:
                 roles=role,
                 users=pve_userid
             )
+            self.existence.add('acls', (f"/pool/{poolid}", pve_userid, role))
             return {'message': f"Permissão {role} concedida a {pve_userid} em {poolid}"}
         except Exception as e:
-            # Logar erro mas não quebrar o fluxo se for algo menor
-            print(f"Erro ao definir ACL: {e}")
+            self.logger.error(f"Erro ao definir ACL: {e}")
             raise e
\ No newline at end of file
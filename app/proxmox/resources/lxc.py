@@ -1,3 +1,6 @@
+from app.tracing import traced
+
+
 class LXCManager:
     """Mixin responsável por operações de Contêineres (LXC)."""
 
@@ -14,6 +17,7 @@ class LXCManager:
         node_id = self._resolve_node_id()
         return {'data': self.connection.nodes(node_id).lxc(ctid).status.current.get()}
 
+    @traced()
     def create_container(self, config: dict):
         node_id = self._resolve_node_id()
         vmid = config.get('vmid') or self.get_next_vmid()
@@ -36,6 +40,7 @@ class LXCManager:
         self._wait_for_task_completion(upid, node_id)
         return {'ctid': vmid, 'message': f'CT {vmid} criado com sucesso.'}
 
+    @traced()
     def clone_container(self, source_vmid, new_vmid, name, poolid=None, full_clone=True):
         node_id = self._resolve_node_id()
         params = {
@@ -49,6 +54,7 @@ class LXCManager:
         self._wait_for_task_completion(upid, node_id)
         return {'ctid': new_vmid, 'message': f"CT {new_vmid} clonado."}
 
+    @traced()
     def update_container_resources(self, ctid, updates: dict):
         node_id = self._resolve_node_id()
         valid_keys = ['memory', 'cores', 'rootfs', 'swap', 'net0', 'hostname']
@@ -60,6 +66,7 @@ class LXCManager:
                 self._wait_for_task_completion(res, node_id)
         return {'message': f'CT {ctid} atualizado.'}
 
+    @traced()
     def start_container(self, ctid):
         node_id = self._resolve_node_id()
         upid = self.connection.nodes(node_id).lxc(ctid).status.start.post()
@@ -83,6 +90,7 @@ class LXCManager:
         self._wait_for_task_completion(upid, node_id)
         return {'message': f'CT {ctid} excluído.'}
     
+    @traced()
     def resize_disk(self, vmid, new_size_gb, disk='rootfs'):
         node_id = self._resolve_node_id()
         size_str = f"{new_size_gb}G"
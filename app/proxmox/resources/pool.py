@@ -1,4 +1,6 @@
 from proxmoxer import ResourceException
+from app.tracing import traced
+
 
 class PoolManager:
     """Mixin para gerenciamento de Resource Pools."""
@@ -7,31 +9,46 @@ class PoolManager:
         pools = self.connection.pools.get()
         return {'data': pools, 'count': len(pools)}
 
+    @traced()
     def create_pool(self, poolid, comment=None):
         params = {'poolid': poolid}
         if comment: params['comment'] = comment
         
         try:
             self.connection.pools.post(**params)
+            self.existence.add('pools', poolid)
             return {'success': True, 'message': f'Pool {poolid} criado.'}
         except ResourceException as e:
             # Se o erro for "já existe", não é um problema grave
             if 'already exists' in str(e):
+                self.existence.add('pools', poolid)
                 return {'success': True, 'message': f'Pool {poolid} já existe.', 'existing': True}
             raise e
 
     def delete_pool(self, poolid):
         self.connection.pools(poolid).delete()
+        self.existence.discard('pools', poolid)
         return {'message': f'Pool {poolid} excluído.'}
 
+    def list_pool_ids(self):
+        return [p.get('poolid') for p in self.connection.pools.get()]
+
+    @staticmethod
+    def user_pool_id(username):
+        """ID do pool dedicado ao usuário (ex: 'vps-tiago')."""
+        # Sanitização simples (remove espaços, lowercase)
+        safe_name = username.lower().replace(' ', '-')
+        return f"vps-{safe_name}"
+
+    @traced()
     def ensure_user_pool(self, username):
         """
         Helper de Negócio: Garante que o pool do usuário exista.
         Retorna o ID do pool (ex: 'vps-tiago').
         """
-        # Sanitização simples (remove espaços, lowercase)
-        safe_name = username.lower().replace(' ', '-')
-        poolid = f"vps-{safe_name}"
-        
+        poolid = self.user_pool_id(username)
+        # Uma listagem por TTL serve a todos os usuários; deploys repetidos não tocam no PVE
+        if self.existence.contains('pools', poolid, loader=self.list_pool_ids):
+            return poolid
         self.create_pool(poolid, comment=f"Pool dedicado ao usuário: {username}")
         return poolid
\ No newline at end of file
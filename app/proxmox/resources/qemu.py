@@ -1,3 +1,6 @@
+from app.tracing import traced
+
+
 class QEMUManager:
     """Mixin responsável por Máquinas Virtuais (KVM/QEMU)."""
 
@@ -6,6 +9,7 @@ class QEMUManager:
         vms = self.connection.nodes(node_id).qemu.get()
         return {'data': vms, 'count': len(vms)}
 
+    @traced()
     def create_vm(self, config: dict):
         node_id = self._resolve_node_id()
         vmid = config.get('vmid') or self.get_next_vmid()
@@ -26,6 +30,7 @@ class QEMUManager:
         self._wait_for_task_completion(upid, node_id)
         return {'vmid': vmid, 'message': f'VM {vmid} criada.'}
 
+    @traced()
     def start_vm(self, vmid):
         node_id = self._resolve_node_id()
         upid = self.connection.nodes(node_id).qemu(vmid).status.start.post()
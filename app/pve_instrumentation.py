@@ -0,0 +1,51 @@
+# app/pve_instrumentation.py
+"""
+Gancho único nas chamadas HTTP do proxmoxer (ProxmoxResource._request).
+
+Quem observa as chamadas ao PVE (tracing, cronômetro do deploy) se inscreve com
+subscribe(hook) em vez de fazer o próprio monkeypatch. `hook(method, path)` roda
+antes de cada chamada e devolve um context manager que envolve a chamada (ex.
+um span) ou None para só observar. `path` vem sem o prefixo /api2/json.
+
+O patch é instalado uma vez, na primeira inscrição; os hooks rodam na ordem em
+que se inscreveram, qualquer que seja a ordem de init em app/__init__.py.
+"""
+from contextlib import ExitStack
+import functools
+import threading
+
+_hooks = ()  # Trocado inteiro a cada inscrição: a chamada itera sem lock
+_lock = threading.Lock()
+_installed = False
+
+
+def subscribe(hook):
+    """Inscreve `hook` nas chamadas do proxmoxer (idempotente)."""
+    global _hooks
+    with _lock:
+        if hook not in _hooks:
+            _hooks = _hooks + (hook,)
+        _install()
+
+
+def _install():
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    from proxmoxer.core import ProxmoxResource
+    original = ProxmoxResource._request
+
+    @functools.wraps(original)
+    def _request(self, method, data=None, params=None):
+        hooks = _hooks
+        path = self._store['base_url'].split('/api2/json', 1)[-1] or '/'
+        with ExitStack() as stack:
+            for hook in hooks:
+                wrapper = hook(method, path)
+                if wrapper is not None:
+                    stack.enter_context(wrapper)
+            return original(self, method, data, params)
+
+    ProxmoxResource._request = _request
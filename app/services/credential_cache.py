@@ -0,0 +1,134 @@
+# app/services/credential_cache.py
+"""
+Cache curto de verificação de credenciais (opcional, LOGIN_CACHE_ENABLED).
+
+Em rajadas de login (turma inteira entrando, várias abas, re-login após
+expirar o token) o mesmo usuário repete a mesma senha várias vezes em poucos
+minutos. Em vez de refazer o bind/busca no LDAP (ou o hash lento da senha
+local), reaproveitamos o resultado da última verificação.
+
+Segurança:
+- A senha nunca é guardada. A chave é username + scrypt(senha, salt) com um
+  salt aleatório do processo: um dump da memória não dá um hash rápido de atacar.
+- Entradas positivas valem LOGIN_CACHE_TTL segundos; negativas (senha errada)
+  valem LOGIN_CACHE_NEGATIVE_TTL e só são gravadas quando o diretório de fato
+  respondeu (LDAP fora do ar não vira "senha errada" em cache).
+- invalidate(username) derruba tudo do usuário (troca de senha, bloqueio).
+  O cache é local ao processo: em vários workers a invalidação vale para o
+  worker atual e os demais expiram pelo TTL.
+"""
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+# Senhas erradas distintas guardadas por usuário (evita que um ataque encha o cache)
+MAX_NEGATIVE_PER_USER = 4
+
+
+class CredentialCache:
+    def __init__(self, ttl=300, negative_ttl=30, max_users=10000, scrypt_n=4096):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_users = max_users
+        self.scrypt_n = scrypt_n
+        self._salt = os.urandom(16)
+        # username -> {digest: (ok, data, expires_at)}, em ordem de uso (LRU)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, username, password):
+        # Memory-hard: scrypt com n=4096, r=8 usa ~4 MB por cálculo
+        return hashlib.scrypt(
+            f'{username}\0{password}'.encode('utf-8'),
+            salt=self._salt, n=self.scrypt_n, r=8, p=1, dklen=32
+        )
+
+    def lookup(self, username, password):
+        """
+        Retorna (True, data) para credencial válida em cache, (False, None) para
+        senha errada em cache, ou None se não houver entrada válida.
+        """
+        with self._lock:
+            if username not in self._entries:
+                return None
+
+        digest = self._digest(username, password)
+        now = time.monotonic()
+        with self._lock:
+            user_entries = self._entries.get(username)
+            if not user_entries:
+                return None
+            for key, (ok, data, expires_at) in list(user_entries.items()):
+                if expires_at <= now:
+                    del user_entries[key]
+                elif hmac.compare_digest(key, digest):
+                    self._entries.move_to_end(username)
+                    return ok, data
+            if not user_entries:
+                del self._entries[username]
+        return None
+
+    def store(self, username, password, ok, data=None):
+        digest = self._digest(username, password)
+        expires_at = time.monotonic() + (self.ttl if ok else self.negative_ttl)
+        with self._lock:
+            user_entries = self._entries.setdefault(username, {})
+            if ok:
+                # Uma senha válida por vez: a anterior (se trocou) deixa de valer
+                for key in [k for k, entry in user_entries.items() if entry[0]]:
+                    del user_entries[key]
+            else:
+                negatives = [k for k, entry in user_entries.items() if not entry[0]]
+                if len(negatives) >= MAX_NEGATIVE_PER_USER:
+                    del user_entries[negatives[0]]
+            user_entries[digest] = (ok, data, expires_at)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username):
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_credential_cache():
+    """
+    Cache do processo, ou None se LOGIN_CACHE_ENABLED estiver desligado.
+    """
+    global _cache
+    config = current_app.config
+    if not config.get('LOGIN_CACHE_ENABLED'):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CredentialCache(
+                    ttl=config.get('LOGIN_CACHE_TTL', 300),
+                    negative_ttl=config.get('LOGIN_CACHE_NEGATIVE_TTL', 30),
+                    max_users=config.get('LOGIN_CACHE_MAX_USERS', 10000),
+                    scrypt_n=config.get('LOGIN_CACHE_SCRYPT_N', 4096),
+                )
+    return _cache
+
+
+def invalidate_credentials(username):
+    """Remove as verificações em cache do usuário (se o cache existir)."""
+    if _cache is not None:
+        _cache.invalidate(username)
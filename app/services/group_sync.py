@@ -0,0 +1,216 @@
+# app/services/group_sync.py
+"""
+Sincronização em lote LDAP -> UserGroup, usando o UserGroup.ldap_filter.
+
+Para cada grupo com filtro:
+1. Busca paginada no diretório (Simple Paged Results), só uid/mail.
+2. Se um usuário casar com mais de um grupo, vale o grupo de menor id.
+3. Usuários que ainda não logaram viram shadow users (INSERT em lote, já com o grupo).
+4. Um UPDATE em lote por grupo para quem mudou de grupo e, com prune, outro
+   para tirar do grupo quem saiu do filtro.
+
+Agendar via cron: `flask sync-ldap-groups` (ver app/commands.py).
+"""
+import logging
+
+from flask import current_app
+from ldap3 import Connection, SUBTREE
+from sqlalchemy import insert, select, update
+
+from app.extensions import db
+from app.models import User, UserGroup
+from app.services.identity import invalidate_policy
+from app.services.ldap_service import get_ldap_pool
+from app.services.passwords import DIRECTORY_MANAGED
+
+logger = logging.getLogger(__name__)
+
+# Limite de parâmetros por IN (Postgres aceita até 65535 por statement)
+IN_CHUNK_SIZE = 10000
+
+
+def chunks(items, size=IN_CHUNK_SIZE):
+    """Fatias de até `size` itens (IN com muitos parâmetros, lotes de executemany)."""
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def normalize_filter(ldap_filter):
+    """O admin pode colar 'memberOf=cn=...' sem parênteses; o LDAP exige '(...)'."""
+    ldap_filter = (ldap_filter or '').strip()
+    if ldap_filter and not ldap_filter.startswith('('):
+        ldap_filter = f'({ldap_filter})'
+    return ldap_filter
+
+
+def shadow_user_rows(emails, group_for, stats):
+    """
+    Linhas para o INSERT em lote de shadow users: {username: email ou None}
+    -> [{username, email, password_hash, is_admin, group_id}]. Quem colidiria
+    com um e-mail já em uso é ignorado (stats['skipped']).
+    """
+    if not emails:
+        return []
+
+    # E-mail é único: não cria quem colidiria com um usuário existente (ou com outro do lote)
+    wanted = {u: email or f'{u}@nubemox.local' for u, email in emails.items()}
+    taken = set()
+    for chunk in chunks(set(wanted.values())):
+        taken.update(db.session.execute(select(User.email).where(User.email.in_(chunk))).scalars())
+
+    rows = []
+    for username, email in wanted.items():
+        if email in taken:
+            logger.warning(f"Shadow user '{username}' não criado, e-mail {email} já em uso.")
+            stats['skipped'] += 1
+            continue
+        taken.add(email)
+        rows.append({
+            'username': username,
+            'email': email,
+            'password_hash': DIRECTORY_MANAGED,  # Sem senha local (só LDAP)
+            'is_admin': False,
+            'group_id': group_for.get(username),
+        })
+    return rows
+
+
+class LDAPGroupSync:
+    def __init__(self, connection=None, page_size=None):
+        config = current_app.config
+        self._connection = connection
+        self.page_size = page_size or config.get('LDAP_SYNC_PAGE_SIZE', 500)
+        self.search_base = config.get('LDAP_USER_SEARCH_BASE') or config.get('LDAP_BASE_DN')
+        self.username_attr = config.get('LDAP_USERNAME_ATTRIBUTE', 'uid')
+        self.email_attr = config.get('LDAP_EMAIL_ATTRIBUTE', 'mail')
+
+    @property
+    def connection(self):
+        """Conexão própria com a conta de serviço (as do pool ficam com o bind dos usuários)."""
+        if self._connection is None:
+            config = current_app.config
+            self._connection = Connection(
+                get_ldap_pool().server,  # Reaproveita o Server com schema já em cache
+                user=config.get('LDAP_BIND_DN') or None,
+                password=config.get('LDAP_BIND_PASSWORD') or None,
+                receive_timeout=config.get('LDAP_RECEIVE_TIMEOUT', 5),
+                auto_bind=True,
+                raise_exceptions=True
+            )
+        return self._connection
+
+    @staticmethod
+    def _first(value):
+        # Sem schema o ldap3 devolve listas; com schema, valor único para atributos single-valued
+        if isinstance(value, (list, tuple)):
+            return str(value[0]) if value else None
+        return str(value) if value is not None else None
+
+    def search_members(self, ldap_filter):
+        """Busca paginada: retorna {username: email} dos objetos que casam com o filtro."""
+        members = {}
+        entries = self.connection.extend.standard.paged_search(
+            search_base=self.search_base,
+            search_filter=normalize_filter(ldap_filter),
+            search_scope=SUBTREE,
+            attributes=[self.username_attr, self.email_attr],
+            paged_size=self.page_size,
+            generator=True
+        )
+        for entry in entries:
+            if entry.get('type') != 'searchResEntry':
+                continue
+            attrs = entry.get('attributes', {})
+            username = self._first(attrs.get(self.username_attr))
+            if username:
+                members[username] = self._first(attrs.get(self.email_attr))
+        return members
+
+    def run(self, dry_run=False, prune=True):
+        stats = {'groups': 0, 'entries': 0, 'created': 0, 'assigned': 0, 'removed': 0,
+                 'skipped': 0, 'errors': []}
+
+        groups = UserGroup.query.filter(
+            UserGroup.ldap_filter.isnot(None), UserGroup.ldap_filter != ''
+        ).order_by(UserGroup.id).all()
+
+        # 1. Diretório: membros de cada grupo
+        members_by_group = {}
+        emails = {}
+        for group in groups:
+            try:
+                members = self.search_members(group.ldap_filter)
+            except Exception as e:
+                # Filtro inválido num grupo não derruba os outros (e esse grupo não sofre prune)
+                logger.warning(f"Sync LDAP: falha no filtro do grupo '{group.name}': {e}")
+                stats['errors'].append({'group': group.name, 'error': str(e)})
+                continue
+            members_by_group[group.id] = members
+            for username, email in members.items():
+                emails.setdefault(username, email)
+        stats['groups'] = len(members_by_group)
+        stats['entries'] = len(emails)
+
+        # 2. Um grupo por usuário: o de menor id vence
+        target_group = {}
+        for group_id in sorted(members_by_group):
+            for username in members_by_group[group_id]:
+                target_group.setdefault(username, group_id)
+
+        # 3. Mapeia para usuários locais em lote
+        current = {}
+        for chunk in chunks(target_group):
+            for username, group_id in db.session.execute(
+                select(User.username, User.group_id).where(User.username.in_(chunk))
+            ):
+                current[username] = group_id
+
+        # 4. Shadow users para quem ainda não logou
+        missing = [u for u in target_group if u not in current]
+        new_rows = shadow_user_rows({u: emails.get(u) for u in missing}, target_group, stats)
+        stats['created'] = len(new_rows)
+
+        # 5. Atribuições: só quem mudou de grupo
+        to_assign = {}
+        for username, group_id in target_group.items():
+            if username in current and current[username] != group_id:
+                to_assign.setdefault(group_id, []).append(username)
+        stats['assigned'] = sum(len(v) for v in to_assign.values())
+
+        # 6. Prune: quem está num grupo sincronizado mas não casa mais com o filtro dele
+        to_remove = []
+        if prune:
+            for group_id in members_by_group:
+                in_group = db.session.execute(
+                    select(User.username).where(User.group_id == group_id)
+                ).scalars()
+                to_remove.extend(u for u in in_group if target_group.get(u) != group_id)
+            # Quem vai para outro grupo já é coberto pela atribuição
+            to_remove = [u for u in to_remove if u not in target_group]
+        stats['removed'] = len(to_remove)
+
+        if dry_run:
+            db.session.rollback()
+            return stats
+
+        if new_rows:
+            db.session.execute(insert(User), new_rows)
+        for group_id, usernames in to_assign.items():
+            for chunk in chunks(usernames):
+                db.session.execute(
+                    update(User).where(User.username.in_(chunk))
+                    .values(group_id=group_id, policy_version=User.policy_version + 1)
+                    .execution_options(synchronize_session=False)
+                )
+        for chunk in chunks(to_remove):
+            db.session.execute(
+                update(User).where(User.username.in_(chunk))
+                .values(group_id=None, policy_version=User.policy_version + 1)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+        if to_assign or to_remove:
+            # Tokens já emitidos passam a usar o grupo novo
+            invalidate_policy()
+        return stats
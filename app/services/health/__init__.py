@@ -1,33 +1,80 @@
+import threading
+
 from .providers.proxmox import ProxmoxHealthCheck
+from .providers.ldap import LDAPHealthCheck
+from .providers.database import DatabaseHealthCheck
+from .providers.tasks import TaskQueueHealthCheck
+from .runner import run_checks
+
+# Instâncias do processo: cada provider guarda a própria janela de latências
+_providers = None
+_providers_lock = threading.Lock()
+
+
+def get_providers():
+    """Providers ativos no sistema (criados uma vez por processo)."""
+    global _providers
+    if _providers is None:
+        with _providers_lock:
+            if _providers is None:
+                _providers = [
+                    DatabaseHealthCheck(),
+                    ProxmoxHealthCheck(),
+                    TaskQueueHealthCheck(),
+                    LDAPHealthCheck(),
+                ]
+    return _providers
+
 
-def get_system_health():
+def get_system_health(providers=None, timeout=None, deadline=None):
     """
     Executa verificação de saúde em todos os subsistemas registrados.
+
+    Os providers rodam em paralelo (ver runner.py): quem não responde dentro do
+    próprio timeout (ou do prazo global) é reportado como 'degraded'. Cada
+    resultado traz 'latency' com p50/p95/p99 das execuções recentes.
     """
-    # Lista de providers ativos no sistema
-    providers = [
-        ProxmoxHealthCheck(),
-        # Futuramente: DatabaseHealthCheck(), RedisHealthCheck()...
-    ]
+    if providers is None:
+        providers = get_providers()
+
+    # Executa os checks (o método .run() trata erros e cronometra)
+    outcomes = run_checks(
+        [(index, provider.run, provider.timeout) for index, provider in enumerate(providers)],
+        timeout=timeout, deadline=deadline
+    )
 
     results = []
     global_status = "healthy"
 
-    for provider in providers:
-        # Executa o check (o método .run() trata erros e cronometra)
-        data = provider.run()
-        
+    for index, provider in enumerate(providers):
+        outcome = outcomes[index]
+        if outcome['ok']:
+            data = outcome['value']
+        else:
+            # Estourou o prazo: sem resposta não dá para afirmar que está fora
+            data = {
+                'status': 'degraded' if outcome['timed_out'] else 'unhealthy',
+                'error': outcome['error'],
+                'latency_ms': outcome['latency_ms'],
+                # A execução atrasada entra na janela quando terminar
+                'latency': provider.latency_percentiles()
+            }
+
         # Adiciona metadados
         data['name'] = provider.name
         data['category'] = provider.category
-        
+
         # Se algum falhar, o status global do sistema muda
-        if data['status'] != 'healthy':
+        # ('degraded' = funciona com redundância reduzida, ex.: uma réplica LDAP fora)
+        if data['status'] == 'degraded':
+            if global_status == "healthy":
+                global_status = "degraded"
+        elif data['status'] != 'healthy':
             global_status = "unhealthy"
-        
+
         results.append(data)
 
     return {
         "status": global_status,
         "checks": results
-    }
\ No newline at end of file
+    }
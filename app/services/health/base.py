@@ -1,11 +1,21 @@
 from abc import ABC, abstractmethod
+from collections import deque
+import threading
 import time
 
+# Protege as janelas (append concorrente com a leitura dos percentis)
+_window_lock = threading.Lock()
+
 class HealthCheckProvider(ABC):
     """
     Interface base para todos os verificadores de saúde (Proxmox, DB, Redis, etc).
     """
 
+    # Prazo (s) desta verificação em get_system_health; None = HEALTH_PROVIDER_TIMEOUT
+    timeout = None
+    # Quantas execuções recentes entram nos percentis de latência
+    window_size = 100
+
     @property
     @abstractmethod
     def name(self):
@@ -46,5 +56,48 @@ class HealthCheckProvider(ABC):
         # Calcula latência em milissegundos
         latency = (time.time() - start) * 1000
         result['latency_ms'] = round(latency, 2)
-        
-        return result
\ No newline at end of file
+
+        # Janela móvel: uma lentidão aparece no p95/p99 antes de virar falha
+        self.record_latency(latency)
+        result['latency'] = self.latency_percentiles()
+
+        return result
+
+    # ------------------------------------------------------------------
+    # JANELA DE LATÊNCIA
+    # ------------------------------------------------------------------
+    def _window(self):
+        # Lazy: subclasses não precisam chamar super().__init__(). Chamado sob _window_lock.
+        window = self.__dict__.get('_latencies')
+        if window is None:
+            window = self._latencies = deque(maxlen=self.window_size)
+        return window
+
+    def record_latency(self, latency_ms):
+        with _window_lock:
+            self._window().append(latency_ms)
+
+    def latency_percentiles(self):
+        """{'p50', 'p95', 'p99', 'samples'} das últimas `window_size` execuções (ms)."""
+        with _window_lock:
+            samples = list(self._window())
+        return latency_summary(samples)
+
+
+def percentile(sorted_values, q):
+    """Percentil por posição mais próxima (nearest-rank) de uma lista já ordenada."""
+    rank = max(1, -(-len(sorted_values) * q // 100))  # ceil(n * q / 100)
+    return sorted_values[int(rank) - 1]
+
+
+def latency_summary(samples):
+    """{'p50', 'p95', 'p99', 'samples'} (ms) de uma amostra de latências."""
+    samples = sorted(samples)
+    if not samples:
+        return {'p50': None, 'p95': None, 'p99': None, 'samples': 0}
+    return {
+        'p50': round(percentile(samples, 50), 2),
+        'p95': round(percentile(samples, 95), 2),
+        'p99': round(percentile(samples, 99), 2),
+        'samples': len(samples)
+    }
@@ -0,0 +1,73 @@
+import time
+
+from flask import current_app
+from sqlalchemy import text
+
+from app.extensions import db
+from app.services.health.base import HealthCheckProvider
+
+
+class DatabaseHealthCheck(HealthCheckProvider):
+    """
+    Pool de conexões do SQLAlchemy: latência do checkout (pegar uma conexão do
+    pool), latência de um SELECT 1 e saturação do pool (conexões em uso / capacidade).
+    Pool quase cheio = requisições vão começar a esperar conexão.
+    """
+
+    def __init__(self, engine=None):
+        self._engine = engine
+
+    @property
+    def name(self):
+        return "Banco de Dados"
+
+    @property
+    def category(self):
+        return "database"
+
+    def check(self):
+        engine = self._engine or db.engine
+        config = current_app.config
+        # Antes do checkout, para não contar a própria conexão do health check
+        pool = pool_stats(engine.pool)
+
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            checkout_ms = (time.perf_counter() - start) * 1000
+            conn.execute(text('SELECT 1'))
+            query_ms = (time.perf_counter() - start) * 1000 - checkout_ms
+
+        status = 'healthy'
+        saturation = pool.get('saturation')
+        if saturation is not None and saturation >= config.get('HEALTH_DB_POOL_SATURATION_WARN', 0.9):
+            status = 'degraded'
+        if checkout_ms > config.get('HEALTH_DB_CHECKOUT_WARN_MS', 200):
+            status = 'degraded'
+
+        return {
+            'status': status,
+            'details': {
+                'checkout_ms': round(checkout_ms, 2),
+                'query_ms': round(query_ms, 2),
+                'pool': pool
+            }
+        }
+
+
+def pool_stats(pool):
+    """
+    Ocupação de um pool do SQLAlchemy. Pools sem contagem (StaticPool, NullPool
+    do SQLite) só informam a classe.
+    """
+    stats = {'class': type(pool).__name__}
+    if not all(hasattr(pool, attr) for attr in ('size', 'checkedout', 'overflow')):
+        return stats
+
+    size = pool.size()
+    max_overflow = getattr(pool, '_max_overflow', 0)
+    checked_out = pool.checkedout()
+    stats.update(size=size, max_overflow=max_overflow, checked_out=checked_out, overflow=pool.overflow())
+    # max_overflow < 0 = sem limite: não há saturação
+    capacity = size + max_overflow if max_overflow >= 0 else None
+    stats['saturation'] = round(checked_out / capacity, 2) if capacity else None
+    return stats
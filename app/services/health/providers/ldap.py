@@ -0,0 +1,51 @@
+from flask import current_app
+
+from app.services.health.base import HealthCheckProvider, latency_summary
+from app.services.ldap_service import get_ldap_pool
+
+
+class LDAPHealthCheck(HealthCheckProvider):
+    def __init__(self, servers=None):
+        self._servers = servers
+
+    @property
+    def name(self):
+        return "Diretório LDAP"
+
+    @property
+    def category(self):
+        return "identity"
+
+    def check(self):
+        servers = self._servers or get_ldap_pool()
+
+        # Sem sondas em background (LDAP_PROBE_INTERVAL=0) o estado pode estar velho: sonda agora
+        if not servers.probing:
+            servers.probe()
+
+        statuses = servers.status()
+        healthy = [s for s in statuses if s['healthy']]
+        # Percentis dos binds de login reais recentes (não das sondas)
+        bind_latency = latency_summary(servers.bind_latencies())
+        if not healthy:
+            status = 'unhealthy'
+        elif len(healthy) < len(statuses):
+            status = 'degraded'  # Login funciona, mas sem redundância
+        elif bind_latency['p95'] is not None and bind_latency['p95'] > self._bind_warn_ms():
+            status = 'degraded'  # Login funciona, mas lento
+        else:
+            status = 'healthy'
+
+        return {
+            'status': status,
+            'details': {
+                'strategy': servers.strategy,
+                'healthy_servers': len(healthy),
+                'bind_latency_ms': bind_latency,
+                'servers': statuses
+            }
+        }
+
+    @staticmethod
+    def _bind_warn_ms():
+        return current_app.config.get('HEALTH_LDAP_BIND_WARN_MS', 1000)
@@ -0,0 +1,38 @@
+from flask import current_app
+
+from app.services.health.base import HealthCheckProvider
+from app.proxmox import proxmox_client
+
+
+class TaskQueueHealthCheck(HealthCheckProvider):
+    """
+    Profundidade da fila de tarefas: tarefas em execução no cluster
+    (/cluster/tasks sem 'endtime') e quantas este processo está aguardando.
+    Fila crescendo = deploys/snapshots vão demorar (ou estourar o PROXMOX_TASK_TIMEOUT).
+    """
+
+    @property
+    def name(self):
+        return "Fila de Tarefas"
+
+    @property
+    def category(self):
+        return "compute"
+
+    def check(self):
+        tasks = proxmox_client.connection.cluster.tasks.get()
+        running = [t for t in tasks if not t.get('endtime')]
+
+        by_type = {}
+        for task in running:
+            by_type[task.get('type', 'unknown')] = by_type.get(task.get('type', 'unknown'), 0) + 1
+
+        warn = current_app.config.get('HEALTH_TASK_QUEUE_WARN', 20)
+        return {
+            'status': 'degraded' if len(running) >= warn else 'healthy',
+            'details': {
+                'running': len(running),
+                'waiting_in_process': proxmox_client.tasks_waiting,
+                'by_type': by_type
+            }
+        }
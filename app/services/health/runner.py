@@ -0,0 +1,73 @@
+# app/services/health/runner.py
+"""
+Execução concorrente das verificações de saúde.
+
+Cada verificação roda numa thread de um pool pequeno (HEALTH_MAX_WORKERS), com
+timeout próprio e um prazo global (HEALTH_DEADLINE) para o conjunto. Assim a
+latência do health é a da verificação mais lenta (limitada pelo prazo), e não a
+soma de todas.
+
+Uma verificação que estoura o prazo não é interrompida (threads Python não são
+canceláveis): o resultado é descartado e ela termina em background. Por isso o
+pool é criado por chamada e liberado sem esperar (shutdown(wait=False)).
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import contextvars
+import time
+
+from flask import current_app, has_app_context
+
+
+def run_checks(checks, timeout=None, deadline=None, max_workers=None):
+    """
+    Roda `checks` = [(nome, callable, timeout ou None), ...] em paralelo.
+
+    Retorna {nome: {'ok': bool, 'value'|'error': ..., 'timed_out': bool, 'latency_ms': float|None}}.
+    Os callables rodam dentro de um app context próprio (db.session, current_app).
+    """
+    if not checks:
+        return {}
+
+    config = current_app.config if has_app_context() else {}
+    timeout = timeout if timeout is not None else config.get('HEALTH_PROVIDER_TIMEOUT', 3.0)
+    deadline = deadline if deadline is not None else config.get('HEALTH_DEADLINE', 5.0)
+    max_workers = max_workers or config.get('HEALTH_MAX_WORKERS', 4)
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def call(fn):
+        began = time.monotonic()
+        if app is None:
+            value = fn()
+        else:
+            with app.app_context():
+                value = fn()
+        return value, time.monotonic() - began
+
+    start = time.monotonic()
+    global_end = start + deadline
+    executor = ThreadPoolExecutor(max_workers=min(len(checks), max_workers),
+                                  thread_name_prefix='health-check')
+    # Cópia do contexto por verificação: os spans de tracing entram no trace da requisição
+    futures = [(name, executor.submit(contextvars.copy_context().run, call, fn), check_timeout or timeout)
+               for name, fn, check_timeout in checks]
+
+    results = {}
+    try:
+        for name, future, check_timeout in futures:
+            limit = min(start + check_timeout, global_end)
+            try:
+                value, elapsed = future.result(timeout=max(0.0, limit - time.monotonic()))
+                result = {'ok': True, 'value': value, 'timed_out': False, 'latency_ms': elapsed * 1000}
+            except FutureTimeout:
+                future.cancel()  # Se ainda estiver na fila, nem começa
+                budget = round(limit - start, 2)
+                result = {'ok': False, 'timed_out': True, 'error': f'Sem resposta em {budget}s',
+                          'latency_ms': budget * 1000}
+            except Exception as e:
+                result = {'ok': False, 'timed_out': False, 'error': str(e), 'latency_ms': None}
+            if result['latency_ms'] is not None:
+                result['latency_ms'] = round(result['latency_ms'], 2)
+            results[name] = result
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
@@ -0,0 +1,99 @@
+# app/services/health/snapshot.py
+"""
+Snapshot do health check em memória (HEALTH_CACHE_INTERVAL).
+
+Load balancers e o frontend consultam /health a cada poucos segundos, em cada
+réplica da API. Com o cache, só a thread de refresh de cada processo fala com o
+banco e o PVE (uma rodada por intervalo); as sondas são respondidas da memória.
+
+- Cada resposta traz 'checked_at', 'age_seconds' e 'stale' (idade acima de
+  HEALTH_CACHE_STALE_AFTER intervalos: a thread parou ou as checagens travaram).
+- `?fresh=1` faz uma rodada ao vivo na hora (e atualiza o snapshot).
+- HEALTH_CACHE_INTERVAL=0 desliga o cache: toda sonda é ao vivo.
+"""
+from datetime import datetime
+import logging
+import threading
+import time
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class HealthSnapshot:
+    def __init__(self, app, build, interval, stale_after=3):
+        self.app = app
+        self.build = build        # Função que monta o relatório (precisa de app context)
+        self.interval = interval
+        self.stale_after = stale_after
+        self._snapshot = None     # (relatório, monotonic, datetime) trocado de uma vez
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """Roda as checagens agora e guarda o resultado."""
+        with self._refresh_lock:
+            report = self.build()
+            self._snapshot = (report, time.monotonic(), datetime.utcnow())
+        return self._snapshot
+
+    def get(self, fresh=False):
+        """Relatório com metadados de cache. Sem snapshot ainda, faz a primeira rodada."""
+        snapshot = self._snapshot
+        live = fresh or snapshot is None
+        if live:
+            snapshot = self.refresh()
+        self.start()
+
+        report, taken_at, checked_at = snapshot
+        age = time.monotonic() - taken_at
+        return dict(
+            report,
+            cached=not live,
+            checked_at=checked_at.isoformat(),
+            age_seconds=round(age, 2),
+            stale=age > self.interval * self.stale_after,
+        )
+
+    def start(self):
+        """Inicia a thread de refresh (uma por processo, no primeiro uso)."""
+        if self._thread is not None or self.interval <= 0:
+            return
+
+        def loop():
+            while not self._stop.wait(self.interval):
+                try:
+                    with self.app.app_context():
+                        self.refresh()
+                except Exception as e:
+                    # Mantém o snapshot anterior; ele vai ficar 'stale' se isso persistir
+                    logger.warning(f"Falha ao atualizar o snapshot de saúde: {e}")
+
+        self._thread = threading.Thread(target=loop, name='health-refresh', daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def stop(self):
+        self._stop.set()
+
+
+def get_health_snapshot(build):
+    """
+    HealthSnapshot do app atual (um por processo), ou None se
+    HEALTH_CACHE_INTERVAL=0 (health sempre ao vivo).
+    """
+    app = current_app._get_current_object()
+    interval = app.config.get('HEALTH_CACHE_INTERVAL', 10)
+    if interval <= 0:
+        return None
+    snapshot = app.extensions.get('health_snapshot')
+    if snapshot is None:
+        snapshot = app.extensions.setdefault('health_snapshot', HealthSnapshot(
+            app, build, interval, stale_after=app.config.get('HEALTH_CACHE_STALE_AFTER', 3)
+        ))
+    return snapshot
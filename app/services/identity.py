@@ -0,0 +1,167 @@
+# app/services/identity.py
+"""
+Identidade do usuário autenticado sem ida ao banco a cada request.
+
+O token JWT carrega, além do id (sub), as claims que as rotas usam para
+decidir permissão:
+
+- adm: User.is_admin
+- gid: User.group_id (o grupo define a política de cota e infraestrutura)
+- gadm: o grupo é um grupo administrativo (ADMIN_GROUP_NAMES)
+- pv: User.policy_version no momento do login
+
+Toda mudança que altera essas claims (admin, grupo, nome do grupo) incrementa
+User.policy_version. A cada request só comparamos o pv do token com a versão
+atual do usuário, servida por um cache em memória (PolicyCache, TTL curto):
+
+- versão igual: vale o que está no token (zero queries);
+- versão diferente: vale o estado atual do usuário, que já veio no cache
+  (permissões revogadas valem antes do token expirar);
+- usuário removido: o token é recusado (token_in_blocklist_loader).
+
+O cache é local ao processo: escritas feitas neste processo invalidam a
+entrada na hora; nos demais workers a mudança vale em até JWT_POLICY_CACHE_TTL.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import select
+
+from app.extensions import db
+
+# Grupos cujos membros têm acesso administrativo ao catálogo
+ADMIN_GROUP_NAMES = ('admins', 'administradores', 'root', 'ti')
+
+IDENTITY_ENVIRON_KEY = 'nubemox.identity'
+
+# Estado de autorização do usuário (o que vai nas claims)
+UserPolicy = namedtuple('UserPolicy', 'version is_admin group_id group_admin')
+
+
+def is_admin_group(name):
+    return bool(name) and name.lower() in ADMIN_GROUP_NAMES
+
+
+def identity_claims(user):
+    """Claims adicionais para o create_access_token."""
+    return {
+        'adm': bool(user.is_admin),
+        'gid': user.group_id,
+        'gadm': is_admin_group(user.group.name if user.group else None),
+        'pv': user.policy_version or 0,
+    }
+
+
+class PolicyCache:
+    def __init__(self, ttl=30, max_users=10000):
+        self.ttl = ttl
+        self.max_users = max_users
+        # user_id -> (UserPolicy ou None se o usuário não existe, expires_at)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                return entry[0]
+
+        policy = self._load(user_id)
+        with self._lock:
+            self._entries[user_id] = (policy, now + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return policy
+
+    @staticmethod
+    def _load(user_id):
+        from app.models import User, UserGroup
+        row = db.session.execute(
+            select(User.policy_version, User.is_admin, User.group_id, UserGroup.name)
+            .outerjoin(UserGroup, User.group_id == UserGroup.id)
+            .where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        version, is_admin, group_id, group_name = row
+        return UserPolicy(version or 0, bool(is_admin), group_id, is_admin_group(group_name))
+
+    def invalidate(self, user_id=None):
+        """Remove um usuário (ou todos, sem argumento)."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def get_policy_cache():
+    """Um cache por app (guardado em app.extensions)."""
+    app = current_app._get_current_object()
+    cache = app.extensions.get('policy_cache')
+    if cache is None:
+        cache = app.extensions.setdefault('policy_cache', PolicyCache(
+            ttl=app.config.get('JWT_POLICY_CACHE_TTL', 30),
+            max_users=app.config.get('JWT_POLICY_CACHE_MAX_USERS', 10000),
+        ))
+    return cache
+
+
+def invalidate_policy(user_id=None):
+    """Chamado após mudar admin/grupo de um usuário (ou de vários, sem argumento)."""
+    cache = current_app.extensions.get('policy_cache')
+    if cache is not None:
+        cache.invalidate(user_id)
+
+
+class Identity:
+    """Quem está fazendo o request, montado das claims do token (request-scoped)."""
+
+    def __init__(self, user_id, is_admin, group_id, group_admin):
+        self.id = user_id
+        self.is_admin = is_admin
+        self.group_id = group_id
+        self.group_admin = group_admin
+
+    @property
+    def can_manage_catalog(self):
+        return self.is_admin or self.group_admin
+
+    @classmethod
+    def from_token(cls, claims, policy):
+        user_id = int(claims['sub'])
+        if policy is not None and claims.get('pv') != policy.version:
+            # Token anterior a uma mudança de permissão: vale o estado atual
+            return cls(user_id, policy.is_admin, policy.group_id, policy.group_admin)
+        return cls(user_id, bool(claims.get('adm')), claims.get('gid'), bool(claims.get('gadm')))
+
+
+def current_identity():
+    """Identidade do request atual (rotas com @jwt_required). Calculada uma vez por request."""
+    # Guardado no environ do request (o g pode sobreviver a vários requests quando
+    # já existe um app context ativo, como nos testes)
+    identity = request.environ.get(IDENTITY_ENVIRON_KEY)
+    if identity is None:
+        user_id = int(get_jwt_identity())
+        identity = Identity.from_token(get_jwt(), get_policy_cache().get(user_id))
+        request.environ[IDENTITY_ENVIRON_KEY] = identity
+    return identity
+
+
+def is_token_revoked(jwt_header, jwt_payload):
+    """token_in_blocklist_loader: recusa tokens de usuários que não existem mais."""
+    try:
+        user_id = int(jwt_payload['sub'])
+    except (KeyError, TypeError, ValueError):
+        return True
+    return get_policy_cache().get(user_id) is None
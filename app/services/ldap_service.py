@@ -1,52 +1,404 @@
 # app/services/ldap_service.py
+from collections import deque
+import itertools
+import logging
+import math
+import threading
+import time
+from queue import LifoQueue, Empty, Full
+
 from ldap3 import Server, Connection, ALL, BASE
+from ldap3.core.exceptions import (
+    LDAPException, LDAPCommunicationError, LDAPMaximumRetriesError, LDAPResponseTimeoutError, LDAPStartTLSError
+)
 from flask import current_app
 
-class LDAPService:
-    def authenticate(self, username, password):
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Falhas do servidor (socket, conexão, TLS, timeout): só estas tiram uma réplica da
+# seleção. Qualquer código de resultado do bind (49 senha errada, 53 conta bloqueada
+# pela política de senha, 19 constraint...) é resposta do diretório: login recusado.
+SERVER_ERRORS = (LDAPCommunicationError, LDAPResponseTimeoutError, LDAPStartTLSError, LDAPMaximumRetriesError)
+
+
+class LDAPConnectionPool:
+    """
+    Pool de conexões LDAP do processo (compartilhado entre requisições/threads).
+
+    - O Server (com get_info=ALL) é criado uma vez: Root DSE e schema são lidos
+      na primeira conexão e ficam em cache no próprio objeto Server.
+    - Conexões abertas são reaproveitadas: cada verificação de senha é um
+      rebind (um round-trip) numa conexão já estabelecida, sem novo TCP/TLS.
+    - Conexões ociosas há mais de `max_idle` segundos são descartadas antes do uso
+      (evita esbarrar no idle timeout do servidor).
+    """
+
+    def __init__(self, url, size=10, connect_timeout=3, receive_timeout=5, max_idle=300,
+                 get_info=ALL, client_strategy=None):
+        self.url = url
+        self.size = size
+        # O ldap3 no Linux passa o receive_timeout para SO_RCVTIMEO como inteiro (segundos)
+        self.receive_timeout = max(1, math.ceil(receive_timeout)) if receive_timeout else receive_timeout
+        self.max_idle = max_idle
+        self.client_strategy = client_strategy
+        self.server = Server(url, get_info=get_info, connect_timeout=connect_timeout)
+        self._idle = LifoQueue(maxsize=size)
+        self._info_lock = threading.Lock()
+        self._info_loaded = False
+
+    def _open(self):
+        kwargs = {'receive_timeout': self.receive_timeout, 'raise_exceptions': False}
+        if self.client_strategy:
+            kwargs['client_strategy'] = self.client_strategy
+        conn = Connection(self.server, **kwargs)
+        conn.open(read_server_info=False)
+
+        if not self._info_loaded:
+            with self._info_lock:
+                if not self._info_loaded:
+                    try:
+                        conn.refresh_server_info()
+                    except LDAPException as e:
+                        # Sem info o login funciona igual; só não temos schema para formatar atributos
+                        logger.warning(f"Não foi possível ler o schema do LDAP ({self.url}): {e}")
+                    self._info_loaded = True
+        return conn
+
+    def _take(self):
+        """Retorna (conexão, reaproveitada?)."""
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except Empty:
+                return self._open(), False
+            if conn.closed or (time.monotonic() - last_used) > self.max_idle:
+                self._discard(conn)
+                continue
+            return conn, True
+
+    def _give_back(self, conn):
+        try:
+            self._idle.put_nowait((conn, time.monotonic()))
+        except Full:
+            self._discard(conn)
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.unbind()
+        except Exception:
+            pass
+
+    def check_credentials(self, user_dn, password, attributes=None):
         """
-        Valida credenciais no LDAP e retorna os dados do utilizador.
-        Retorna None se falhar.
+        Faz o bind do usuário numa conexão do pool e, opcionalmente, lê atributos
+        do próprio objeto. Retorna None se as credenciais forem inválidas, ou o
+        dict de atributos (vazio se `attributes` não for informado).
+
+        Uma conexão reaproveitada pode ter sido fechada pelo servidor; nesse caso
+        tenta uma única vez com uma conexão nova.
         """
-        # 1. Configurações
-        ldap_server = current_app.config.get('LDAP_SERVER')
-        
-        # Monta o DN do utilizador (Ex: cn=tiago,ou=users,dc=nubemox...)
-        # Assume que o template no config é: 'cn={},ou=users,dc=nubemox,dc=local'
-        user_dn = current_app.config.get('LDAP_USER_DN_TEMPLATE').format(username)
-        
-        try:
-            # 2. Tenta Conectar e Autenticar (Bind)
-            server = Server(ldap_server, get_info=ALL)
-            conn = Connection(server, user=user_dn, password=password, auto_bind=True)
-            
-            # Se não lançou exceção, a senha está correta.
-            
-            # 3. Buscar detalhes do utilizador (Email, Nome)
-            # Usamos search_base=user_dn para buscar o próprio objeto
+        with span('ldap.bind', 'ldap', **{'ldap.server': self.url}):
+            for attempt in range(2):
+                conn, reused = self._take()
+                try:
+                    result = self._bind_and_read(conn, user_dn, password, attributes)
+                except SERVER_ERRORS:
+                    self._discard(conn)
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except Exception:
+                    self._discard(conn)
+                    raise
+                self._give_back(conn)
+                return result
+
+    @staticmethod
+    def _bind_and_read(conn, user_dn, password, attributes):
+        if not conn.rebind(user=user_dn, password=password, read_server_info=False):
+            code = (conn.result or {}).get('result')
+            if isinstance(code, int) and code != 0:
+                # O diretório respondeu (49 invalidCredentials, 53 unwillingToPerform...)
+                if code != 49:
+                    logger.info(f"Bind recusado para {user_dn}: {code} {conn.result.get('description')} "
+                                f"{conn.result.get('message') or ''}".rstrip())
+                return None
+            # Sem código de resultado: a resposta nem chegou
+            raise LDAPCommunicationError(conn.last_error or str(conn.result))
+
+        data = {}
+        if attributes:
             conn.search(
                 search_base=user_dn,
                 search_filter='(objectClass=*)',
                 search_scope=BASE,
-                attributes=['mail', 'cn', 'uid']
+                attributes=attributes
             )
-            
-            user_data = {
-                'username': username,
-                'email': f"{username}@local", # Fallback
-                'fullname': username
-            }
-            
             if conn.entries:
                 entry = conn.entries[0]
-                # Extrai dados se existirem, senão usa fallback
-                if 'mail' in entry: user_data['email'] = str(entry.mail)
-                if 'cn' in entry: user_data['fullname'] = str(entry.cn)
-                
-            conn.unbind()
-            return user_data
+                for attr in attributes:
+                    # Atributos multivalorados (ex: cn com o RDN): usa o primeiro valor
+                    if attr in entry and entry[attr].values:
+                        data[attr] = str(entry[attr].values[0])
+        return data
+
+    def probe(self):
+        """
+        Teste de vida: conexão nova (fora do pool) + bind anônimo.
+        Lança exceção se o servidor não responder dentro dos timeouts.
+        """
+        kwargs = {'receive_timeout': self.receive_timeout, 'raise_exceptions': False}
+        if self.client_strategy:
+            kwargs['client_strategy'] = self.client_strategy
+        conn = Connection(self.server, **kwargs)
+        try:
+            conn.open(read_server_info=False)
+            # Qualquer resposta serve (mesmo bind anônimo recusado): o servidor está atendendo
+            conn.bind(read_server_info=False)
+        finally:
+            self._discard(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except Empty:
+                return
+            self._discard(conn)
+
+
+class LDAPServerSet:
+    """
+    Réplicas do diretório (LDAP_SERVERS), cada uma com o seu pool.
+
+    - strategy='first': usa o primeiro servidor saudável da lista (os demais são reserva).
+    - strategy='round_robin': alterna entre os saudáveis.
+
+    Um servidor que falha (conexão recusada, timeout) sai da seleção por
+    `cooldown` segundos e o login segue na próxima réplica. As sondas em
+    background (start_probes) reabilitam o servidor assim que ele volta a
+    responder — ou o derrubam antes que um login pague o timeout.
+    """
+
+    STRATEGIES = ('first', 'round_robin')
 
+    def __init__(self, pools, strategy='first', cooldown=30):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"LDAP_SERVER_SELECTION inválido: {strategy} (use {', '.join(self.STRATEGIES)})")
+        self.pools = list(pools)
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self._state = {
+            pool.url: {'down_until': 0.0, 'last_error': None, 'last_probe': None, 'latency_ms': None}
+            for pool in self.pools
+        }
+        self._lock = threading.Lock()
+        self._round_robin = itertools.count()
+        self._stop = threading.Event()
+        self._prober = None
+        # Latência (ms) dos últimos binds de login, de qualquer réplica (health check)
+        self._bind_latencies = deque(maxlen=200)
+
+    def is_up(self, pool, now=None):
+        return self._state[pool.url]['down_until'] <= (now or time.monotonic())
+
+    def candidates(self):
+        """Servidores saudáveis, na ordem em que devem ser tentados."""
+        now = time.monotonic()
+        up = [pool for pool in self.pools if self.is_up(pool, now)]
+        if self.strategy == 'round_robin' and len(up) > 1:
+            start = next(self._round_robin) % len(up)
+            up = up[start:] + up[:start]
+        return up
+
+    @property
+    def server(self):
+        """Server do servidor preferido agora (ex.: para a conexão do sync de grupos)."""
+        candidates = self.candidates()
+        return (candidates[0] if candidates else self.pools[0]).server
+
+    def mark_down(self, pool, error):
+        with self._lock:
+            state = self._state[pool.url]
+            if state['down_until'] <= time.monotonic():
+                logger.warning(f"LDAP {pool.url} fora da seleção por {self.cooldown}s: {error}")
+            state['down_until'] = time.monotonic() + self.cooldown
+            state['last_error'] = str(error)
+
+    def mark_up(self, pool):
+        with self._lock:
+            state = self._state[pool.url]
+            if state['down_until'] > time.monotonic():
+                logger.info(f"LDAP {pool.url} voltou a responder.")
+            state['down_until'] = 0.0
+            state['last_error'] = None
+
+    def check_credentials(self, user_dn, password, attributes=None):
+        """Mesmo contrato do LDAPConnectionPool, com failover entre as réplicas."""
+        last_error = None
+        for pool in self.candidates():
+            start = time.monotonic()
+            try:
+                result = pool.check_credentials(user_dn, password, attributes)
+            except SERVER_ERRORS as e:
+                self.mark_down(pool, e)
+                last_error = e
+                continue
+            self.mark_up(pool)
+            with self._lock:
+                self._bind_latencies.append((time.monotonic() - start) * 1000)
+            return result
+        raise LDAPCommunicationError(f"Nenhum servidor LDAP disponível ({last_error or 'todos em cooldown'})")
+
+    # ------------------------------------------------------------------
+    # SONDAS DE VIDA
+    # ------------------------------------------------------------------
+    def probe(self):
+        """Sonda todos os servidores (em paralelo) e atualiza o estado."""
+        def one(pool):
+            start = time.monotonic()
+            try:
+                pool.probe()
+            except Exception as e:
+                self.mark_down(pool, e)
+            else:
+                self.mark_up(pool)
+            with self._lock:
+                self._state[pool.url]['last_probe'] = time.time()
+                self._state[pool.url]['latency_ms'] = round((time.monotonic() - start) * 1000, 2)
+
+        threads = [threading.Thread(target=one, args=(pool,), daemon=True) for pool in self.pools]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def start_probes(self, interval):
+        if self._prober is not None or interval <= 0:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.probe()
+
+        self._prober = threading.Thread(target=loop, name='ldap-probe', daemon=True)
+        self._prober.start()
+
+    @property
+    def probing(self):
+        return self._prober is not None
+
+    def bind_latencies(self):
+        """Latências (ms) dos binds de login recentes, da mais antiga para a mais nova."""
+        with self._lock:
+            return list(self._bind_latencies)
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'url': pool.url,
+                'healthy': self._state[pool.url]['down_until'] <= now,
+                'last_error': self._state[pool.url]['last_error'],
+                'last_probe': self._state[pool.url]['last_probe'],
+                'latency_ms': self._state[pool.url]['latency_ms'],
+            } for pool in self.pools]
+
+    def close(self):
+        self._stop.set()
+        for pool in self.pools:
+            pool.close()
+
+
+def parse_ldap_servers(value, default_timeout):
+    """
+    'ldap://a:389, ldaps://b:636|1.5' -> [('ldap://a:389', default_timeout), ('ldaps://b:636', 1.5)]
+    O sufixo |segundos define o connect timeout daquele servidor.
+    """
+    servers = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        url, _, timeout = item.partition('|')
+        servers.append((url.strip(), float(timeout) if timeout.strip() else default_timeout))
+    return servers
+
+
+# Um conjunto de servidores por configuração, compartilhado por todo o processo
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_ldap_pool(config=None):
+    """
+    Retorna o LDAPServerSet do processo (um pool por servidor de LDAP_SERVERS,
+    ou só o LDAP_SERVER). Na primeira chamada inicia as sondas em background.
+    """
+    config = config or current_app.config
+    key = (
+        config.get('LDAP_SERVERS') or config.get('LDAP_SERVER'),
+        config.get('LDAP_SERVER_SELECTION', 'first'),
+        config.get('LDAP_FAILOVER_COOLDOWN', 30),
+        config.get('LDAP_PROBE_INTERVAL', 15),
+        config.get('LDAP_POOL_SIZE', 10),
+        config.get('LDAP_CONNECT_TIMEOUT', 3),
+        config.get('LDAP_RECEIVE_TIMEOUT', 5),
+        config.get('LDAP_POOL_MAX_IDLE', 300),
+    )
+    servers = _pools.get(key)
+    if servers is None:
+        with _pools_lock:
+            servers = _pools.get(key)
+            if servers is None:
+                urls, strategy, cooldown, probe_interval, size, connect_timeout, receive_timeout, max_idle = key
+                pools = [
+                    LDAPConnectionPool(url, size=size, connect_timeout=timeout,
+                                       receive_timeout=receive_timeout, max_idle=max_idle)
+                    for url, timeout in parse_ldap_servers(urls, connect_timeout)
+                ]
+                servers = _pools[key] = LDAPServerSet(pools, strategy=strategy, cooldown=cooldown)
+                servers.start_probes(probe_interval)
+    return servers
+
+
+class LDAPService:
+    def __init__(self, pool=None):
+        self.pool = pool
+        # Erro de comunicação da última chamada (None = o diretório respondeu)
+        self.last_error = None
+
+    def authenticate(self, username, password):
+        """
+        Valida credenciais no LDAP e retorna os dados do utilizador.
+        Retorna None se falhar.
+        """
+        # Bind com senha vazia viraria bind anônimo (sucesso) em muitos servidores
+        self.last_error = None
+        if not password:
+            return None
+
+        # Monta o DN do utilizador (Ex: cn=tiago,ou=users,dc=nubemox...)
+        # Assume que o template no config é: 'cn={},ou=users,dc=nubemox,dc=local'
+        user_dn = current_app.config.get('LDAP_USER_DN_TEMPLATE').format(username)
+        pool = self.pool or get_ldap_pool()
+
+        try:
+            # Bind (senha) + leitura do próprio objeto, numa conexão já aberta do pool
+            attrs = pool.check_credentials(user_dn, password, attributes=['mail', 'cn', 'uid'])
         except Exception as e:
-            # Log de erro (print por enquanto)
-            print(f"Falha de Autenticação LDAP para {username}: {str(e)}")
-            return None
\ No newline at end of file
+            self.last_error = str(e)
+            logger.warning(f"Falha de Autenticação LDAP para {username}: {str(e)}")
+            return None
+
+        if attrs is None:
+            return None
+
+        return {
+            'username': username,
+            'email': attrs.get('mail') or f"{username}@local", # Fallback
+            'fullname': attrs.get('cn') or username
+        }
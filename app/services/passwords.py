@@ -0,0 +1,92 @@
+# app/services/passwords.py
+"""
+Política de hash de senhas locais (PASSWORD_HASH_SCHEME / PASSWORD_HASH_COST).
+
+- scrypt (padrão) e pbkdf2 via Werkzeug; bcrypt via Flask-Bcrypt.
+- O custo é o parâmetro do esquema: N do scrypt, iterações do pbkdf2,
+  log2 rounds do bcrypt. Vazio = padrão da biblioteca.
+- Hashes antigos continuam válidos (o esquema é lido do próprio hash). Quando o
+  esquema ou o custo configurado muda, a senha é refeita no próximo login bem
+  sucedido (needs_rehash), sem pedir troca de senha.
+- Contas gerenciadas pelo diretório (shadow users do LDAP) não têm senha local:
+  guardam DIRECTORY_MANAGED, que não é saída de nenhum hasher e nunca confere.
+
+Para calibrar o custo sob carga: `python -m benchmarks.password_hashing`.
+"""
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from app.extensions import bcrypt
+
+# Marcador de conta sem senha local (autenticação só pelo LDAP)
+DIRECTORY_MANAGED = '!directory-managed'
+
+# Senha-marcador que versões anteriores gravavam (com hash) nos shadow users.
+# Nunca é aceita como senha local, mesmo que ainda exista em hashes antigos.
+LEGACY_SHADOW_PASSWORD = 'ldap-managed-account'
+
+DEFAULT_COST = {
+    'scrypt': 32768,     # N (r=8, p=1), como o padrão do Werkzeug
+    'pbkdf2': 1000000,   # iterações (sha256)
+    'bcrypt': 12,        # log2 rounds
+}
+SCHEMES = tuple(DEFAULT_COST)
+
+
+def parse_hash(stored):
+    """(esquema, custo) de um hash gravado, ou (None, None) se não reconhecido."""
+    if not stored or stored == DIRECTORY_MANAGED:
+        return None, None
+    try:
+        if stored.startswith('$2'):
+            return 'bcrypt', int(stored.split('$')[2])
+        method = stored.split('$', 1)[0].split(':')
+        if method[0] == 'scrypt':
+            return 'scrypt', int(method[1]) if len(method) > 1 else DEFAULT_COST['scrypt']
+        if method[0] == 'pbkdf2':
+            return 'pbkdf2', int(method[2]) if len(method) > 2 else None
+    except (IndexError, ValueError):
+        pass
+    return None, None
+
+
+class PasswordPolicy:
+    def __init__(self, scheme='scrypt', cost=None):
+        if scheme not in SCHEMES:
+            raise ValueError(f"PASSWORD_HASH_SCHEME inválido: {scheme} (use {', '.join(SCHEMES)})")
+        self.scheme = scheme
+        self.cost = int(cost) if cost else DEFAULT_COST[scheme]
+
+    @classmethod
+    def from_config(cls, config=None):
+        config = config or current_app.config
+        return cls(config.get('PASSWORD_HASH_SCHEME', 'scrypt'), config.get('PASSWORD_HASH_COST'))
+
+    def hash(self, password):
+        if self.scheme == 'bcrypt':
+            return bcrypt.generate_password_hash(password, self.cost).decode('utf-8')
+        if self.scheme == 'pbkdf2':
+            return generate_password_hash(password, method=f'pbkdf2:sha256:{self.cost}')
+        return generate_password_hash(password, method=f'scrypt:{self.cost}:8:1')
+
+    @staticmethod
+    def verify(stored, password):
+        """Confere com o esquema do próprio hash (não com o configurado)."""
+        if not stored or not password or stored == DIRECTORY_MANAGED:
+            return False
+        try:
+            if stored.startswith('$2'):
+                return bcrypt.check_password_hash(stored, password)
+            return check_password_hash(stored, password)
+        except ValueError:
+            # Hash corrompido ou de esquema desconhecido
+            return False
+
+    def needs_rehash(self, stored):
+        if stored == DIRECTORY_MANAGED:
+            return False
+        return parse_hash(stored) != (self.scheme, self.cost)
+
+
+def get_password_policy():
+    return PasswordPolicy.from_config()
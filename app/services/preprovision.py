@@ -0,0 +1,239 @@
+# app/services/preprovision.py
+"""
+Pré-provisionamento em massa (início de semestre): para um grupo ou filtro LDAP,
+deixa prontos os shadow users locais e, no PVE, o usuário do realm, o pool
+'vps-<username>' e a ACL do usuário sobre o pool.
+
+Sem isso, o primeiro deploy de cada aluno faz tudo isso no caminho síncrono
+(POST cego do pool + GET de /access/users inteiro). Aqui:
+
+1. Shadow users faltantes: um INSERT em lote.
+2. PVE: UMA listagem de cada coleção (pools, usuários, ACLs) e o diff em memória.
+3. Só o que falta é criado, em lotes de PREPROVISION_BATCH_SIZE usuários, com até
+   PREPROVISION_WORKERS requisições simultâneas ao PVE.
+
+CLI: `flask preprovision --group Alunos` (ver app/commands.py).
+Admin: POST /api/admin/preprovision dispara um job em background (um por vez no
+processo) e responde 202 com o id; o andamento fica em
+GET /api/admin/preprovision/<job_id>. Um semestre inteiro não cabe no timeout
+do proxy/gunicorn.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import itertools
+import logging
+import threading
+
+from flask import current_app
+from proxmoxer import ResourceException
+from sqlalchemy import insert, select
+
+from app.extensions import db
+from app.models import User, UserGroup
+from app.services.group_sync import LDAPGroupSync, shadow_user_rows, chunks
+
+logger = logging.getLogger(__name__)
+
+
+class PreProvisioner:
+    def __init__(self, proxmox, workers=None, batch_size=None, role=None, directory=None):
+        config = current_app.config
+        self.proxmox = proxmox
+        self.workers = workers or config.get('PREPROVISION_WORKERS', 8)
+        self.batch_size = batch_size or config.get('PREPROVISION_BATCH_SIZE', 50)
+        self.role = role or config.get('PROXMOX_POOL_ROLE', 'PVEVMUser')
+        # Conexão LDAP opcional (testes/benchmarks); sem ela usa a conta de serviço
+        self.directory = directory
+
+    # ------------------------------------------------------------------
+    # ALVOS
+    # ------------------------------------------------------------------
+    def resolve_members(self, group=None, ldap_filter=None):
+        """
+        {username: email ou None} do grupo (usuários locais + quem casa com o
+        ldap_filter do grupo) ou do filtro LDAP informado.
+        """
+        members = {}
+        if group is not None:
+            for username, email in db.session.execute(
+                select(User.username, User.email).where(User.group_id == group.id)
+            ):
+                members[username] = email
+            ldap_filter = ldap_filter or group.ldap_filter
+
+        if ldap_filter:
+            found = LDAPGroupSync(connection=self.directory).search_members(ldap_filter)
+            for username, email in found.items():
+                members.setdefault(username, email)
+        return members
+
+    # ------------------------------------------------------------------
+    # EXECUÇÃO
+    # ------------------------------------------------------------------
+    def run(self, group=None, ldap_filter=None, dry_run=False):
+        stats = {'users': 0, 'shadow_created': 0, 'skipped': 0, 'pools_created': 0,
+                 'pve_users_created': 0, 'acls_created': 0, 'errors': []}
+
+        members = self.resolve_members(group, ldap_filter)
+        stats['users'] = len(members)
+        if not members:
+            return stats
+
+        # 1. Shadow users (quem ainda não existe localmente)
+        existing = set()
+        for chunk in chunks(members):
+            existing.update(db.session.execute(select(User.username).where(User.username.in_(chunk))).scalars())
+        group_id = group.id if group is not None else None
+        missing = {u: e for u, e in members.items() if u not in existing}
+        rows = shadow_user_rows(missing, {u: group_id for u in missing}, stats)
+        stats['shadow_created'] = len(rows)
+        if rows and not dry_run:
+            db.session.execute(insert(User), rows)
+            db.session.commit()
+        # E-mail em conflito: não existe localmente, então também não vai para o PVE
+        usernames = sorted(existing | {row['username'] for row in rows})
+
+        # 2. Uma listagem de cada coleção do PVE
+        pools = set(self.proxmox.list_pool_ids())
+        pve_users = set(self.proxmox.list_pve_userids())
+        acls = set(self.proxmox.list_user_acls())
+        # As mesmas listagens aquecem o cache de existência do deploy
+        existence = self.proxmox.existence
+        existence.load('pools', pools)
+        existence.load('users', pve_users)
+        existence.load('acls', acls)
+
+        # 3. Diff: só o que falta para cada usuário
+        plan = []
+        for username in usernames:
+            poolid = self.proxmox.user_pool_id(username)
+            userid = self.proxmox.pve_userid(username)
+            steps = (
+                poolid not in pools,
+                userid not in pve_users,
+                (f'/pool/{poolid}', userid, self.role) not in acls,
+            )
+            if any(steps):
+                plan.append((username, poolid, userid, steps))
+
+        stats['pools_created'] = sum(1 for p in plan if p[3][0])
+        stats['pve_users_created'] = sum(1 for p in plan if p[3][1])
+        stats['acls_created'] = sum(1 for p in plan if p[3][2])
+        if dry_run or not plan:
+            return stats
+
+        # 4. Criação em lotes paralelos
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for batch in chunks(plan, self.batch_size):
+                for error in executor.map(self._provision_one, batch):
+                    if error:
+                        stats['errors'].append(error)
+                logger.info(f"Pré-provisionamento: lote de {len(batch)} usuários concluído.")
+
+        # O que falhou não foi criado
+        for error in stats['errors']:
+            for key in error['pending']:
+                stats[key] -= 1
+        return stats
+
+    def _provision_one(self, item):
+        """Pool -> usuário -> ACL (a ACL exige os dois). Retorna None ou o erro."""
+        username, poolid, userid, (need_pool, need_user, need_acl) = item
+        conn = self.proxmox.connection
+        existence = self.proxmox.existence
+        pending = [key for key, needed in (
+            ('pools_created', need_pool), ('pve_users_created', need_user), ('acls_created', need_acl)
+        ) if needed]
+        try:
+            if need_pool:
+                try:
+                    conn.pools.post(poolid=poolid, comment=f"Pool dedicado ao usuário: {username}")
+                except ResourceException as e:
+                    # Criado por um deploy entre a listagem e agora
+                    if 'already exists' not in str(e):
+                        raise
+                existence.add('pools', poolid)
+                pending.remove('pools_created')
+            if need_user:
+                try:
+                    conn.access.users.post(userid=userid, enable=1, comment="Gerenciado pelo Nubemox")
+                except ResourceException as e:
+                    if 'already exists' not in str(e):
+                        raise
+                existence.add('users', userid)
+                pending.remove('pve_users_created')
+            if need_acl:
+                conn.access.acl.put(path=f'/pool/{poolid}', roles=self.role, users=userid)
+                existence.add('acls', (f'/pool/{poolid}', userid, self.role))
+                pending.remove('acls_created')
+        except Exception as e:
+            logger.warning(f"Pré-provisionamento de '{username}' falhou: {e}")
+            return {'username': username, 'error': str(e), 'pending': pending}
+        return None
+
+
+class PreProvisionJobs:
+    """Jobs de pré-provisionamento do processo (os últimos `keep`), um rodando por vez."""
+
+    def __init__(self, keep=20):
+        self.keep = keep
+        self._jobs = OrderedDict()
+        self._done = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def running(self):
+        with self._lock:
+            return next((dict(j) for j in self._jobs.values() if j['status'] == 'running'), None)
+
+    def submit(self, app, proxmox, group_id=None, ldap_filter=None, dry_run=False):
+        """Inicia o job numa thread com app context. Devolve o job, ou None se já há um rodando."""
+        with self._lock:
+            if any(j['status'] == 'running' for j in self._jobs.values()):
+                return None
+            job = {'id': next(self._ids), 'status': 'running', 'group_id': group_id,
+                   'ldap_filter': ldap_filter, 'dry_run': dry_run,
+                   'started_at': datetime.utcnow().isoformat(), 'finished_at': None,
+                   'stats': None, 'error': None}
+            self._jobs[job['id']] = job
+            self._done[job['id']] = threading.Event()
+            while len(self._jobs) > self.keep:
+                old_id, _ = self._jobs.popitem(last=False)
+                self._done.pop(old_id, None)
+
+        def work():
+            try:
+                with app.app_context():
+                    group = db.session.get(UserGroup, group_id) if group_id else None
+                    stats = PreProvisioner(proxmox).run(group=group, ldap_filter=ldap_filter, dry_run=dry_run)
+                result = {'status': 'done', 'stats': stats}
+            except Exception as e:
+                logger.exception(f"Job de pré-provisionamento {job['id']} falhou: {e}")
+                result = {'status': 'failed', 'error': str(e)}
+            with self._lock:
+                job.update(result, finished_at=datetime.utcnow().isoformat())
+            self._done[job['id']].set()
+
+        threading.Thread(target=work, name=f"preprovision-{job['id']}", daemon=True).start()
+        return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def wait(self, job_id, timeout=None):
+        """Espera o job terminar (CLI/testes). Devolve o job."""
+        done = self._done.get(job_id)
+        if done is not None:
+            done.wait(timeout)
+        return self.get(job_id)
+
+
+def get_preprovision_jobs(app=None):
+    app = app or current_app._get_current_object()
+    jobs = app.extensions.get('preprovision_jobs')
+    if jobs is None:
+        jobs = app.extensions.setdefault('preprovision_jobs', PreProvisionJobs())
+    return jobs
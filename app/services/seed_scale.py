@@ -0,0 +1,230 @@
+# app/services/seed_scale.py
+"""
+Dataset sintético em escala (grupos, usuários, templates e recursos) para achar
+problemas de desempenho em dev, onde o `flask init-db` só cria dois de cada.
+
+- Carga em lote: no PostgreSQL, COPY ... FROM STDIN (CSV em memória, por lotes);
+  nos outros bancos, INSERT executemany em lotes (insertmanyvalues do SQLAlchemy).
+  Nada de ORM por linha: 1M de recursos em segundos no PostgreSQL.
+- Distribuições próximas das reais: a maioria dos usuários em turmas, alguns
+  docentes e admins; poucos usuários concentram muitos recursos (cauda longa);
+  ~60% dos recursos ligados; specs vindas do template.
+- Opcional: cria os mesmos guests (e pools 'vps-<username>') num PVE stand-in
+  local (benchmarks/pve_standin.py) via POST /api2/json/standin/load, para que
+  listagens e deploys batam em IDs que existem dos dois lados.
+
+CLI: `flask seed-scale --users 100000 --resources 1000000` (ver app/commands.py).
+"""
+import csv
+from datetime import datetime, timedelta
+import io
+import itertools
+import logging
+import random
+
+from sqlalchemy import func, insert, select
+
+from app.extensions import db
+from app.models import ServiceTemplate, User, UserGroup, VirtualResource
+from app.services.passwords import DIRECTORY_MANAGED
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = [('os', 60), ('database', 15), ('web', 15), ('devtools', 10)]
+STATUSES = [('running', 60), ('stopped', 35), ('provisioning', 3), ('error', 2)]
+LXC_SIZES = [(1, 512, 8), (1, 1024, 8), (2, 2048, 16), (2, 4096, 32)]
+QEMU_SIZES = [(2, 2048, 20), (2, 4096, 32), (4, 8192, 64)]
+
+
+def _weighted(rnd, choices):
+    """Sorteador com pesos (acumulados calculados uma vez: é chamado por linha)."""
+    values, weights = zip(*choices)
+    cum_weights = list(itertools.accumulate(weights))
+    return lambda: rnd.choices(values, cum_weights=cum_weights)[0]
+
+
+class ScaleSeeder:
+    def __init__(self, prefix='scale', batch_size=50000, seed=42, vmid_start=None):
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.rnd = random.Random(seed)
+        self.vmid_start = vmid_start
+        self.now = datetime.utcnow()
+        self.guests = []    # Para o PVE stand-in: [{vmid, type, name, status, ...}]
+        self.volumes = []
+        self._category = _weighted(self.rnd, CATEGORIES)
+        self._status = _weighted(self.rnd, STATUSES)
+
+    # ------------------------------------------------------------------
+    # CARGA EM LOTE
+    # ------------------------------------------------------------------
+    @property
+    def use_copy(self):
+        return db.engine.dialect.name == 'postgresql'
+
+    def _load(self, model, columns, rows):
+        """Grava `rows` (tuplas na ordem de `columns`) em lotes. Devolve o total."""
+        total = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                total += self._flush(model, columns, batch)
+                batch = []
+        if batch:
+            total += self._flush(model, columns, batch)
+        return total
+
+    def _flush(self, model, columns, batch):
+        if self.use_copy:
+            self._copy(model.__table__, columns, batch)
+        else:
+            db.session.execute(insert(model), [dict(zip(columns, row)) for row in batch])
+        return len(batch)
+
+    def _copy(self, table, columns, batch):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            # CSV do COPY: campo vazio sem aspas = NULL
+            writer.writerow(['' if value is None else value for value in row])
+        buffer.seek(0)
+        quote = db.engine.dialect.identifier_preparer.quote
+        sql = (f"COPY {quote(table.name)} ({', '.join(quote(c) for c in columns)}) "
+               f"FROM STDIN WITH (FORMAT csv)")
+        dbapi_connection = db.session.connection().connection.dbapi_connection
+        with dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(sql, buffer)
+
+    def _created_at(self):
+        # Últimos 12 meses, mais recentes com mais peso
+        return self.now - timedelta(days=365 * self.rnd.random() ** 2, seconds=self.rnd.randrange(86400))
+
+    # ------------------------------------------------------------------
+    # ENTIDADES
+    # ------------------------------------------------------------------
+    def seed_groups(self, count):
+        """Turmas (com VLAN própria) e um grupo de docentes com cota maior."""
+        columns = ('name', 'description', 'default_storage_pool', 'default_network_bridge',
+                   'default_vlan_tag', 'max_vms', 'max_cpu', 'max_memory', 'max_storage')
+        rows = [(f'{self.prefix}-docentes', 'Docentes', 'local-lvm', 'vmbr0', None, 10, 16, 32768, 500)]
+        for i in range(1, count):
+            rows.append((f'{self.prefix}-turma-{i:04d}', f'Turma {i}', 'local-lvm', 'vmbr0',
+                         100 + i % 3900, self.rnd.choice((2, 3, 5)), self.rnd.choice((2, 4)),
+                         self.rnd.choice((2048, 4096)), self.rnd.choice((20, 40))))
+        self._load(UserGroup, columns, rows[:count])
+        return self._ids(UserGroup, UserGroup.name)
+
+    def seed_users(self, count, group_ids):
+        """~85% em turmas, ~5% docentes, ~10% sem grupo; 0,1% admins; 2% com override de cota."""
+        docentes, turmas = (group_ids[0], group_ids[1:]) if group_ids else (None, [])
+        columns = ('username', 'email', 'password_hash', 'is_admin', 'policy_version', 'group_id',
+                   'quota_vms_override', 'quota_cpu_override', 'quota_memory_override', 'quota_storage_override')
+
+        def rows():
+            for i in range(count):
+                username = f'{self.prefix}-u{i:07d}'
+                draw = self.rnd.random()
+                group_id = (self.rnd.choice(turmas) if turmas and draw < 0.85
+                            else docentes if draw < 0.90 else None)
+                override = self.rnd.random() < 0.02
+                yield (username, f'{username}@nubemox.local', DIRECTORY_MANAGED, self.rnd.random() < 0.001, 0,
+                       group_id, 10 if override else None, 8 if override else None,
+                       16384 if override else None, 200 if override else None)
+
+        self._load(User, columns, rows())
+        return self._ids(User, User.username)
+
+    def seed_templates(self, count):
+        """~70% LXC (clone de template ou arquivo vztmpl), ~30% QEMU (clone); ~85% ativos."""
+        columns = ('name', 'type', 'proxmox_template_volid', 'deploy_mode', 'description', 'is_active',
+                   'category', 'default_cpu', 'default_memory', 'default_storage', 'created_at')
+        rows = []
+        templates = []
+        for i in range(count):
+            guest_type = 'lxc' if self.rnd.random() < 0.7 else 'qemu'
+            cores, memory, disk = self.rnd.choice(LXC_SIZES if guest_type == 'lxc' else QEMU_SIZES)
+            if guest_type == 'lxc' and self.rnd.random() < 0.6:
+                volid, mode = f'local:vztmpl/{self.prefix}-{i:05d}-standard_amd64.tar.zst', 'file'
+                self.volumes.append({'storage': 'local', 'volid': volid, 'content': 'vztmpl'})
+            else:
+                volid, mode = str(8000000 + i), 'clone'
+                self.guests.append({'vmid': int(volid), 'type': guest_type, 'name': f'tpl-{self.prefix}-{i}',
+                                    'template': True, 'cores': cores, 'memory': memory, 'disk_gb': disk})
+            rows.append((f'{self.prefix} template {i}', guest_type, volid, mode, f'Template sintético {i}',
+                         self.rnd.random() < 0.85, self._category(), cores, memory, disk,
+                         self._created_at()))
+            templates.append((guest_type, cores, memory, disk))
+        self._load(ServiceTemplate, columns, rows)
+        ids = self._ids(ServiceTemplate, ServiceTemplate.name)
+        return list(zip(ids, templates))
+
+    def seed_resources(self, count, user_ids, templates, usernames=None):
+        """
+        Cauda longa: o dono é sorteado com peso concentrado nos primeiros usuários
+        (poucos com dezenas de recursos, a maioria com 0-2).
+        """
+        if not user_ids or not templates:
+            return 0
+        vmid = self.vmid_start or self._next_vmid()
+        columns = ('proxmox_vmid', 'name', 'type', 'template_id', 'owner_id', 'cpu_cores', 'memory_mb',
+                   'storage_gb', 'status', 'created_at')
+        populate_pve = usernames is not None
+
+        def rows():
+            for i in range(count):
+                owner = int(len(user_ids) * self.rnd.random() ** 3)
+                template_id, (guest_type, cores, memory, disk) = self.rnd.choice(templates)
+                status = self._status()
+                name = f'{self.prefix}-r{i:07d}'
+                if populate_pve:
+                    self.guests.append({'vmid': vmid + i, 'type': guest_type, 'name': name,
+                                        'status': 'running' if status == 'running' else 'stopped',
+                                        'cores': cores, 'memory': memory, 'disk_gb': disk,
+                                        'pool': f'vps-{usernames[owner].lower()}'})
+                yield (vmid + i, name, guest_type, template_id, user_ids[owner], cores, memory, disk,
+                       status, self._created_at())
+
+        return self._load(VirtualResource, columns, rows())
+
+    def _ids(self, model, name_column):
+        return self._values(model, model.id, name_column)
+
+    def _values(self, model, column, name_column):
+        """`column` do que este seeder criou (pelo prefixo do nome), em ordem de criação."""
+        return list(db.session.execute(
+            select(column).where(name_column.startswith(self.prefix, autoescape=True)).order_by(model.id)
+        ).scalars())
+
+    def _next_vmid(self):
+        current = db.session.execute(select(func.max(VirtualResource.proxmox_vmid))).scalar()
+        return max(100000, (current or 0) + 1)
+
+    # ------------------------------------------------------------------
+    # EXECUÇÃO
+    # ------------------------------------------------------------------
+    def run(self, groups=50, users=10000, templates=100, resources=100000, pve=False):
+        """Popula tudo numa transação. Devolve as contagens."""
+        group_ids = self.seed_groups(groups) if groups else []
+        user_ids = self.seed_users(users, group_ids) if users else []
+        # Pool do dono no PVE: 'vps-<username>', na mesma ordem de user_ids
+        usernames = self._values(User, User.username, User.username) if pve and resources else None
+        template_rows = self.seed_templates(templates) if templates else []
+        created = self.seed_resources(resources, user_ids, template_rows, usernames)
+        db.session.commit()
+        return {'groups': len(group_ids), 'users': len(user_ids), 'templates': len(template_rows),
+                'resources': created}
+
+    def populate_pve(self, url, session=None, batch_size=5000):
+        """Envia guests e volumes gerados ao PVE stand-in (POST {url}/standin/load)."""
+        import requests
+
+        session = session or requests.Session()
+        for start in range(0, max(len(self.guests), len(self.volumes), 1), batch_size):
+            payload = {'guests': self.guests[start:start + batch_size],
+                       'volumes': self.volumes[start:start + batch_size]}
+            if not payload['guests'] and not payload['volumes']:
+                break
+            response = session.post(f'{url}/standin/load', json=payload, verify=False, timeout=300)
+            response.raise_for_status()
+        return {'guests': len(self.guests), 'volumes': len(self.volumes)}
@@ -0,0 +1,240 @@
+# app/services/template_scan.py
+"""
+Varredura de candidatos a template no cluster (GET /api/admin/templates/scan).
+
+Só entra o que o deploy consegue usar: ServiceTemplate não guarda nó e o deploy
+roda no nó de proxmox_client._resolve_node_id(). Então:
+- Arquivos: todo storage ativo com conteúdo 'vztmpl' ou 'iso' visto pelo nó de
+  deploy (os locais dele e os compartilhados). Storage local de outro nó fica de fora.
+- Templates clonáveis (QEMU e LXC com template=1): uma chamada só, em
+  /cluster/resources?type=vm, filtrada pelo nó de deploy (o clone parte do nó
+  do template). Os de outros nós contam em 'skipped'.
+- As listagens rodam em paralelo num pool limitado (TEMPLATE_SCAN_WORKERS):
+  a varredura leva o tempo da listagem mais lenta, não a soma.
+- Duplicatas (o mesmo volid em dois storages) são descartadas por set.
+
+Índice em memória (TEMPLATE_SCAN_INTERVAL): a varredura completa é refeita em
+background a cada intervalo e a tela de admin é respondida na hora. A primeira
+varredura do processo também roda em background (a requisição recebe 'pending'
+em vez de esperar o cluster). O filtro do que já está no catálogo é aplicado na
+requisição, contra o banco, para que um template recém-importado saia da lista
+sem esperar o próximo refresh.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from datetime import datetime
+import logging
+import math
+import threading
+import time
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_CONTENTS = ('vztmpl', 'iso')
+FILE_SUFFIXES = ('.iso', '.tar.zst', '.tar.xz', '.tar.gz')
+
+
+def _size_gb(size_bytes):
+    return math.ceil(int(size_bytes or 0) / (1024 ** 3))
+
+
+def _file_candidate(item, node, storage):
+    volid = str(item.get('volid'))
+    name = volid.split('/')[-1]
+    for suffix in FILE_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return {
+        'volid': volid,
+        'name': name,
+        'type': 'lxc' if item.get('content') == 'vztmpl' else 'qemu',  # Se ISO, sugere QEMU
+        'detected_size_gb': max(1, _size_gb(item.get('size'))),
+        'origin': 'file',  # Flag para definir deploy_mode depois
+        'node': node,
+        'storage': storage,
+    }
+
+
+def _guest_candidate(guest):
+    vmid = str(guest.get('vmid'))
+    guest_type = guest.get('type')
+    default_name = f'VM-Template-{vmid}' if guest_type == 'qemu' else f'LXC-Template-{vmid}'
+    return {
+        'volid': vmid,
+        'name': guest.get('name') or default_name,
+        'type': guest_type,
+        'detected_size_gb': _size_gb(guest.get('maxdisk')),
+        'origin': 'vm',  # Indica Clone (CT e VM usam o vmid)
+        'node': guest.get('node'),
+    }
+
+
+class TemplateScanner:
+    """Varredura concorrente do que o nó de deploy alcança (storages + templates de guest)."""
+
+    def __init__(self, client, max_workers=8):
+        self.client = client
+        self.max_workers = max_workers
+
+    def scan(self):
+        """Devolve {'candidates': [...], 'errors': [...], 'node', 'skipped', 'listings', 'duration_ms'}."""
+        start = time.perf_counter()
+        connection = self.client.connection
+        node = self.client._resolve_node_id()
+        errors = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='template-scan') as executor:
+            def submit(fn, *args):
+                # Cópia do contexto: os spans de tracing entram no trace da requisição
+                return executor.submit(contextvars.copy_context().run, fn, *args)
+
+            # 1. Templates de guest (todos os nós numa chamada) e storages do nó, em paralelo
+            guests_future = submit(lambda: connection.cluster.resources.get(type='vm'))
+            storages_future = submit(lambda: connection.nodes(node).storage.get())
+
+            # 2. Conteúdo de cada storage com vztmpl/iso
+            content_futures = []
+            try:
+                storages = storages_future.result()
+            except Exception as e:
+                errors.append(f"{node}: {e}")
+                storages = []
+            for storage in storages:
+                name = storage.get('storage')
+                contents = set(str(storage.get('content', '')).split(','))
+                if not contents.intersection(TEMPLATE_CONTENTS):
+                    continue
+                if not storage.get('active', 1) or not storage.get('enabled', 1):
+                    continue
+                content_futures.append((name, submit(
+                    lambda s=name: connection.nodes(node).storage(s).content.get()
+                )))
+
+            candidates = []
+            seen = set()
+            skipped = 0
+
+            for storage, future in content_futures:
+                try:
+                    items = future.result()
+                except Exception as e:
+                    errors.append(f"{node}/{storage}: {e}")
+                    continue
+                for item in items:
+                    volid = str(item.get('volid'))
+                    if item.get('content') in TEMPLATE_CONTENTS and volid not in seen:
+                        seen.add(volid)
+                        candidates.append(_file_candidate(item, node, storage))
+
+            try:
+                for guest in guests_future.result():
+                    vmid = str(guest.get('vmid'))
+                    if guest.get('template') != 1 or guest.get('type') not in ('qemu', 'lxc'):
+                        continue
+                    if guest.get('node') != node:
+                        skipped += 1
+                        continue
+                    if vmid not in seen:
+                        seen.add(vmid)
+                        candidates.append(_guest_candidate(guest))
+            except Exception as e:
+                errors.append(f"cluster/resources: {e}")
+
+        for error in errors:
+            logger.warning(f"Aviso Scan de templates: {error}")
+        return {
+            'candidates': candidates,
+            'errors': errors,
+            'node': node,
+            'skipped': skipped,
+            'listings': 2 + len(content_futures),
+            'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+
+
+class TemplateCandidateIndex:
+    """Última varredura em memória, refeita em background a cada `interval` s."""
+
+    def __init__(self, app, scanner, interval):
+        self.app = app
+        self.scanner = scanner
+        self.interval = interval
+        self._index = None        # (resultado, monotonic, datetime) trocado de uma vez
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.ready = threading.Event()  # Primeira varredura em background terminou (com ou sem sucesso)
+        self.last_error = None          # Erro da última varredura em background (None se deu certo)
+        self._thread = None
+
+    def refresh(self):
+        with self._refresh_lock:
+            result = self.scanner.scan()
+            self._index = (result, time.monotonic(), datetime.utcnow())
+        return self._index
+
+    def get(self, fresh=False):
+        """
+        Resultado com metadados de cache. Sem índice ainda, dispara a primeira
+        varredura em background e devolve None (a requisição não espera o cluster).
+        Se a primeira varredura falhou, levanta RuntimeError com o erro (a próxima
+        tentativa é no próximo intervalo, ou com fresh=True).
+        """
+        index = self._index
+        if fresh:
+            index = self.refresh()
+        self.start()
+        if index is None:
+            if self.ready.is_set() and self.last_error is not None:
+                raise RuntimeError(f"Falha na varredura de templates: {self.last_error}")
+            return None
+
+        result, taken_at, scanned_at = index
+        return dict(result, cached=not fresh, scanned_at=scanned_at.isoformat(),
+                    age_seconds=round(time.monotonic() - taken_at, 2))
+
+    def start(self):
+        """Inicia a thread de refresh (uma por processo, no primeiro uso); a primeira varredura é imediata."""
+        with self._start_lock:
+            if self._thread is not None or self.interval <= 0:
+                return
+
+            def loop():
+                while True:
+                    try:
+                        with self.app.app_context():
+                            self.refresh()
+                        self.last_error = None
+                    except Exception as e:
+                        # Mantém o índice anterior
+                        self.last_error = str(e)
+                        logger.warning(f"Falha ao atualizar o índice de templates: {e}")
+                    self.ready.set()
+                    if self._stop.wait(self.interval):
+                        return
+
+            self._thread = threading.Thread(target=loop, name='template-scan-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def scan_template_candidates(client, fresh=False):
+    """
+    Candidatos a template do cluster. Com TEMPLATE_SCAN_INTERVAL > 0 vem do índice
+    do processo (refresh em background) e é None enquanto a primeira varredura
+    não termina (RuntimeError se ela falhou); com 0, toda chamada varre ao vivo.
+    """
+    app = current_app._get_current_object()
+    scanner = TemplateScanner(client, max_workers=app.config.get('TEMPLATE_SCAN_WORKERS', 8))
+    interval = app.config.get('TEMPLATE_SCAN_INTERVAL', 300)
+    if interval <= 0:
+        return dict(scanner.scan(), cached=False, scanned_at=datetime.utcnow().isoformat(), age_seconds=0)
+    index = app.extensions.get('template_index')
+    if index is None:
+        index = app.extensions.setdefault('template_index', TemplateCandidateIndex(app, scanner, interval))
+    return index.get(fresh=fresh)
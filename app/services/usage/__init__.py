@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.models import UsageRollup
+from .aggregation import summarize, cluster_totals, epoch_to_datetime, datetime_to_epoch, nan_to_none
+from .collector import UsageCollector, ROLLUP_COLUMNS
+
+RESOLUTIONS = ('hour', 'day')
+
+
+def get_usage_series(scope, targets, resolution='hour', days=1):
+    """
+    Lê os rollups já agregados (nenhuma chamada ao Proxmox).
+    Retorna {target: [UsageRollup, ...]} ordenado por intervalo.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    query = UsageRollup.query.filter(
+        UsageRollup.scope == scope,
+        UsageRollup.resolution == resolution,
+        UsageRollup.bucket >= since
+    )
+    if targets is not None:
+        query = query.filter(UsageRollup.target.in_([str(t) for t in targets]))
+
+    series = {}
+    for row in query.order_by(UsageRollup.bucket):
+        series.setdefault(row.target, []).append(row)
+    return series
+
+
+def get_guest_usage(vmid, resolution='hour', days=1):
+    """Série de um guest + resumo (média/p95/pico) para o dashboard."""
+    rows = get_usage_series('guest', [vmid], resolution, days).get(str(vmid), [])
+    return {
+        'vmid': vmid,
+        'resolution': resolution,
+        'points': [r.to_dict() for r in rows],
+        'summary': {
+            'cpu': summarize([r.cpu_avg for r in rows]),
+            'memory': summarize([r.mem_avg for r in rows]),
+        }
+    }
+
+
+def get_cluster_usage(resolution='day', days=30):
+    """Séries por node + total do cluster somado por intervalo."""
+    series = get_usage_series('node', None, resolution, days)
+    rows = [r for node_rows in series.values() for r in node_rows]
+
+    buckets = [datetime_to_epoch(r.bucket) for r in rows]
+    columns = {
+        col: [np.nan if getattr(r, col) is None else getattr(r, col) for r in rows]
+        for col in ROLLUP_COLUMNS
+    }
+    unique, totals = cluster_totals(buckets, columns)
+
+    cluster = []
+    for i, bucket in enumerate(unique):
+        point = {col: nan_to_none(totals[col][i]) for col in ROLLUP_COLUMNS}
+        point['bucket'] = epoch_to_datetime(bucket).isoformat()
+        cluster.append(point)
+
+    return {
+        'resolution': resolution,
+        'nodes': {name: [r.to_dict() for r in node_rows] for name, node_rows in series.items()},
+        'cluster': cluster,
+    }
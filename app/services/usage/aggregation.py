@@ -0,0 +1,149 @@
+# app/services/usage/aggregation.py
+"""
+Agregação vetorizada (NumPy) das séries do rrddata.
+
+Tudo trabalha com arrays "achatados": cada ponto tem um código de alvo
+(índice do guest/node no lote), um timestamp, um peso e os valores das métricas.
+Um único np.unique agrupa todos os alvos do lote de uma vez, sem laço por ponto.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+
+HOUR = 3600
+DAY = 86400
+
+# Métricas com média ponderada e pico
+AVG_MAX_METRICS = ('cpu', 'mem')
+# Métricas só com média
+AVG_METRICS = ('disk', 'netin', 'netout')
+# Capacidades (constantes no intervalo): guardamos o maior valor visto
+CAPACITY_METRICS = ('maxmem', 'maxdisk')
+
+METRICS = AVG_MAX_METRICS + AVG_METRICS + CAPACITY_METRICS
+
+
+def epoch_to_datetime(epoch):
+    """Epoch do PVE -> datetime UTC sem tzinfo (como o resto dos modelos)."""
+    return datetime.fromtimestamp(int(epoch), timezone.utc).replace(tzinfo=None)
+
+
+def datetime_to_epoch(dt):
+    return int(dt.replace(tzinfo=timezone.utc).timestamp())
+
+
+def nan_to_none(value):
+    """NaN não é um valor SQL/JSON válido: intervalo sem dado vira NULL."""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def points_to_columns(points):
+    """
+    Converte a lista de dicts do rrddata em arrays float (NaN onde a métrica falta).
+    O PVE devolve pontos sem valores quando o guest estava desligado.
+    """
+    times = np.fromiter((p.get('time', 0) for p in points), dtype=np.int64, count=len(points))
+    columns = {}
+    for metric in METRICS:
+        columns[metric] = np.fromiter(
+            (np.nan if p.get(metric) is None else p[metric] for p in points),
+            dtype=np.float64, count=len(points)
+        )
+    return times, columns
+
+
+def downsample(codes, times, columns, bucket_seconds, weights=None):
+    """
+    Agrupa os pontos por (código do alvo, início do intervalo).
+
+    `columns` precisa ter todas as METRICS; opcionalmente 'cpu_max'/'mem_max'
+    (usados no lugar de 'cpu'/'mem' para o pico). `weights` pondera as médias
+    (ex: nº de amostras de cada rollup horário).
+
+    Retorna (group_codes, group_buckets, samples, result), onde result traz
+    '<m>_avg' / '<m>_max' e as capacidades. Intervalos sem nenhum valor válido
+    para uma métrica ficam como NaN nela.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    times = np.asarray(times, dtype=np.int64)
+    if weights is None:
+        weights = np.ones(len(times), dtype=np.float64)
+    else:
+        weights = np.asarray(weights, dtype=np.float64)
+
+    if len(times) == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty, {}
+
+    buckets = times - (times % bucket_seconds)
+    keys, inverse = np.unique(np.stack([codes, buckets], axis=1), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n_groups = len(keys)
+
+    # Amostras = pontos com algum dado (pontos todos NaN não contam)
+    has_data = np.zeros(len(times), dtype=bool)
+    for metric in AVG_MAX_METRICS + AVG_METRICS:
+        has_data |= ~np.isnan(columns[metric])
+    samples = np.bincount(inverse, weights=np.where(has_data, weights, 0), minlength=n_groups)
+
+    result = {}
+    for metric in AVG_MAX_METRICS + AVG_METRICS:
+        values = columns[metric]
+        valid = ~np.isnan(values)
+        w = np.where(valid, weights, 0.0)
+        total = np.bincount(inverse, weights=np.where(valid, values, 0.0) * w, minlength=n_groups)
+        weight_sum = np.bincount(inverse, weights=w, minlength=n_groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[f'{metric}_avg'] = np.where(weight_sum > 0, total / weight_sum, np.nan)
+
+    for metric in AVG_MAX_METRICS:
+        # Ao reagregar rollups (hora -> dia) o pico vem da coluna '<m>_max', não da média
+        peaks = columns.get(f'{metric}_max', columns[metric])
+        result[f'{metric}_max'] = _group_max(inverse, peaks, n_groups)
+    for metric in CAPACITY_METRICS:
+        result[metric] = _group_max(inverse, columns[metric], n_groups)
+
+    return keys[:, 0], keys[:, 1], samples.astype(np.int64), result
+
+
+def _group_max(inverse, values, n_groups):
+    out = np.full(n_groups, np.nan)
+    # fmax ignora NaN: grupos sem valor válido continuam NaN
+    np.fmax.at(out, inverse, values)
+    return out
+
+
+def summarize(values):
+    """Resumo de uma série para dashboards: média, p95 e pico (ignorando NaN)."""
+    arr = np.asarray([v for v in values if v is not None], dtype=np.float64)
+    if arr.size == 0:
+        return {'avg': None, 'p95': None, 'max': None}
+    return {
+        'avg': float(np.mean(arr)),
+        'p95': float(np.percentile(arr, 95)),
+        'max': float(np.max(arr)),
+    }
+
+
+def cluster_totals(buckets, columns):
+    """
+    Soma as séries dos nodes por intervalo (capacidade total do cluster).
+    CPU é fração por node, então o total do cluster é a média entre os nodes.
+    """
+    buckets = np.asarray(buckets, dtype=np.int64)
+    if buckets.size == 0:
+        return np.array([], dtype=np.int64), {}
+    unique, inverse = np.unique(buckets, return_inverse=True)
+    n_groups = len(unique)
+    totals = {}
+    for name, values in columns.items():
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        sums = np.bincount(inverse, weights=np.where(valid, values, 0.0), minlength=n_groups)
+        if name.startswith('cpu'):
+            counts = np.bincount(inverse, weights=valid.astype(np.float64), minlength=n_groups)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                sums = np.where(counts > 0, sums / counts, np.nan)
+        totals[name] = sums
+    return unique, totals
@@ -0,0 +1,241 @@
+# app/services/usage/collector.py
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import delete, insert, select, tuple_
+
+from app.extensions import db
+from app.models import UsageRollup
+from .aggregation import (
+    HOUR, DAY, METRICS, points_to_columns, downsample,
+    epoch_to_datetime, datetime_to_epoch, nan_to_none
+)
+
+logger = logging.getLogger(__name__)
+
+# O rrddata do node usa nomes diferentes do rrddata dos guests
+NODE_METRIC_ALIASES = {
+    'memused': 'mem',
+    'memtotal': 'maxmem',
+    'rootused': 'disk',
+    'roottotal': 'maxdisk',
+}
+
+ROLLUP_COLUMNS = ('cpu_avg', 'cpu_max', 'mem_avg', 'mem_max', 'maxmem',
+                  'disk_avg', 'maxdisk', 'netin_avg', 'netout_avg')
+
+
+class UsageCollector:
+    """
+    Coleta o consumo real (rrddata) de guests e nodes e grava rollups horários.
+
+    - Uma chamada lista todos os guests (/cluster/resources) e outra os nodes.
+    - O rrddata é buscado em lotes (USAGE_COLLECT_BATCH_SIZE), com até
+      USAGE_COLLECT_WORKERS requisições simultâneas ao PVE.
+    - Cada lote é agregado de uma vez (NumPy) e gravado com um DELETE + um INSERT.
+    """
+
+    def __init__(self, proxmox, batch_size=None, workers=None):
+        config = current_app.config
+        self.proxmox = proxmox
+        self.batch_size = batch_size or config.get('USAGE_COLLECT_BATCH_SIZE', 50)
+        self.workers = workers or config.get('USAGE_COLLECT_WORKERS', 8)
+
+    # ------------------------------------------------------------------
+    # DESCOBERTA
+    # ------------------------------------------------------------------
+    def list_targets(self):
+        """Retorna [(scope, target, node, guest_type)] para nodes online e guests (sem templates)."""
+        conn = self.proxmox.connection
+        targets = []
+        for node in conn.nodes.get():
+            if node.get('status') == 'online':
+                targets.append(('node', node['node'], node['node'], None))
+
+        for res in conn.cluster.resources.get(type='vm'):
+            if res.get('template'):
+                continue
+            targets.append(('guest', str(res['vmid']), res['node'], res.get('type', 'qemu')))
+        return targets
+
+    def _fetch(self, target, timeframe):
+        scope, name, node, guest_type = target
+        conn = self.proxmox.connection
+        try:
+            if scope == 'node':
+                points = conn.nodes(node).rrddata.get(timeframe=timeframe, cf='AVERAGE')
+                return [{NODE_METRIC_ALIASES.get(k, k): v for k, v in p.items()} for p in points]
+            endpoint = getattr(conn.nodes(node), guest_type)
+            return endpoint(name).rrddata.get(timeframe=timeframe, cf='AVERAGE')
+        except Exception as e:
+            # Guest removido/migrado entre a listagem e a coleta: segue sem ele
+            logger.warning(f"Falha ao ler rrddata de {scope} {name}: {e}")
+            return []
+
+    # ------------------------------------------------------------------
+    # COLETA (rrddata -> rollups horários)
+    # ------------------------------------------------------------------
+    def collect(self, timeframe='hour'):
+        targets = self.list_targets()
+        stats = {'targets': len(targets), 'rows': 0}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for start in range(0, len(targets), self.batch_size):
+                batch = targets[start:start + self.batch_size]
+                series = list(pool.map(lambda t: self._fetch(t, timeframe), batch))
+                stats['rows'] += self._store_batch(batch, series)
+
+        return stats
+
+    def _store_batch(self, batch, series):
+        codes, times, columns = [], [], {m: [] for m in METRICS}
+        for code, points in enumerate(series):
+            if not points:
+                continue
+            t, cols = points_to_columns(points)
+            codes.append(np.full(len(t), code, dtype=np.int64))
+            times.append(t)
+            for m in METRICS:
+                columns[m].append(cols[m])
+
+        if not times:
+            return 0
+
+        group_codes, group_buckets, samples, result = downsample(
+            np.concatenate(codes),
+            np.concatenate(times),
+            {m: np.concatenate(v) for m, v in columns.items()},
+            HOUR
+        )
+
+        rows = []
+        for i in range(len(group_codes)):
+            if samples[i] == 0:
+                continue
+            scope, target = batch[group_codes[i]][:2]
+            row = {
+                'scope': scope,
+                'target': target,
+                'resolution': 'hour',
+                'bucket': epoch_to_datetime(group_buckets[i]),
+                'samples': int(samples[i]),
+            }
+            for col in ROLLUP_COLUMNS:
+                row[col] = nan_to_none(result[col][i])
+            rows.append(row)
+
+        return self._replace_rows(rows, keep_larger=True)
+
+    def _replace_rows(self, rows, keep_larger=False):
+        """
+        Grava os rollups substituindo pontos já existentes (mesmo alvo/intervalo).
+
+        Com keep_larger=True, um ponto novo só substitui o antigo se tiver pelo
+        menos tantas amostras quanto ele: a janela do rrddata corta a primeira
+        hora no meio, e essa hora parcial não pode sobrescrever a completa gravada
+        na coleta anterior.
+        """
+        if not rows:
+            return 0
+
+        resolution = rows[0]['resolution']
+        keys = [(r['scope'], r['target'], r['bucket']) for r in rows]
+        key_cols = tuple_(UsageRollup.scope, UsageRollup.target, UsageRollup.bucket)
+
+        if keep_larger:
+            existing = {
+                (scope, target, bucket): samples
+                for scope, target, bucket, samples in db.session.execute(
+                    select(UsageRollup.scope, UsageRollup.target, UsageRollup.bucket, UsageRollup.samples)
+                    .where(UsageRollup.resolution == resolution, key_cols.in_(keys))
+                )
+            }
+            rows = [r for r in rows if r['samples'] >= existing.get((r['scope'], r['target'], r['bucket']), 0)]
+            keys = [(r['scope'], r['target'], r['bucket']) for r in rows]
+            if not rows:
+                return 0
+
+        db.session.execute(
+            delete(UsageRollup)
+            .where(UsageRollup.resolution == resolution, key_cols.in_(keys))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(insert(UsageRollup), rows)
+        db.session.commit()
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # ROLLUP DIÁRIO E RETENÇÃO
+    # ------------------------------------------------------------------
+    def rollup_daily(self, days=2):
+        """Recalcula os rollups diários dos últimos `days` dias a partir dos horários."""
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        since = today - timedelta(days=days - 1)
+
+        hourly = db.session.execute(
+            select(UsageRollup.scope, UsageRollup.target, UsageRollup.bucket,
+                   UsageRollup.samples, *[getattr(UsageRollup, c) for c in ROLLUP_COLUMNS])
+            .where(UsageRollup.resolution == 'hour', UsageRollup.bucket >= since)
+        ).all()
+        if not hourly:
+            return 0
+
+        target_index = {}
+        codes = np.fromiter(
+            (target_index.setdefault((r.scope, r.target), len(target_index)) for r in hourly),
+            dtype=np.int64, count=len(hourly)
+        )
+        targets = list(target_index)
+        times = np.fromiter((datetime_to_epoch(r.bucket) for r in hourly), dtype=np.int64, count=len(hourly))
+        weights = np.fromiter((r.samples or 0 for r in hourly), dtype=np.float64, count=len(hourly))
+
+        def column(name):
+            return np.fromiter((np.nan if getattr(r, name) is None else getattr(r, name) for r in hourly),
+                               dtype=np.float64, count=len(hourly))
+
+        columns = {
+            'cpu': column('cpu_avg'), 'cpu_max': column('cpu_max'),
+            'mem': column('mem_avg'), 'mem_max': column('mem_max'),
+            'disk': column('disk_avg'), 'netin': column('netin_avg'), 'netout': column('netout_avg'),
+            'maxmem': column('maxmem'), 'maxdisk': column('maxdisk'),
+        }
+        group_codes, group_buckets, samples, result = downsample(codes, times, columns, DAY, weights=weights)
+
+        rows = []
+        for i in range(len(group_codes)):
+            scope, target = targets[group_codes[i]]
+            row = {
+                'scope': scope,
+                'target': target,
+                'resolution': 'day',
+                'bucket': epoch_to_datetime(group_buckets[i]),
+                'samples': int(samples[i]),
+            }
+            for col in ROLLUP_COLUMNS:
+                row[col] = nan_to_none(result[col][i])
+            rows.append(row)
+
+        # O dia é sempre recalculado por inteiro a partir das horas: substitui sem comparar
+        return self._replace_rows(rows)
+
+    def prune(self):
+        """Aplica a retenção: remove rollups mais antigos que o configurado para cada resolução."""
+        config = current_app.config
+        now = datetime.utcnow()
+        policies = {
+            'hour': config.get('USAGE_RETENTION_HOURLY_DAYS', 14),
+            'day': config.get('USAGE_RETENTION_DAILY_DAYS', 400),
+        }
+        removed = 0
+        for resolution, days in policies.items():
+            result = db.session.execute(
+                delete(UsageRollup)
+                .where(UsageRollup.resolution == resolution, UsageRollup.bucket < now - timedelta(days=days))
+                .execution_options(synchronize_session=False)
+            )
+            removed += result.rowcount or 0
+        db.session.commit()
+        return removed
@@ -0,0 +1,427 @@
+# app/tracing.py
+"""
+Tracing leve por requisição (TRACING_ENABLED).
+
+Cada requisição ganha um trace_id (devolvido em X-Trace-Id). Nas requisições
+amostradas, uma árvore de spans registra onde o tempo foi gasto:
+
+- request: a requisição inteira (método, rota, status);
+- spans de serviço (@traced): clone_container, ensure_pve_user, ensure_user_pool...;
+- pve.task_wait: espera de tarefa do PVE (UPID);
+- PVE <MÉTODO> <path>: cada chamada HTTP do proxmoxer (inclusive o polling das tarefas);
+- sql: cada statement executado pelo SQLAlchemy;
+- ldap.bind: bind de login no diretório.
+
+Amostragem: TRACING_SAMPLE_RATE (0..1). Um header W3C `traceparent` de entrada
+reaproveita o trace_id e, com a flag 01, força a amostragem (útil para investigar
+uma requisição específica: `traceparent: 00-<32 hex>-<16 hex>-01`).
+
+Exportação ao fim de cada requisição amostrada (TRACING_EXPORTER):
+- jsonl: um span por linha em TRACING_FILE, com rotação por tamanho;
+- otlp: OTLP/HTTP JSON (POST em TRACING_OTLP_ENDPOINT), em lotes numa thread
+  própria. Para testes locais: benchmarks/otlp_standin.py.
+
+Desligado, nenhum hook é registrado; os pontos instrumentados só consultam uma
+ContextVar vazia.
+"""
+from contextlib import contextmanager
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import pve_instrumentation
+
+logger = logging.getLogger(__name__)
+
+_current_trace = contextvars.ContextVar('nubemox_trace', default=None)
+_current_span = contextvars.ContextVar('nubemox_span', default=None)
+
+
+def new_id(nbytes=8):
+    return os.urandom(nbytes).hex()
+
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'kind', 'attributes',
+                 'start', 'end', '_start_perf', 'error')
+
+    def __init__(self, trace_id, name, kind='internal', parent_id=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.end = None
+        self.error = None
+
+    def finish(self):
+        self.end = self.start + (time.perf_counter() - self._start_perf)
+
+    @property
+    def duration_ms(self):
+        return round(((self.end or time.time()) - self.start) * 1000, 3)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start': self.start,
+            'duration_ms': self.duration_ms,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class Trace:
+    def __init__(self, trace_id, sampled, max_spans=2000):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.max_spans = max_spans
+        self.spans = []
+        self.dropped = 0
+
+    def add(self, span):
+        # Polling longo de tarefa não pode crescer sem limite
+        if len(self.spans) < self.max_spans:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+
+def current_trace_id():
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+def _active_trace():
+    trace = _current_trace.get()
+    return trace if trace is not None and trace.sampled else None
+
+
+def start_span(name, kind='internal', **attributes):
+    """Abre um span filho do span corrente (sem torná-lo corrente). None fora de trace amostrado."""
+    trace = _active_trace()
+    if trace is None:
+        return None
+    parent = _current_span.get()
+    return Span(trace.trace_id, name, kind, parent.span_id if parent else None, attributes)
+
+
+def end_span(span, error=None):
+    if span is None:
+        return
+    span.finish()
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(span)
+
+
+@contextmanager
+def span(name, kind='internal', **attributes):
+    """Span corrente durante o bloco (os spans abertos dentro dele viram filhos)."""
+    current = start_span(name, kind, **attributes)
+    if current is None:
+        yield None
+        return
+    token = _current_span.set(current)
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        end_span(current, error)
+
+
+def traced(name=None, kind='internal'):
+    """Decorator: a chamada inteira vira um span (nome padrão: Classe.método)."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active_trace() is None:
+                return func(*args, **kwargs)
+            with span(span_name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ==============================================================================
+# EXPORTADORES
+# ==============================================================================
+
+class JSONLinesExporter:
+    """Um span por linha (JSON), com rotação por tamanho."""
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backup_count=5):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+        # Logger próprio: não propaga para o log da aplicação
+        self._logger = logging.Logger('nubemox.traces')
+        self._logger.addHandler(self._handler)
+
+    def export(self, spans):
+        for item in spans:
+            self._logger.info(json.dumps(item.to_dict(), default=str))
+
+    def close(self):
+        self._handler.close()
+
+
+class OTLPExporter:
+    """
+    OTLP/HTTP com corpo JSON (POST /v1/traces), compatível com o OpenTelemetry
+    Collector. Os spans entram numa fila e saem em lotes por uma thread própria:
+    a requisição nunca espera o coletor. Fila cheia = spans descartados.
+    """
+
+    def __init__(self, endpoint, service_name='nubemox-api', batch_size=512, interval=2.0,
+                 max_queue=10000, timeout=5):
+        import requests  # Já vem com o proxmoxer
+        self._session = requests.Session()
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self.timeout = timeout
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='otlp-exporter', daemon=True)
+        self._thread.start()
+
+    def export(self, spans):
+        for item in spans:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._stop.wait(self.interval)
+            self.flush()
+
+    def flush(self):
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            try:
+                self._session.post(self.endpoint, json=self.to_otlp(batch), timeout=self.timeout)
+            except Exception as e:
+                logger.warning(f"Falha ao exportar {len(batch)} spans para {self.endpoint}: {e}")
+
+    def to_otlp(self, spans):
+        return {'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attribute('service.name', self.service_name)]},
+            'scopeSpans': [{
+                'scope': {'name': 'app.tracing'},
+                'spans': [_otlp_span(item) for item in spans],
+            }],
+        }]}
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+# kind do OTLP: 1 = INTERNAL, 2 = SERVER, 3 = CLIENT
+_OTLP_KINDS = {'request': 2, 'pve': 3, 'sql': 3, 'ldap': 3}
+
+
+def _otlp_span(item):
+    data = {
+        'traceId': item.trace_id,
+        'spanId': item.span_id,
+        'name': item.name,
+        'kind': _OTLP_KINDS.get(item.kind, 1),
+        'startTimeUnixNano': str(int(item.start * 1e9)),
+        'endTimeUnixNano': str(int((item.end or item.start) * 1e9)),
+        'attributes': [_otlp_attribute(k, v) for k, v in item.attributes.items() if v is not None],
+        # 1 = OK, 2 = ERROR
+        'status': {'code': 2, 'message': item.error} if item.error else {'code': 1},
+    }
+    if item.parent_id:
+        data['parentSpanId'] = item.parent_id
+    return data
+
+
+def build_exporter(config):
+    kind = config.get('TRACING_EXPORTER', 'jsonl')
+    if kind == 'otlp':
+        return OTLPExporter(config.get('TRACING_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces'))
+    if kind == 'jsonl':
+        return JSONLinesExporter(
+            config.get('TRACING_FILE', 'logs/traces.jsonl'),
+            max_bytes=config.get('TRACING_FILE_MAX_BYTES', 10 * 1024 * 1024),
+            backup_count=config.get('TRACING_FILE_BACKUPS', 5),
+        )
+    raise ValueError(f"TRACING_EXPORTER inválido: {kind} (use jsonl ou otlp)")
+
+
+# ==============================================================================
+# INTEGRAÇÃO COM FLASK, SQLALCHEMY E PROXMOXER
+# ==============================================================================
+
+class Tracer:
+    def __init__(self, exporter, sample_rate=0.1, max_spans=2000):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.max_spans = max_spans
+
+    def should_sample(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+
+def _parse_traceparent(value):
+    """'00-<trace 32 hex>-<span 16 hex>-<flags>' -> (trace_id, parent_id, sampled) ou None."""
+    parts = (value or '').split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def init_tracing(app):
+    """Registra os hooks de tracing. Chamado em app/__init__.py."""
+    if not app.config.get('TRACING_ENABLED'):
+        return None
+
+    tracer = Tracer(
+        build_exporter(app.config),
+        sample_rate=app.config.get('TRACING_SAMPLE_RATE', 0.1),
+        max_spans=app.config.get('TRACING_MAX_SPANS', 2000),
+    )
+    app.extensions['tracing'] = tracer
+    _instrument_sqlalchemy()
+    pve_instrumentation.subscribe(_trace_pve_call)
+
+    @app.before_request
+    def _start_trace():
+        incoming = _parse_traceparent(request.headers.get('traceparent'))
+        if incoming:
+            trace_id, parent_id, sampled = incoming
+            sampled = sampled or tracer.should_sample()
+        else:
+            trace_id, parent_id, sampled = new_id(16), None, tracer.should_sample()
+
+        trace = Trace(trace_id, sampled, tracer.max_spans)
+        _current_trace.set(trace)
+        root = Span(trace_id, f"{request.method} {request.path}", 'request', parent_id,
+                    {'http.method': request.method, 'http.path': request.path})
+        _current_span.set(root)
+        g.trace_root = root
+
+    @app.after_request
+    def _trace_headers(response):
+        trace = _current_trace.get()
+        root = g.get('trace_root')
+        if trace is not None and root is not None:
+            response.headers['X-Trace-Id'] = trace.trace_id
+            response.headers['traceparent'] = f"00-{trace.trace_id}-{root.span_id}-{'01' if trace.sampled else '00'}"
+            root.attributes['http.status_code'] = response.status_code
+            if request.url_rule is not None:
+                root.attributes['http.route'] = request.url_rule.rule
+        return response
+
+    @app.teardown_request
+    def _finish_trace(error=None):
+        trace = _current_trace.get()
+        root = g.pop('trace_root', None)
+        _current_trace.set(None)
+        _current_span.set(None)
+        if trace is None or root is None or not trace.sampled:
+            return
+        root.finish()
+        if error is not None:
+            root.error = f"{type(error).__name__}: {error}"
+        if trace.dropped:
+            root.attributes['spans.dropped'] = trace.dropped
+        try:
+            tracer.exporter.export([root] + trace.spans)
+        except Exception as e:
+            logger.warning(f"Falha ao exportar trace {trace.trace_id}: {e}")
+
+    return tracer
+
+
+_sqlalchemy_instrumented = False
+
+
+def _instrument_sqlalchemy():
+    """Um span por statement, em todas as engines (primário e réplicas)."""
+    global _sqlalchemy_instrumented
+    if _sqlalchemy_instrumented:
+        return
+    _sqlalchemy_instrumented = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is None:
+            return
+        verb = statement.split(None, 1)[0].upper() if statement.strip() else ''
+        context._trace_span = start_span(
+            f"sql {verb}".strip(), 'sql', **{'db.statement': statement[:500], 'db.system': conn.dialect.name}
+        )
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        end_span(getattr(context, '_trace_span', None))
+
+    @event.listens_for(Engine, 'handle_error')
+    def _error(exception_context):
+        context = exception_context.execution_context
+        end_span(getattr(context, '_trace_span', None), exception_context.original_exception)
+
+
+def _trace_pve_call(method, path):
+    """Um span por chamada HTTP do proxmoxer (inscrito em app.pve_instrumentation)."""
+    if _active_trace() is None:
+        return None
+    return span(f"PVE {method} {path}", 'pve', **{'http.method': method, 'pve.path': path})
@@ -0,0 +1,77 @@
+# benchmarks/ldap_failover.py
+"""
+Benchmark de login com uma réplica LDAP lenta (app/services/ldap_service.py, LDAPServerSet).
+
+Sobe dois LDAP stand-ins com os mesmos usuários: o primário responde devagar
+(--slow-latency por operação, acima do LDAP_RECEIVE_TIMEOUT) e a réplica é rápida.
+Compara:
+
+- único: só o primário, como era com LDAP_SERVER (cada login paga o timeout)
+- failover: LDAP_SERVERS=primário,réplica com seleção 'first' (o primeiro login
+  paga o timeout; os demais vão direto para a réplica)
+- failover+sonda: idem, mas a sonda em background já tirou o primário da seleção
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.ldap_failover
+    python -m benchmarks.ldap_failover --logins 500 --concurrency 30 --slow-latency 5 --receive-timeout 2
+"""
+import argparse
+
+from app.services.ldap_service import LDAPConnectionPool, LDAPServerSet
+from benchmarks.ldap_login import ATTRIBUTES, run
+from benchmarks.ldap_standin import LDAPStandIn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--slow-latency', type=float, default=2.0, help='Primário: atraso por operação (s)')
+    parser.add_argument('--op-latency', type=float, default=0.001, help='Réplica: atraso por operação (s)')
+    parser.add_argument('--receive-timeout', type=int, default=1, help='Segundos (inteiro, limitação do ldap3)')
+    args = parser.parse_args()
+
+    users = {f'aluno{i}': '123456' for i in range(args.concurrency)}
+    slow = LDAPStandIn(users, op_latency=args.slow_latency).start()
+    fast = LDAPStandIn(users, op_latency=args.op_latency).start()
+    credentials = [(fast.user_dn(f'aluno{i % args.concurrency}'), '123456') for i in range(args.logins)]
+
+    def pool(url):
+        return LDAPConnectionPool(url, size=args.concurrency, receive_timeout=args.receive_timeout)
+
+    def login(servers):
+        def one(dn, pw):
+            try:
+                servers.check_credentials(dn, pw, ATTRIBUTES)
+            except Exception:
+                pass  # No app o login cai para a autenticação local
+        return one
+
+    print(f"Primário {slow.url} (+{args.slow_latency}s/op), réplica {fast.url} | "
+          f"{args.logins} logins, {args.concurrency} simultâneos, receive timeout {args.receive_timeout}s")
+    print(f"{'cenário':<16}{'p50 ms':>10}{'p95 ms':>10}{'logins/s':>12}")
+
+    try:
+        # Só o primário: sem réplica para onde ir (o cooldown não ajuda, todos caem no fallback local)
+        single = LDAPServerSet([pool(slow.url)], cooldown=0)
+        run('único', login(single), credentials[:args.concurrency * 2], args.concurrency)
+        single.close()
+
+        failover = LDAPServerSet([pool(slow.url), pool(fast.url)])
+        run('failover', login(failover), credentials, args.concurrency)
+        failover.close()
+
+        probed = LDAPServerSet([pool(slow.url), pool(fast.url)])
+        probed.probe()
+        run('failover+sonda', login(probed), credentials, args.concurrency)
+        print("\nEstado após a sonda:")
+        for status in probed.status():
+            print(f"  {status['url']:<28} healthy={status['healthy']} sonda={status['latency_ms']}ms")
+        probed.close()
+    finally:
+        slow.stop()
+        fast.stop()
+
+
+if __name__ == '__main__':
+    main()
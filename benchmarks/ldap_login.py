@@ -0,0 +1,111 @@
+# benchmarks/ldap_login.py
+"""
+Benchmark de login LDAP em rajada (início de aula: a turma inteira loga junto).
+
+Compara o fluxo antigo do LDAPService (Server(get_info=ALL) + nova conexão TCP
+por login) com o pool de conexões do processo (rebind numa conexão já aberta,
+Root DSE/schema lidos uma única vez).
+
+Por padrão sobe o LDAP stand-in local (benchmarks/ldap_standin.py) com latências
+simuladas; com --server mede contra um diretório real (ex: o OpenLDAP do docker-compose).
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.ldap_login
+    python -m benchmarks.ldap_login --logins 500 --concurrency 30 --connect-latency 0.01
+    python -m benchmarks.ldap_login --server ldap://localhost:389 --user tiago --password 123456
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ldap3 import Server, Connection, ALL, BASE
+
+from app.services.ldap_service import LDAPConnectionPool
+from benchmarks.ldap_standin import LDAPStandIn
+
+ATTRIBUTES = ['mail', 'cn', 'uid']
+
+
+def legacy_login(url, user_dn, password):
+    """Reproduz o LDAPService original: tudo do zero a cada login."""
+    server = Server(url, get_info=ALL)
+    conn = Connection(server, user=user_dn, password=password, auto_bind=True)
+    conn.search(search_base=user_dn, search_filter='(objectClass=*)', search_scope=BASE, attributes=ATTRIBUTES)
+    conn.unbind()
+
+
+def run(label, login, credentials, concurrency):
+    latencies = []
+
+    def one(cred):
+        start = time.perf_counter()
+        login(*cred)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, credentials))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<10}{statistics.median(latencies):>10.2f}{p95:>10.2f}{len(latencies) / elapsed:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', help='URL de um LDAP real (sem isso, usa o stand-in local)')
+    parser.add_argument('--user-dn-template', default='cn={},ou=users,dc=nubemox,dc=local')
+    parser.add_argument('--user', default='tiago')
+    parser.add_argument('--password', default='123456')
+    parser.add_argument('--logins', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--pool-size', type=int, default=20)
+    parser.add_argument('--connect-latency', type=float, default=0.005, help='Stand-in: handshake TCP/TLS (s)')
+    parser.add_argument('--op-latency', type=float, default=0.001, help='Stand-in: por operação (s)')
+    parser.add_argument('--info-latency', type=float, default=0.02, help='Stand-in: leitura de DSE/schema (s)')
+    args = parser.parse_args()
+
+    standin = None
+    url = args.server
+    if not url:
+        users = {f'aluno{i}': '123456' for i in range(args.concurrency)}
+        standin = LDAPStandIn(users, args.connect_latency, args.op_latency, args.info_latency).start()
+        url = standin.url
+        credentials = [(standin.user_dn(f'aluno{i % args.concurrency}'), '123456') for i in range(args.logins)]
+    else:
+        credentials = [(args.user_dn_template.format(args.user), args.password)] * args.logins
+
+    print(f"LDAP: {url} | {args.logins} logins, {args.concurrency} simultâneos")
+    print(f"{'fluxo':<10}{'p50 ms':>10}{'p95 ms':>10}{'logins/s':>12}")
+
+    try:
+        before = dict(standin.stats) if standin else None
+        run('antigo', lambda dn, pw: legacy_login(url, dn, pw), credentials, args.concurrency)
+        legacy_stats = _delta(standin, before)
+
+        pool = LDAPConnectionPool(url, size=args.pool_size)
+        before = dict(standin.stats) if standin else None
+        run('pool', lambda dn, pw: pool.check_credentials(dn, pw, ATTRIBUTES), credentials, args.concurrency)
+        pool_stats = _delta(standin, before)
+        pool.close()
+
+        if standin:
+            print("\nOperações no servidor por login:")
+            for label, stats in (('antigo', legacy_stats), ('pool', pool_stats)):
+                per_login = ', '.join(f"{k}={v / args.logins:.2f}" for k, v in stats.items())
+                print(f"  {label:<8}{per_login}")
+    finally:
+        if standin:
+            standin.stop()
+
+
+def _delta(standin, before):
+    if not standin:
+        return None
+    return {k: standin.stats[k] - before[k] for k in before}
+
+
+if __name__ == '__main__':
+    main()
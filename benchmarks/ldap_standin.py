@@ -0,0 +1,283 @@
+# benchmarks/ldap_standin.py
+"""
+Servidor LDAP local (stand-in) para benchmarks, sem depender do OpenLDAP do docker-compose.
+
+Fala LDAPv3 de verdade sobre TCP (o cliente é o ldap3 sem nenhum mock), mas o
+diretório fica em memória: os requests são decodificados com as estruturas
+ASN.1 do próprio ldap3 e atendidos pela estratégia MOCK_SYNC dele (bind com
+userPassword, busca com filtros). Latências configuráveis simulam o custo
+de rede/TLS de um diretório real:
+
+- connect_latency: atraso ao aceitar uma conexão (handshake TCP/TLS)
+- op_latency: atraso em cada operação (bind, search)
+- info_latency: atraso extra ao ler o Root DSE / schema (get_info=ALL)
+
+Suporta busca paginada (Simple Paged Results, RFC 2696), usada pelo sync de grupos.
+
+Uso:
+    with LDAPStandIn(users={'tiago': '123456'}) as ldap_server:
+        print(ldap_server.url)   # ldap://127.0.0.1:<porta>
+"""
+import socketserver
+import threading
+import time
+
+from ldap3 import Server, Connection, MOCK_SYNC
+from ldap3.operation.search import search_request_to_dict
+from ldap3.protocol.rfc2696 import paged_search_control
+from ldap3.protocol.rfc4511 import (
+    LDAPMessage, MessageID, ProtocolOp, BindResponse, SearchResultEntry, SearchResultDone,
+    ResultCode, LDAPDN, LDAPString, PartialAttributeList, PartialAttribute, Vals,
+    AttributeDescription, AttributeValue
+)
+from ldap3.protocol.convert import build_controls_list
+from ldap3.strategy.base import BaseStrategy
+from ldap3.utils.asn1 import encode, decoder
+
+BASE_DN = 'dc=nubemox,dc=local'
+USERS_OU = f'ou=users,{BASE_DN}'
+SCHEMA_DN = 'cn=Subschema'
+PAGED_RESULTS_OID = '1.2.840.113556.1.4.319'
+
+
+class LDAPStandIn:
+    def __init__(self, users=None, connect_latency=0.0, op_latency=0.0, info_latency=0.0):
+        self.connect_latency = connect_latency
+        self.op_latency = op_latency
+        self.info_latency = info_latency
+        self.stats = {'connections': 0, 'binds': 0, 'searches': 0, 'info_reads': 0}
+        self._stats_lock = threading.Lock()
+
+        # Diretório em memória, compartilhado por todas as conexões
+        self.directory = Server('standin')
+        admin = Connection(self.directory, client_strategy=MOCK_SYNC)
+        admin.strategy.add_entry(BASE_DN, {'objectClass': ['top', 'domain'], 'dc': 'nubemox'})
+        admin.strategy.add_entry(USERS_OU, {'objectClass': 'organizationalUnit', 'ou': 'users'})
+        for username, password in (users or {}).items():
+            self.add_user(username, password)
+
+        self._server = None
+        self._thread = None
+
+    @staticmethod
+    def user_dn(username):
+        return f'cn={username},{USERS_OU}'
+
+    def add_user(self, username, password, **attributes):
+        self.add_users([(username, password, attributes)])
+
+    def add_users(self, users):
+        """Carga em massa: [(username, password, {atributos extras}), ...]."""
+        loader = self._loader()
+        for username, password, attributes in users:
+            entry = {
+                'objectClass': ['inetOrgPerson'],
+                'cn': username,
+                'uid': username,
+                'sn': username,
+                'mail': f'{username}@nubemox.local',
+                'userPassword': password,
+            }
+            entry.update(attributes)
+            loader.strategy.add_entry(self.user_dn(username), entry, validate=False)
+
+    def _loader(self):
+        return Connection(self.directory, client_strategy=MOCK_SYNC)
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    # ------------------------------------------------------------------
+    # CICLO DE VIDA
+    # ------------------------------------------------------------------
+    def start(self):
+        standin = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                standin._serve_connection(self.request)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'ldap://{host}:{port}'
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # PROTOCOLO
+    # ------------------------------------------------------------------
+    def _serve_connection(self, sock):
+        self._count('connections')
+        if self.connect_latency:
+            time.sleep(self.connect_latency)
+
+        # Cada conexão TCP tem sua própria "sessão" (estado de bind) sobre o diretório comum
+        session = Connection(self.directory, client_strategy=MOCK_SYNC)
+        session.open()
+        session.paged_results = []
+        buffer = b''
+        while True:
+            try:
+                chunk = sock.recv(65536)
+            except OSError:
+                return
+            if not chunk:
+                return
+            buffer += chunk
+            while True:
+                size = BaseStrategy.compute_ldap_message_size(buffer)
+                if size == -1 or len(buffer) < size:
+                    break
+                message, buffer = buffer[:size], buffer[size:]
+                if not self._dispatch(sock, session, message):
+                    return
+
+    def _dispatch(self, sock, session, raw):
+        message, _ = decoder.decode(raw, asn1Spec=LDAPMessage())
+        message_id = int(message['messageID'])
+        operation = message['protocolOp'].getName()
+        request = message['protocolOp'].getComponent()
+        controls = list(message['controls']) if message['controls'].hasValue() else None
+
+        if operation == 'unbindRequest':
+            return False
+
+        if self.op_latency:
+            time.sleep(self.op_latency)
+
+        if operation == 'bindRequest':
+            self._count('binds')
+            result = session.strategy.mock_bind(request, controls)
+            self._send(sock, message_id, 'bindResponse', self._result(BindResponse(), result))
+        elif operation == 'searchRequest':
+            self._count('searches')
+            entries, result, response_controls = self._search(session, request, controls)
+            for entry in entries:
+                self._send(sock, message_id, 'searchResEntry', self._entry(entry))
+            self._send(sock, message_id, 'searchResDone', self._result(SearchResultDone(), result), response_controls)
+        else:
+            # Operações de escrita não fazem parte do stand-in
+            self._send(sock, message_id, 'searchResDone',
+                       self._result(SearchResultDone(), {'resultCode': 53, 'diagnosticMessage': 'unwilling to perform'}))
+        return True
+
+    def _search(self, session, request, controls):
+        """Retorna (entradas, resultado, controls da resposta)."""
+        paged = [c for c in controls or [] if str(c['controlType']) == PAGED_RESULTS_OID]
+        if paged:
+            return self._paged_search(session, request, paged[0])
+        entries, result = self._plain_search(session, request, controls)
+        return entries, result, None
+
+    def _paged_search(self, session, request, control):
+        value = BaseStrategy.decode_control(control)[1]['value']
+        size, cookie = value['size'], value['cookie']
+        if not cookie:
+            # Primeira página: resolve a busca inteira e guarda na sessão
+            session.paged_results, result = session.strategy._execute_search(search_request_to_dict(request))
+            if result['resultCode'] != 0:
+                return [], result, None
+            offset = 0
+        else:
+            offset = int(cookie)
+
+        page = session.paged_results[offset:offset + size]
+        next_offset = offset + size
+        next_cookie = str(next_offset).encode() if next_offset < len(session.paged_results) else b''
+        response_control = paged_search_control(False, len(session.paged_results), next_cookie)
+        return page, {'resultCode': 0}, [response_control]
+
+    def _plain_search(self, session, request, controls):
+        base = str(request['baseObject'])
+        if base == '' or base.lower() == SCHEMA_DN.lower():
+            # get_info=ALL: Root DSE + schema. O custo é o que o pool evita repetir.
+            self._count('info_reads')
+            if self.info_latency:
+                time.sleep(self.info_latency)
+            if base == '':
+                return [{'object': '', 'attributes': [
+                    {'type': 'namingContexts', 'vals': [BASE_DN]},
+                    {'type': 'supportedLDAPVersion', 'vals': ['3']},
+                    {'type': 'subschemaSubentry', 'vals': [SCHEMA_DN]},
+                    {'type': 'vendorName', 'vals': ['Nubemox LDAP stand-in']},
+                ]}], {'resultCode': 0}
+            return [], {'resultCode': 0}
+        return session.strategy.mock_search(request, controls)
+
+    @staticmethod
+    def _result(component, result):
+        component['resultCode'] = ResultCode(result.get('resultCode', 0))
+        component['matchedDN'] = LDAPDN(result.get('matchedDN') or '')
+        component['diagnosticMessage'] = LDAPString(result.get('diagnosticMessage') or '')
+        return component
+
+    @staticmethod
+    def _entry(entry):
+        component = SearchResultEntry()
+        component['object'] = LDAPDN(entry['object'])
+        attributes = PartialAttributeList()
+        for position, attribute in enumerate(entry['attributes']):
+            partial = PartialAttribute()
+            partial['type'] = AttributeDescription(attribute['type'])
+            vals = Vals()
+            values = attribute['vals'] if isinstance(attribute['vals'], (list, tuple)) else [attribute['vals']]
+            for index, value in enumerate(values):
+                vals[index] = AttributeValue(value if isinstance(value, bytes) else str(value).encode('utf-8'))
+            partial['vals'] = vals
+            attributes[position] = partial
+        component['attributes'] = attributes
+        return component
+
+    @staticmethod
+    def _send(sock, message_id, operation, component, controls=None):
+        message = LDAPMessage()
+        message['messageID'] = MessageID(message_id)
+        message['protocolOp'] = ProtocolOp().setComponentByName(operation, component)
+        if controls:
+            message['controls'] = build_controls_list(controls)
+        try:
+            sock.sendall(encode(message))
+        except OSError:
+            pass
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Sobe o LDAP stand-in e fica escutando.')
+    parser.add_argument('--users', type=int, default=100, help='Usuários aluno0..alunoN-1 (senha = 123456)')
+    parser.add_argument('--connect-latency', type=float, default=0.0)
+    parser.add_argument('--op-latency', type=float, default=0.0)
+    parser.add_argument('--info-latency', type=float, default=0.0)
+    args = parser.parse_args()
+
+    users = {f'aluno{i}': '123456' for i in range(args.users)}
+    with LDAPStandIn(users, args.connect_latency, args.op_latency, args.info_latency) as ldap_server:
+        print(f"LDAP stand-in em {ldap_server.url} (base {BASE_DN}). Ctrl+C para sair.")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
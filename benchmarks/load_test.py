@@ -0,0 +1,358 @@
+# benchmarks/load_test.py
+"""
+Teste de carga dos caminhos quentes da API, com número de antes/depois.
+
+Sobe tudo local: a API (servidor WSGI com threads), o PVE stand-in
+(benchmarks/pve_standin.py), o LDAP stand-in e um banco populado (SQLite
+temporário ou --database-url). Cada passo de um cenário bate numa rota só,
+com N clientes simultâneos (requests + keep-alive), e mede:
+
+- p50 / p95 / p99 (ms), vazão (req/s) e erros
+- chamadas ao PVE por requisição (contadas no stand-in)
+
+Cenários:
+- login_storm:    início de aula, a turma toda faz POST /auth/login junto
+- dashboard:      polling de GET /provisioning/resources (alunos) e GET /admin/users (admin)
+- bulk_deploy:    cada aluno faz POST /provisioning/deploy (clone e arquivo),
+                  depois stop / start / reboot em todos os recursos criados.
+                  O deploy pega o VMID em /cluster/nextid sem reserva: com
+                  --deploy-concurrency > 1, deploys simultâneos disputam o mesmo
+                  VMID (como no PVE real) e isso aparece na coluna de erros.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --scenario dashboard --users 200 --resources-per-user 5 --concurrency 32
+    python -m benchmarks.load_test --pve-latency 0.01 --output antes.json
+    python -m benchmarks.load_test --pve-latency 0.01 --compare antes.json
+
+Servidor e clientes dividem o mesmo processo (e o GIL): os números servem para
+comparar duas versões na mesma máquina, não como capacidade de produção.
+ATENÇÃO: com --database-url o banco informado é APAGADO e recriado.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+import requests
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import ServiceTemplate, User, UserGroup, VirtualResource
+from app.services.health.base import latency_summary
+from app.services.identity import identity_claims
+from benchmarks.ldap_standin import LDAPStandIn
+from benchmarks.pve_standin import PVEStandIn
+
+PASSWORD = '123456'
+ADMIN_PASSWORD = 'admin-bench'
+SCENARIOS = ('login_storm', 'dashboard', 'bulk_deploy')
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args):
+        pass
+
+
+class LoadEnvironment:
+    """API + stand-ins + banco populado, no ar até stop()."""
+
+    def __init__(self, args):
+        self.args = args
+        self._tmpdir = None
+        self.pve = PVEStandIn(latency=args.pve_latency, task_duration=args.task_duration)
+        self.ldap = LDAPStandIn({self.username(i): PASSWORD for i in range(args.users)},
+                                op_latency=args.ldap_latency)
+        self.app = None
+        self.server = None
+        self.base_url = None
+        self.user_ids = {}
+
+    @staticmethod
+    def username(i):
+        return f'aluno{i}'
+
+    def start(self):
+        self.pve.start()
+        self.ldap.start()
+
+        database_url = self.args.database_url
+        if not database_url:
+            self._tmpdir = tempfile.TemporaryDirectory(prefix='nubemox-load-')
+            database_url = f"sqlite:///{os.path.join(self._tmpdir.name, 'load.db')}"
+
+        overrides = dict(
+            self.pve.app_config(),
+            SQLALCHEMY_DATABASE_URI=database_url,
+            JWT_SECRET_KEY='nubemox-load-test-jwt-secret-key-0123',
+            LDAP_SERVER=self.ldap.url,
+            LDAP_PROBE_INTERVAL=0,
+            HEALTH_CACHE_INTERVAL=0,
+            LOG_LEVEL=self.args.log_level,
+            LOG_LEVELS='',
+            PROXMOX_TASK_TIMEOUT=60,
+        )
+        self.app = create_app(type('LoadTestConfig', (Config,), overrides))
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            self.seed()
+
+        self.server = make_server('127.0.0.1', 0, self.app, threaded=True, request_handler=_QuietHandler)
+        threading.Thread(target=self.server.serve_forever, name='load-api', daemon=True).start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+        self.pve.stop()
+        self.ldap.stop()
+        if self._tmpdir:
+            self._tmpdir.cleanup()
+
+    # ------------------------------------------------------------------
+    # SEED (banco e PVE coerentes entre si)
+    # ------------------------------------------------------------------
+    def seed(self):
+        args = self.args
+        group = UserGroup(name='Alunos', max_vms=1000, max_cpu=4000, max_memory=4_000_000, max_storage=100_000)
+        db.session.add(group)
+        admin = User(username='admin', email='admin@bench.local', is_admin=True)
+        admin.set_password(ADMIN_PASSWORD)
+        db.session.add(admin)
+        db.session.flush()
+
+        db.session.execute(insert(User), [
+            {'username': self.username(i), 'email': f'{self.username(i)}@nubemox.local',
+             'password_hash': '!', 'is_admin': False, 'group_id': group.id}
+            for i in range(args.users)
+        ])
+        db.session.execute(insert(ServiceTemplate), [
+            {'name': 'Debian (clone)', 'type': 'lxc', 'proxmox_template_volid': '9000', 'deploy_mode': 'clone'},
+            {'name': 'Debian (arquivo)', 'type': 'lxc', 'deploy_mode': 'file',
+             'proxmox_template_volid': 'local:vztmpl/debian-12-standard_12.2-1_amd64.tar.zst'},
+            {'name': 'Ubuntu VM', 'type': 'qemu', 'proxmox_template_volid': '9001', 'deploy_mode': 'clone'},
+        ])
+        self.user_ids = dict(db.session.query(User.username, User.id))
+
+        rows = []
+        vmid = 1000
+        for i in range(args.users):
+            username = self.username(i)
+            for j in range(args.resources_per_user):
+                guest_type = 'lxc' if j % 4 else 'qemu'
+                status = 'running' if j % 3 else 'stopped'
+                self.pve.add_guest(vmid, guest_type, name=f'{username}-{j}', status=status, pool=f'vps-{username}')
+                rows.append({'proxmox_vmid': vmid, 'name': f'{username}-{j}', 'type': guest_type,
+                             'owner_id': self.user_ids[username], 'cpu_cores': 1, 'memory_mb': 512,
+                             'storage_gb': 8, 'status': status})
+                vmid += 1
+        if rows:
+            db.session.execute(insert(VirtualResource), rows)
+        db.session.commit()
+
+    def tokens(self):
+        """JWT de cada aluno sem passar pelo login (cenários que não medem o login)."""
+        with self.app.app_context():
+            users = User.query.filter(User.username.in_(list(self.user_ids))).all()
+            return {u.username: create_access_token(identity=str(u.id), additional_claims=identity_claims(u))
+                    for u in users}
+
+
+# ----------------------------------------------------------------------
+# EXECUÇÃO
+# ----------------------------------------------------------------------
+class Runner:
+    def __init__(self, env, concurrency):
+        self.env = env
+        self.concurrency = concurrency
+        self.results = []
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def step(self, scenario, name, calls, expect=(200,), concurrency=None):
+        """
+        Executa `calls` ([(método, path, token, json)]) com `concurrency` clientes.
+        Devolve as respostas (JSON) na ordem das chamadas.
+        """
+        latencies = []
+        errors = []
+        base_url = self.env.base_url
+        calls_before = self.env.pve.total_calls
+
+        def one(call):
+            method, path, token, body = call
+            headers = {'Authorization': f'Bearer {token}'} if token else {}
+            start = time.perf_counter()
+            try:
+                response = self._session().request(method, base_url + path, json=body, headers=headers, timeout=120)
+                status = response.status_code
+                payload = response.json() if response.content else None
+            except Exception as e:
+                status, payload = None, {'error': str(e)}
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status not in expect:
+                errors.append(f"{status}: {str(payload)[:120]}")
+            return payload
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency or self.concurrency) as pool:
+            payloads = list(pool.map(one, calls))
+        elapsed = time.perf_counter() - start
+
+        pve_calls = self.env.pve.total_calls - calls_before
+        result = dict(
+            latency_summary(latencies),
+            scenario=scenario, step=name, requests=len(calls), errors=len(errors),
+            throughput=round(len(calls) / elapsed, 1) if elapsed else None,
+            pve_calls_per_request=round(pve_calls / len(calls), 2) if calls else 0,
+        )
+        self.results.append(result)
+        _print_row(result)
+        for error in sorted(set(errors))[:3]:
+            print(f"    erro: {error}")
+        return payloads
+
+
+def login_storm(env, runner, args):
+    calls = [('POST', '/api/auth/login', None, {'username': env.username(i % args.users), 'password': PASSWORD})
+             for i in range(args.users * args.repeat)]
+    payloads = runner.step('login_storm', 'POST /auth/login', calls)
+    return {p['user']['username']: p['access_token'] for p in payloads if p and 'access_token' in p}
+
+
+def dashboard(env, runner, args, tokens):
+    calls = [('GET', '/api/provisioning/resources', tokens[env.username(i % args.users)], None)
+             for i in range(args.users * args.repeat)]
+    runner.step('dashboard', 'GET /provisioning/resources', calls)
+
+    admin_token = _admin_token(env)
+    calls = [('GET', f'/api/admin/users?limit={args.page_size}', admin_token, None)] * (args.repeat * 10)
+    runner.step('dashboard', 'GET /admin/users', calls)
+
+
+def bulk_deploy(env, runner, args, tokens):
+    with env.app.app_context():
+        templates = [t.id for t in ServiceTemplate.query.filter_by(type='lxc').order_by(ServiceTemplate.id)]
+    calls = [('POST', '/api/provisioning/deploy', tokens[env.username(i)],
+              {'template_id': templates[i % len(templates)], 'name': f'lt-{env.username(i)}'})
+             for i in range(args.users)]
+    payloads = runner.step('bulk_deploy', 'POST /provisioning/deploy', calls, expect=(201,),
+                           concurrency=args.deploy_concurrency)
+    deployed = [(env.username(i), p['vmid']) for i, p in enumerate(payloads) if p and 'vmid' in p]
+
+    for action in ('stop', 'start', 'reboot'):
+        calls = [('POST', f'/api/provisioning/resources/{vmid}/{action}', tokens[username], None)
+                 for username, vmid in deployed]
+        runner.step('bulk_deploy', f'POST /provisioning/resources/<vmid>/{action}', calls)
+
+
+def _admin_token(env):
+    response = requests.post(f'{env.base_url}/api/auth/login',
+                             json={'username': 'admin', 'password': ADMIN_PASSWORD}, timeout=30)
+    return response.json()['access_token']
+
+
+# ----------------------------------------------------------------------
+# RELATÓRIO
+# ----------------------------------------------------------------------
+HEADER = f"{'passo':<46}{'reqs':>6}{'erros':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'PVE/req':>9}"
+
+
+def _print_row(r):
+    print(f"{r['step']:<46}{r['requests']:>6}{r['errors']:>7}{r['p50']:>9.1f}{r['p95']:>9.1f}"
+          f"{r['p99']:>9.1f}{r['throughput']:>9.1f}{r['pve_calls_per_request']:>9.2f}")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['scenario'], r['step']): r for r in json.load(f)['results']}
+    print(f"\nComparação com {baseline_path} (negativo = melhor em latência / chamadas ao PVE)")
+    print(f"{'passo':<46}{'Δ p50':>9}{'Δ p95':>9}{'Δ p99':>9}{'Δ req/s':>10}{'Δ PVE/req':>11}")
+    for r in results:
+        before = baseline.get((r['scenario'], r['step']))
+        if before is None:
+            continue
+        print(f"{r['step']:<46}"
+              + ''.join(f"{_pct(before[k], r[k]):>9}" for k in ('p50', 'p95', 'p99'))
+              + f"{_pct(before['throughput'], r['throughput']):>10}"
+              + f"{r['pve_calls_per_request'] - before['pve_calls_per_request']:>+11.2f}")
+
+
+def _pct(before, after):
+    if not before or after is None:
+        return '-'
+    return f"{(after - before) / before * 100:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append',
+                        help='Cenário a rodar (repetível; padrão: todos)')
+    parser.add_argument('--users', type=int, default=60, help='Alunos (LDAP + banco)')
+    parser.add_argument('--resources-per-user', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--deploy-concurrency', type=int, default=1,
+                        help='Deploys simultâneos (acima de 1 aparece a corrida do /cluster/nextid)')
+    parser.add_argument('--repeat', type=int, default=2, help='Requisições por aluno em cada passo de leitura')
+    parser.add_argument('--page-size', type=int, default=100, help='limit do GET /admin/users')
+    parser.add_argument('--pve-latency', type=float, default=0.005, help='Stand-in: atraso por chamada ao PVE (s)')
+    parser.add_argument('--task-duration', type=float, default=0.0, help='Stand-in: duração das tarefas do PVE (s)')
+    parser.add_argument('--ldap-latency', type=float, default=0.002, help='Stand-in: atraso por operação LDAP (s)')
+    parser.add_argument('--database-url', help='Banco a usar (APAGADO); padrão: SQLite temporário')
+    parser.add_argument('--log-level', default='CRITICAL', help='LOG_LEVEL da API durante o teste')
+    parser.add_argument('--output', help='Grava os resultados em JSON (para --compare depois)')
+    parser.add_argument('--compare', help='JSON de uma rodada anterior para comparar')
+    args = parser.parse_args()
+    scenarios = args.scenario or list(SCENARIOS)
+
+    env = LoadEnvironment(args).start()
+    runner = Runner(env, args.concurrency)
+    print(f"API {env.base_url} | PVE {env.pve.url} | {args.users} alunos, "
+          f"{args.users * args.resources_per_user} recursos, {args.concurrency} clientes\n")
+    print(HEADER)
+    try:
+        tokens = login_storm(env, runner, args) if 'login_storm' in scenarios else {}
+        if len(tokens) < args.users:
+            tokens = env.tokens()
+        if 'dashboard' in scenarios:
+            dashboard(env, runner, args, tokens)
+        if 'bulk_deploy' in scenarios:
+            bulk_deploy(env, runner, args, tokens)
+    finally:
+        env.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'commit': _git_commit(), 'timestamp': datetime.utcnow().isoformat(),
+                       'args': vars(args), 'results': runner.results}, f, indent=2)
+        print(f"\nResultados em {args.output}")
+    if args.compare:
+        compare(runner.results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+# benchmarks/microbench.py
+"""
+Microbenchmarks do código que cresce com o número de linhas: cota, listagens
+e serialização.
+
+Para cada tamanho (padrão 10, 1k e 100k) popula um SQLite temporário com N
+usuários, N recursos e N templates. 10% dos recursos ficam com um único
+aluno ("pesado"), o pior caso das rotinas de cota. Mede:
+
+- quota.*:     User.quota, check_user_quota e get_current_usage do aluno pesado,
+               get_usage_for_users de uma página de 100 usuários
+- listing.*:   GET /api/admin/users, /api/admin/templates e /api/catalog/templates
+               (página de 100, pelo test client, com a query e a projeção)
+- serialize.*: ServiceTemplate.to_dict e o dicionário da listagem de recursos, em todas as linhas
+- json.*:      codificação JSON (app.json) das listas serializadas
+
+Cada rodada é anexada ao histórico (JSON Lines, um registro por rodada, com o
+commit) e comparada com a última rodada de outro commit: variações acima de
+--threshold aparecem como REGRESSÃO (com --fail-on-regression, sai com código 1).
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.microbench
+    python -m benchmarks.microbench --sizes 10,1000 --filter quota
+    python -m benchmarks.microbench --baseline a1b2c3d --fail-on-regression
+"""
+import argparse
+from datetime import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+
+from app import create_app
+from app.api.admin.routes import get_current_usage, get_usage_for_users
+from app.config import Config
+from app.extensions import db
+from app.models import ServiceTemplate, User, UserGroup, VirtualResource
+from app.services.identity import identity_claims
+from utils.utils import check_user_quota
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(__file__), 'results', 'microbench.jsonl')
+TYPES = ['lxc', 'qemu']
+STATUSES = ['running', 'stopped', 'provisioning']
+CATEGORIES = ['os', 'database', 'web', 'devtools']
+
+
+def make_app(database_url):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        JWT_SECRET_KEY = 'nubemox-microbench-jwt-secret-key-0123'
+        LOG_LEVEL = 'WARNING'
+        LDAP_PROBE_INTERVAL = 0
+        HEALTH_CACHE_INTERVAL = 0
+    return create_app(BenchmarkConfig)
+
+
+def seed(size, seed_value=42):
+    """N usuários (o 1 é admin, o 2 é o aluno pesado), N recursos e N templates."""
+    rnd = random.Random(seed_value)
+    group = UserGroup(name='Alunos', max_vms=10 ** 6, max_cpu=10 ** 7, max_memory=10 ** 9, max_storage=10 ** 8)
+    db.session.add(group)
+    db.session.flush()
+
+    db.session.execute(insert(User), [
+        {'username': f'user{i}', 'email': f'user{i}@bench.local', 'password_hash': '!',
+         'is_admin': i == 1, 'group_id': group.id if i % 5 else None}
+        for i in range(1, size + 1)
+    ])
+    heavy_id = 2 if size > 1 else 1
+    db.session.execute(insert(VirtualResource), [
+        {
+            'proxmox_vmid': 100 + i,
+            'name': f'res-{i}',
+            'type': rnd.choice(TYPES),
+            'owner_id': heavy_id if i % 10 == 0 else rnd.randint(1, size),
+            'cpu_cores': rnd.choice([1, 2, 4]),
+            'memory_mb': rnd.choice([512, 1024, 2048]),
+            'storage_gb': rnd.choice([8, 16, 32]),
+            'status': rnd.choice(STATUSES),
+        }
+        for i in range(size)
+    ])
+    db.session.execute(insert(ServiceTemplate), [
+        {
+            'name': f'Template {i}',
+            'type': rnd.choice(TYPES),
+            'proxmox_template_volid': f'local:vztmpl/tmpl-{i}.tar.zst' if i % 2 else str(9000 + i),
+            'deploy_mode': 'file' if i % 2 else 'clone',
+            'category': rnd.choice(CATEGORIES),
+            'description': f'Template sintético {i}',
+            'is_active': rnd.random() < 0.8,
+        }
+        for i in range(size)
+    ])
+    db.session.commit()
+    return db.session.get(User, heavy_id)
+
+
+def resource_item(r):
+    """Mesmo dicionário da listagem GET /api/provisioning/resources (sem o status do PVE)."""
+    return {
+        'id': r.id,
+        'vmid': r.proxmox_vmid,
+        'name': r.name,
+        'type': r.type,
+        'status': r.status,
+        'cpu': r.cpu_cores,
+        'ram': r.memory_mb,
+        'storage': r.storage_gb,
+        'owner_id': r.owner_id,
+        'created_at': r.created_at.isoformat() if r.created_at else None
+    }
+
+
+def build_benchmarks(app, heavy):
+    """{nome: função sem argumentos}; roda dentro do app context."""
+    client = app.test_client()
+    admin = db.session.get(User, 1)
+    headers = {'Authorization': f"Bearer {create_access_token(identity=str(admin.id), additional_claims=identity_claims(admin))}"}
+    page_ids = [uid for (uid,) in db.session.query(User.id).order_by(User.id).limit(100)]
+    templates = ServiceTemplate.query.all()
+    resources = VirtualResource.query.all()
+    template_dicts = [t.to_dict() for t in templates]
+    resource_dicts = [resource_item(r) for r in resources]
+
+    def get(path):
+        def run():
+            response = client.get(path, headers=headers)
+            assert response.status_code == 200, response.status_code
+        return run
+
+    return {
+        'quota.user_quota': lambda: heavy.quota,
+        'quota.check_user_quota': lambda: check_user_quota(heavy, 1, 512, 8),
+        'quota.get_current_usage': lambda: get_current_usage(heavy.id),
+        'quota.get_usage_for_users': lambda: get_usage_for_users(page_ids),
+        'listing.admin_users': get('/api/admin/users?limit=100'),
+        'listing.admin_templates': get('/api/admin/templates?limit=100'),
+        'listing.catalog_templates': get('/api/catalog/templates?limit=100'),
+        'serialize.template_to_dict': lambda: [t.to_dict() for t in templates],
+        'serialize.resource_list': lambda: [resource_item(r) for r in resources],
+        'json.templates': lambda: app.json.dumps(template_dicts),
+        'json.resources': lambda: app.json.dumps(resource_dicts),
+    }
+
+
+def measure(fn, min_time, max_repeats):
+    """Mediana e mínimo (ms): pelo menos 3 repetições, até `min_time` s ou `max_repeats`."""
+    fn()  # Aquecimento (caches, compilação de queries)
+    times = []
+    start = time.perf_counter()
+    while len(times) < 3 or (time.perf_counter() - start < min_time and len(times) < max_repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {'median_ms': round(statistics.median(times), 4), 'min_ms': round(min(times), 4), 'repeats': len(times)}
+
+
+def run_size(size, args):
+    with tempfile.TemporaryDirectory(prefix='nubemox-micro-') as tmpdir:
+        app = make_app(f"sqlite:///{os.path.join(tmpdir, 'bench.db')}")
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            heavy = seed(size)
+            print(f"\nN={size:,}: banco populado em {time.perf_counter() - start:.1f}s "
+                  f"(aluno pesado com {heavy.resources.count():,} recursos)")
+            results = []
+            for name, fn in build_benchmarks(app, heavy).items():
+                if args.filter and args.filter not in name:
+                    continue
+                result = dict(name=name, size=size, **measure(fn, args.min_time, args.max_repeats))
+                results.append(result)
+                print(f"  {name:<30}{result['median_ms']:>12.3f} ms{result['min_ms']:>12.3f} ms{result['repeats']:>8}")
+            db.session.remove()
+            db.engine.dispose()
+        return results
+
+
+# ----------------------------------------------------------------------
+# HISTÓRICO E COMPARAÇÃO
+# ----------------------------------------------------------------------
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path, record):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def pick_baseline(history, results, commit, baseline=None):
+    """
+    Rodada de referência entre as que mediram algum dos mesmos (benchmark, N):
+    a última do commit pedido (--baseline) ou, sem ele, a última de outro
+    commit; se só houver rodadas deste commit, a última delas.
+    """
+    keys = {(r['name'], r['size']) for r in results}
+    history = [h for h in history if keys & {(r['name'], r['size']) for r in h['results']}]
+    if baseline:
+        return next((h for h in reversed(history) if (h.get('commit') or '').startswith(baseline)), None)
+    other = next((h for h in reversed(history) if h.get('commit') != commit), None)
+    return other or (history[-1] if history else None)
+
+
+def compare(results, baseline, threshold):
+    """Imprime a comparação e devolve as regressões [(nome, tamanho, variação)]."""
+    # O mínimo é o mais estável entre rodadas (ruído só soma tempo), como no timeit
+    before = {(r['name'], r['size']): r['min_ms'] for r in baseline['results']}
+    print(f"\nComparação com {baseline.get('commit') or '?'} ({baseline['timestamp'][:19]}), mínimo em ms")
+    print(f"{'benchmark':<30}{'N':>9}{'antes':>12}{'agora':>12}{'Δ':>9}")
+    regressions = []
+    for r in results:
+        old = before.get((r['name'], r['size']))
+        if not old:
+            continue
+        delta = (r['min_ms'] - old) / old * 100
+        flag = ''
+        if delta > threshold:
+            flag = '  REGRESSÃO'
+            regressions.append((r['name'], r['size'], delta))
+        elif delta < -threshold:
+            flag = '  melhora'
+        print(f"{r['name']:<30}{r['size']:>9,}{old:>12.3f}{r['min_ms']:>12.3f}{delta:>+8.0f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,1000,100000', help='Tamanhos dos datasets (vírgula)')
+    parser.add_argument('--filter', help='Só benchmarks cujo nome contém o texto (ex: quota)')
+    parser.add_argument('--min-time', type=float, default=0.5, help='Tempo mínimo por benchmark (s)')
+    parser.add_argument('--max-repeats', type=int, default=200)
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='Arquivo de histórico (JSON Lines)')
+    parser.add_argument('--no-save', action='store_true', help='Não grava esta rodada no histórico')
+    parser.add_argument('--baseline', help='Commit (prefixo) para comparar; padrão: última rodada de outro commit')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Variação (%%) considerada regressão')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    commit = _git('rev-parse', '--short', 'HEAD')
+    dirty = bool(_git('status', '--porcelain', '--untracked-files=no'))
+    print(f"commit {commit or '?'}{' (com alterações locais)' if dirty else ''} | Python {platform.python_version()}")
+    print(f"{'benchmark':<32}{'mediana':>12}{'mínimo':>15}{'reps':>8}")
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(',')):
+        results.extend(run_size(size, args))
+
+    history = load_history(args.history)
+    record = {
+        'commit': commit, 'dirty': dirty, 'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(), 'machine': platform.machine(), 'results': results,
+    }
+    baseline = pick_baseline(history, results, commit, args.baseline)
+    if not args.no_save:
+        append_history(args.history, record)
+        print(f"\nRodada gravada em {args.history}")
+
+    if baseline is None:
+        print("Sem rodada anterior para comparar.")
+        return
+    regressions = compare(results, baseline, args.threshold)
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
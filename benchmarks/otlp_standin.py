@@ -0,0 +1,148 @@
+# benchmarks/otlp_standin.py
+"""
+Coletor OTLP/HTTP local (stand-in) para ver os traces do Nubemox sem subir um
+OpenTelemetry Collector / Jaeger.
+
+Aceita POST /v1/traces com corpo JSON (o formato do OTLPExporter em
+app/tracing.py), guarda os spans em memória e, rodando como script, imprime
+cada trace como árvore com as durações.
+
+Uso:
+    python -m benchmarks.otlp_standin --port 4318
+    # e no .env: TRACING_ENABLED=true, TRACING_EXPORTER=otlp,
+    #            TRACING_OTLP_ENDPOINT=http://127.0.0.1:4318/v1/traces
+
+Em testes:
+    with OTLPStandIn() as collector:
+        ... collector.endpoint, collector.spans
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+
+
+class OTLPStandIn:
+    def __init__(self, port=0, on_spans=None):
+        self.port = port
+        self.on_spans = on_spans
+        self.spans = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # CICLO DE VIDA
+    # ------------------------------------------------------------------
+    def start(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != '/v1/traces':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                standin._receive(json.loads(body or b'{}'))
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def endpoint(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/v1/traces'
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # RECEPÇÃO
+    # ------------------------------------------------------------------
+    def _receive(self, payload):
+        received = []
+        for resource in payload.get('resourceSpans', []):
+            for scope in resource.get('scopeSpans', []):
+                received.extend(scope.get('spans', []))
+        with self._lock:
+            self.spans.extend(received)
+        if self.on_spans:
+            self.on_spans(received)
+
+    def traces(self):
+        """{traceId: [spans]}"""
+        with self._lock:
+            spans = list(self.spans)
+        grouped = {}
+        for item in spans:
+            grouped.setdefault(item['traceId'], []).append(item)
+        return grouped
+
+
+def duration_ms(item):
+    return (int(item['endTimeUnixNano']) - int(item['startTimeUnixNano'])) / 1e6
+
+
+def print_tree(spans):
+    children = {}
+    for item in spans:
+        children.setdefault(item.get('parentSpanId'), []).append(item)
+    ids = {item['spanId'] for item in spans}
+    roots = [item for item in spans if item.get('parentSpanId') not in ids]
+
+    def walk(item, depth):
+        error = f"  ERRO: {item['status'].get('message')}" if item.get('status', {}).get('code') == 2 else ''
+        print(f"{'  ' * depth}{item['name']:<{60 - 2 * depth}}{duration_ms(item):>10.1f} ms{error}")
+        for child in sorted(children.get(item['spanId'], []), key=lambda c: int(c['startTimeUnixNano'])):
+            walk(child, depth + 1)
+
+    for root in roots:
+        print(f"\ntrace {root['traceId']}")
+        walk(root, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=4318)
+    args = parser.parse_args()
+
+    # O exportador manda em lotes: agrupa por trace o que chegou em cada POST
+    def show(received):
+        grouped = {}
+        for item in received:
+            grouped.setdefault(item['traceId'], []).append(item)
+        for spans in grouped.values():
+            print_tree(spans)
+
+    standin = OTLPStandIn(port=args.port, on_spans=show).start()
+    print(f"Coletor OTLP em {standin.endpoint} (Ctrl+C para sair)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.stop()
+
+
+if __name__ == '__main__':
+    main()
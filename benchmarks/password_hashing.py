@@ -0,0 +1,111 @@
+# benchmarks/password_hashing.py
+"""
+Vazão de login local por esquema de hash (app/services/passwords.py).
+
+Para cada esquema/custo:
+- verify: tempo de uma verificação isolada (ms) — o custo de CPU por login;
+- login: POST /api/auth/login em rajada com usuários locais. O LDAP é o stand-in
+  sem nenhum usuário (responde "credenciais inválidas" na hora), então todo login
+  cai na verificação local, como o admin e as contas locais.
+
+Use para escolher PASSWORD_HASH_SCHEME / PASSWORD_HASH_COST: o custo deve ser o
+maior que ainda mantém a vazão de login acima do pico esperado (início de aula).
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.password_hashing
+    python -m benchmarks.password_hashing --schemes scrypt:16384 scrypt:32768 bcrypt:10 bcrypt:12 --logins 400
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models import User
+from app.services.passwords import PasswordPolicy
+from benchmarks.explain_indexes import make_app
+from benchmarks.ldap_standin import LDAPStandIn
+
+DEFAULT_SCHEMES = ['pbkdf2:600000', 'scrypt:16384', 'scrypt:32768', 'bcrypt:10', 'bcrypt:12']
+PASSWORD = 'senha-do-aluno'
+
+
+def parse_scheme(value):
+    scheme, _, cost = value.partition(':')
+    return scheme, int(cost) if cost else None
+
+
+def verify_ms(policy, rounds=5):
+    stored = policy.hash(PASSWORD)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        policy.verify(stored, PASSWORD)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def login_storm(app, n_users, logins, concurrency):
+    latencies = []
+
+    def one(i):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post('/api/auth/login', json={'username': f'local{i % n_users}', 'password': PASSWORD})
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_json()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(logins)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1], logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--schemes', nargs='+', default=DEFAULT_SCHEMES, help='esquema:custo')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    standin = LDAPStandIn().start()  # Diretório vazio: todo login vai para a senha local
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    app = make_app(database_url)
+    app.config.update(LDAP_SERVER=standin.url, LDAP_SERVERS=None, LDAP_PROBE_INTERVAL=0, LOGIN_CACHE_ENABLED=False)
+
+    print(f"{args.logins} logins locais, {args.concurrency} simultâneos, {os.cpu_count()} CPUs")
+    print(f"{'esquema':<16}{'verify ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'logins/s':>10}")
+
+    try:
+        with app.app_context():
+            for value in args.schemes:
+                scheme, cost = parse_scheme(value)
+                app.config.update(PASSWORD_HASH_SCHEME=scheme, PASSWORD_HASH_COST=cost)
+                policy = PasswordPolicy.from_config(app.config)
+
+                db.drop_all()
+                db.create_all()
+                stored = policy.hash(PASSWORD)  # Mesmo hash para todos: o custo do verify é o mesmo
+                db.session.execute(insert(User), [
+                    {'username': f'local{i}', 'email': f'local{i}@bench.local', 'password_hash': stored}
+                    for i in range(args.users)
+                ])
+                db.session.commit()
+
+                p50, p95, throughput = login_storm(app, args.users, args.logins, args.concurrency)
+                print(f"{scheme + ':' + str(policy.cost):<16}{verify_ms(policy):>10.1f}{p50:>10.1f}{p95:>10.1f}{throughput:>10.1f}")
+
+            db.session.remove()
+            db.drop_all()
+    finally:
+        standin.stop()
+
+
+if __name__ == '__main__':
+    main()
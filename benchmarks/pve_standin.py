@@ -0,0 +1,932 @@
+# benchmarks/pve_standin.py
+"""
+API do Proxmox VE local (stand-in) para benchmarks e testes, sem cluster de lab.
+
+Fala HTTPS + JSON no formato do PVE (/api2/json/..., envelope {"data": ...}),
+então o ProxmoxService real (proxmoxer, sem mock) aponta para ele só pela
+configuração. O estado fica em memória:
+
+- nodes, storages (com conteúdo por node: vztmpl, iso, imagens), pools,
+  usuários e ACLs do PVE;
+- guests LXC/QEMU com config, status, snapshots e regras de firewall;
+- tarefas com UPID no formato do PVE: 'running' até a duração configurada
+  passar, depois 'stopped' com exitstatus OK (ou o erro injetado). O efeito
+  (guest criado, ligado, removido...) só aparece quando a tarefa termina;
+- /cluster/resources, /cluster/nextid, /cluster/tasks e rrddata sintético.
+
+Custos e falhas configuráveis:
+
+- latency: atraso em toda requisição; path_latency: {regex: s} extra por caminho
+- task_duration / task_durations: duração das tarefas (padrão / por tipo, ex: 'vzclone')
+- fail(...): responde erro HTTP para método + caminho (regex), N vezes ou com probabilidade
+- fail_task(tipo, exitstatus): a próxima tarefa desse tipo termina com erro
+
+Fora da API do PVE, POST /api2/json/standin/load ({"guests": [...], "volumes": [...]})
+carrega guests/volumes em massa de outro processo (usado pelo `flask seed-scale --pve`).
+
+`stats` conta as chamadas por endpoint ('GET /nodes/{node}/{gtype}/{vmid}/status/current').
+
+Uso:
+    python -m benchmarks.pve_standin --port 8006 --latency 0.02 --task-duration 2 --guests 50
+    # e no .env: PROXMOX_HOST=127.0.0.1:8006, PROXMOX_VERIFY_SSL=false,
+    #            PROXMOX_API_TOKEN_NAME=standin, PROXMOX_API_TOKEN_VALUE=standin
+
+Em testes:
+    with PVEStandIn() as pve:
+        app.config.update(pve.app_config())
+"""
+import argparse
+from collections import Counter
+import itertools
+import json
+import random
+import re
+import threading
+import time
+
+from werkzeug.exceptions import HTTPException, NotFound
+from werkzeug.routing import Map, Rule
+from werkzeug.serving import WSGIRequestHandler, make_server
+from werkzeug.wrappers import Request, Response
+
+API_PREFIX = '/api2/json'
+
+# Tipos de tarefa do PVE por operação (o que aparece no UPID e em /cluster/tasks)
+TASK_TYPES = {
+    ('lxc', 'create'): 'vzcreate', ('qemu', 'create'): 'qmcreate',
+    ('lxc', 'clone'): 'vzclone', ('qemu', 'clone'): 'qmclone',
+    ('lxc', 'destroy'): 'vzdestroy', ('qemu', 'destroy'): 'qmdestroy',
+    ('lxc', 'start'): 'vzstart', ('qemu', 'start'): 'qmstart',
+    ('lxc', 'stop'): 'vzstop', ('qemu', 'stop'): 'qmstop',
+    ('lxc', 'shutdown'): 'vzshutdown', ('qemu', 'shutdown'): 'qmshutdown',
+    ('lxc', 'reboot'): 'vzreboot', ('qemu', 'reboot'): 'qmreboot',
+    ('lxc', 'reset'): 'vzreset', ('qemu', 'reset'): 'qmreset',
+    ('lxc', 'resize'): 'resize', ('qemu', 'resize'): 'resize',
+    ('lxc', 'snapshot'): 'vzsnapshot', ('qemu', 'snapshot'): 'qmsnapshot',
+    ('lxc', 'rollback'): 'vzrollback', ('qemu', 'rollback'): 'qmrollback',
+    ('lxc', 'delsnapshot'): 'vzdelsnapshot', ('qemu', 'delsnapshot'): 'qmdelsnapshot',
+    ('lxc', 'vncproxy'): 'vncproxy', ('qemu', 'vncproxy'): 'vncproxy',
+}
+
+# '/nodes/<node>/<any(lxc,qemu):gtype>' -> '/nodes/{node}/{gtype}' (chave de `stats`)
+_RULE_ARG = re.compile(r'<(?:[^:>]+:)?([^>]+)>')
+
+
+def _endpoint_key(rule):
+    return _RULE_ARG.sub(lambda m: '{%s}' % m.group(1), rule)
+
+
+GiB = 1024 ** 3
+MiB = 1024 ** 2
+
+
+class PVEError(Exception):
+    """Erro no formato do PVE: status HTTP com a mensagem na linha de status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class FailureRule:
+    def __init__(self, method, path, status, message, times, probability):
+        self.method = method.upper()
+        self.pattern = re.compile(path)
+        self.status = status
+        self.message = message
+        self.remaining = times          # None = sem limite
+        self.probability = probability
+        self.hits = 0
+
+    def matches(self, method, path):
+        if self.remaining == 0:
+            return False
+        if self.method not in ('*', method) or not self.pattern.search(path):
+            return False
+        return self.probability >= 1 or random.random() < self.probability
+
+
+class Task:
+    def __init__(self, upid, node, task_type, vmid, user, duration, on_done, on_end, exitstatus):
+        self.upid = upid
+        self.node = node
+        self.type = task_type
+        self.id = str(vmid or '')
+        self.user = user
+        self.starttime = int(time.time())
+        self.ends_at = time.monotonic() + duration
+        self.on_done = on_done          # Efeito da tarefa (só quando termina OK)
+        self.on_end = on_end            # Limpeza (sempre, ao terminar)
+        self.exitstatus = exitstatus    # Resultado final (OK ou erro injetado)
+        self.status = 'running'
+        self.endtime = None
+
+    def to_dict(self):
+        data = {
+            'upid': self.upid, 'node': self.node, 'type': self.type, 'id': self.id,
+            'user': self.user, 'starttime': self.starttime, 'status': self.status,
+            'pid': int(self.upid.split(':')[2], 16),
+        }
+        if self.status == 'stopped':
+            data['exitstatus'] = self.exitstatus
+            data['endtime'] = self.endtime
+        return data
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args):
+        pass
+
+
+class PVEStandIn:
+    def __init__(self, nodes=('pve1',), port=0, latency=0.0, task_duration=0.0,
+                 storages=None, seed=True):
+        self.port = port
+        self.latency = latency
+        self.path_latency = {}              # {regex: segundos extras}
+        self.task_duration = task_duration
+        self.task_durations = {}            # {'vzclone': 5.0, ...}
+        self.failures = []
+        self.task_failures = {}             # {'vzcreate': 'command failed', ...}
+        self.stats = Counter()
+
+        self.nodes = {}
+        self.storages = {}
+        self.guests = {}                    # vmid -> dict
+        self.pools = {}                     # poolid -> {'comment', 'members': set(vmid)}
+        self.users = {'root@pam': {'userid': 'root@pam', 'enable': 1, 'comment': ''}}
+        self.acls = set()                   # (path, ugid, roleid)
+        self.tasks = {}                     # upid -> Task
+        self._reserved = set()              # vmids de create/clone em andamento
+
+        self._lock = threading.RLock()
+        self._pids = itertools.count(random.randint(0x1000, 0x8000))
+        self._server = None
+        self._thread = None
+        self._url_map = self._build_url_map()
+
+        for name in nodes:
+            self.add_node(name)
+        for storage in storages or [
+            {'storage': 'local', 'type': 'dir', 'content': 'vztmpl,iso,backup', 'total': 100 * GiB},
+            {'storage': 'local-lvm', 'type': 'lvmthin', 'content': 'rootdir,images', 'total': 500 * GiB},
+        ]:
+            self.add_storage(**storage)
+        if seed:
+            self.seed_templates()
+
+    # ------------------------------------------------------------------
+    # ESTADO (montagem do cenário)
+    # ------------------------------------------------------------------
+    def add_node(self, name, maxcpu=32, maxmem=256 * GiB, status='online'):
+        with self._lock:
+            self.nodes[name] = {'node': name, 'status': status, 'maxcpu': maxcpu, 'maxmem': maxmem,
+                                'cpu': 0.05, 'uptime': 86400, 'type': 'node', 'id': f'node/{name}',
+                                'level': '', 'maxdisk': 100 * GiB, 'disk': 10 * GiB}
+            for storage in self.storages.values():
+                storage['volumes'].setdefault(name, {})
+
+    def add_storage(self, storage, type='dir', content='images', total=100 * GiB, shared=0):
+        with self._lock:
+            self.storages[storage] = {'storage': storage, 'type': type, 'content': content,
+                                      'shared': shared, 'total': total,
+                                      'volumes': {node: {} for node in self.nodes}}
+
+    def add_volume(self, storage, volid, content='vztmpl', size=200 * MiB, node=None, vmid=None):
+        """Arquivo/volume em um storage (em todos os nodes se `node` não for dado)."""
+        with self._lock:
+            for name in [node] if node else list(self.nodes):
+                volume = {'volid': volid, 'content': content, 'size': size,
+                          'format': 'tgz' if content == 'vztmpl' else 'raw', 'ctime': int(time.time())}
+                if vmid is not None:
+                    volume['vmid'] = int(vmid)
+                self.storages[storage]['volumes'].setdefault(name, {})[volid] = volume
+
+    def add_guest(self, vmid, type='lxc', node=None, name=None, status='stopped', template=False,
+                  pool=None, cores=1, memory=512, disk_gb=8, storage='local-lvm', **config):
+        with self._lock:
+            node = node or next(iter(self.nodes))
+            vmid = int(vmid)
+            guest_config = {'cores': cores, 'memory': memory, **config}
+            if type == 'lxc':
+                guest_config.setdefault('hostname', name or f'ct{vmid}')
+                guest_config.setdefault('rootfs', f'{storage}:vm-{vmid}-disk-0,size={disk_gb}G')
+                guest_config.setdefault('net0', 'name=eth0,bridge=vmbr0,ip=dhcp')
+                guest_config.setdefault('swap', 512)
+            else:
+                guest_config.setdefault('name', name or f'vm{vmid}')
+                guest_config.setdefault('scsi0', f'{storage}:vm-{vmid}-disk-0,size={disk_gb}G')
+                guest_config.setdefault('net0', 'virtio,bridge=vmbr0')
+            if template:
+                guest_config['template'] = 1
+            self.guests[vmid] = {
+                'vmid': vmid, 'type': type, 'node': node, 'status': status,
+                'config': guest_config, 'snapshots': {}, 'firewall': {'options': {}, 'rules': []},
+                'started': time.time() if status == 'running' else None,
+            }
+            if pool:
+                self.add_pool(pool)
+                self.pools[pool]['members'].add(vmid)
+            return self.guests[vmid]
+
+    def add_pool(self, poolid, comment=''):
+        with self._lock:
+            return self.pools.setdefault(poolid, {'comment': comment, 'members': set()})
+
+    def seed_templates(self):
+        """Catálogo mínimo: templates de arquivo, ISOs e dois templates clonáveis."""
+        for volid in ('local:vztmpl/debian-12-standard_12.2-1_amd64.tar.zst',
+                      'local:vztmpl/ubuntu-22.04-standard_22.04-1_amd64.tar.zst',
+                      'local:vztmpl/alpine-3.19-default_20240207_amd64.tar.xz'):
+            self.add_volume('local', volid, 'vztmpl')
+        self.add_volume('local', 'local:iso/debian-12.5.0-amd64-netinst.iso', 'iso', size=650 * MiB)
+        self.add_guest(9000, 'lxc', name='tpl-debian', template=True, cores=1, memory=512, disk_gb=8)
+        self.add_guest(9001, 'qemu', name='tpl-ubuntu', template=True, cores=2, memory=2048, disk_gb=20)
+
+    def populate(self, count, start_vmid=100, running_ratio=0.6, pools=10):
+        """Carga para benchmarks: `count` guests distribuídos entre nodes, tipos e pools."""
+        nodes = list(self.nodes)
+        for i in range(count):
+            vmid = start_vmid + i
+            self.add_guest(
+                vmid, 'lxc' if i % 4 else 'qemu', node=nodes[i % len(nodes)],
+                name=f'guest-{vmid}', status='running' if random.random() < running_ratio else 'stopped',
+                pool=f'vps-user{i % pools}' if pools else None,
+                cores=random.choice((1, 2, 4)), memory=random.choice((512, 1024, 2048, 4096)),
+            )
+
+    # ------------------------------------------------------------------
+    # CUSTOS E FALHAS
+    # ------------------------------------------------------------------
+    def fail(self, path, method='*', status=500, message='stand-in: falha injetada',
+             times=None, probability=1.0):
+        """Injeta erro HTTP em `método caminho` (regex sobre o caminho sem /api2/json)."""
+        rule = FailureRule(method, path, status, message, times, probability)
+        with self._lock:
+            self.failures.append(rule)
+        return rule
+
+    def fail_task(self, task_type, exitstatus='command failed (stand-in)'):
+        """A próxima tarefa do tipo (ex: 'vzclone') termina com `exitstatus`."""
+        with self._lock:
+            self.task_failures[task_type] = exitstatus
+
+    def clear_failures(self):
+        with self._lock:
+            self.failures.clear()
+            self.task_failures.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+
+    @property
+    def total_calls(self):
+        return sum(self.stats.values())
+
+    # ------------------------------------------------------------------
+    # TAREFAS
+    # ------------------------------------------------------------------
+    def _start_task(self, node, task_type, vmid=None, on_done=None, on_end=None, user='root@pam'):
+        with self._lock:
+            pid = next(self._pids)
+            now = int(time.time())
+            upid = f'UPID:{node}:{pid:08X}:{pid * 7:08X}:{now:08X}:{task_type}:{vmid or ""}:{user}:'
+            duration = self.task_durations.get(task_type, self.task_duration)
+            exitstatus = self.task_failures.pop(task_type, 'OK')
+            task = Task(upid, node, task_type, vmid, user, duration, on_done, on_end, exitstatus)
+            self.tasks[upid] = task
+        self._settle()
+        return upid
+
+    def _settle(self):
+        """Conclui as tarefas cujo tempo passou (e aplica o efeito das que deram OK)."""
+        now = time.monotonic()
+        with self._lock:
+            for task in self.tasks.values():
+                if task.status != 'running' or task.ends_at > now:
+                    continue
+                if task.exitstatus == 'OK' and task.on_done:
+                    try:
+                        task.on_done()
+                    except PVEError as e:
+                        task.exitstatus = e.message
+                if task.on_end:
+                    task.on_end()
+                task.status = 'stopped'
+                task.endtime = int(time.time())
+
+    def wait_tasks(self, timeout=30):
+        """Bloqueia até não haver tarefas rodando (útil em scripts de benchmark)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            self._settle()
+            with self._lock:
+                if not any(t.status == 'running' for t in self.tasks.values()):
+                    return True
+            time.sleep(0.05)
+        return False
+
+    # ------------------------------------------------------------------
+    # CICLO DE VIDA
+    # ------------------------------------------------------------------
+    def start(self):
+        # O proxmoxer só fala HTTPS: certificado auto-assinado gerado na hora
+        self._server = make_server('127.0.0.1', self.port, self.wsgi_app, threaded=True,
+                                   request_handler=_QuietHandler, ssl_context='adhoc')
+        self._thread = threading.Thread(target=self._server.serve_forever, name='pve-standin', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def host(self):
+        """Valor para PROXMOX_HOST ('127.0.0.1:<porta>')."""
+        return f'127.0.0.1:{self._server.server_port}'
+
+    @property
+    def url(self):
+        return f'https://{self.host}{API_PREFIX}'
+
+    def app_config(self):
+        """Chaves de configuração do Nubemox para usar este stand-in."""
+        return {
+            'PROXMOX_HOST': self.host,
+            'PROXMOX_USER': 'root@pam',
+            'PROXMOX_API_TOKEN_NAME': 'standin',
+            'PROXMOX_API_TOKEN_VALUE': 'standin',
+            'PROXMOX_VERIFY_SSL': False,
+            'PROXMOX_DEFAULT_NODE': next(iter(self.nodes)),
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # WSGI
+    # ------------------------------------------------------------------
+    def wsgi_app(self, environ, start_response):
+        request = Request(environ)
+        path = request.path[len(API_PREFIX):] if request.path.startswith(API_PREFIX) else request.path
+        method = request.method
+
+        delay = self.latency + sum(s for p, s in self.path_latency.items() if re.search(p, path))
+        if delay:
+            time.sleep(delay)
+
+        try:
+            rule, args = self._url_map.bind('standin', path_info=path).match(method=method, return_rule=True)
+            with self._lock:
+                self.stats[f'{method} {_endpoint_key(rule.rule)}'] += 1
+                injected = next((r for r in self.failures if r.matches(method, path)), None)
+                if injected is not None:
+                    injected.hits += 1
+                    if injected.remaining is not None:
+                        injected.remaining -= 1
+            if injected is not None:
+                raise PVEError(injected.status, injected.message)
+
+            params = request.args.to_dict()
+            params.update(request.form.to_dict())
+            if request.is_json:
+                params.update(request.get_json())
+            self._settle()
+            with self._lock:
+                data = getattr(self, f'_api_{rule.endpoint}')(params, **args)
+            response = Response(json.dumps({'data': data}), content_type='application/json;charset=UTF-8')
+        except PVEError as e:
+            response = self._error(e.status, e.message)
+        except NotFound:
+            response = self._error(501, f'Method \'{method} {path}\' not implemented')
+        except HTTPException as e:
+            response = self._error(e.code, e.description)
+        return response(environ, start_response)
+
+    @staticmethod
+    def _error(status, message):
+        # Como o pveproxy: a mensagem vai no reason phrase (é o que o proxmoxer mostra)
+        response = Response(json.dumps({'data': None}), content_type='application/json;charset=UTF-8')
+        response.status = f'{status} {message}'
+        return response
+
+    def _build_url_map(self):
+        guest = '/nodes/<node>/<any(lxc,qemu):gtype>/<int:vmid>'
+        rules = [
+            ('/version', 'version', 'GET'),
+            ('/standin/load', 'standin_load', 'POST'),
+            ('/access/ticket', 'ticket', 'POST'),
+            ('/access/users', 'users', 'GET'), ('/access/users', 'user_create', 'POST'),
+            ('/access/acl', 'acl', 'GET'), ('/access/acl', 'acl_update', 'PUT'),
+            ('/cluster/resources', 'cluster_resources', 'GET'),
+            ('/cluster/nextid', 'nextid', 'GET'),
+            ('/cluster/tasks', 'cluster_tasks', 'GET'),
+            ('/pools', 'pools', 'GET'), ('/pools', 'pool_create', 'POST'),
+            ('/pools/<poolid>', 'pool', 'GET'), ('/pools/<poolid>', 'pool_update', 'PUT'),
+            ('/pools/<poolid>', 'pool_delete', 'DELETE'),
+            ('/storage', 'storage', 'GET'),
+            ('/nodes', 'nodes', 'GET'),
+            ('/nodes/<node>/status', 'node_status', 'GET'),
+            ('/nodes/<node>/rrddata', 'rrddata', 'GET'),
+            ('/nodes/<node>/storage', 'node_storage', 'GET'),
+            ('/nodes/<node>/storage/<storage>/content', 'storage_content', 'GET'),
+            ('/nodes/<node>/tasks', 'node_tasks', 'GET'),
+            ('/nodes/<node>/tasks/<upid>/status', 'task_status', 'GET'),
+            ('/nodes/<node>/<any(lxc,qemu):gtype>', 'guests', 'GET'),
+            ('/nodes/<node>/<any(lxc,qemu):gtype>', 'guest_create', 'POST'),
+            (guest, 'guest', 'GET'), (guest, 'guest_delete', 'DELETE'),
+            (f'{guest}/config', 'guest_config', 'GET'),
+            (f'{guest}/config', 'guest_config_update', 'PUT'),
+            (f'{guest}/config', 'guest_config_update', 'POST'),
+            (f'{guest}/status/current', 'guest_status', 'GET'),
+            (f'{guest}/status/<any(start,stop,shutdown,reboot,reset):action>', 'guest_power', 'POST'),
+            (f'{guest}/clone', 'guest_clone', 'POST'),
+            (f'{guest}/resize', 'guest_resize', 'PUT'),
+            (f'{guest}/rrddata', 'rrddata', 'GET'),
+            (f'{guest}/snapshot', 'snapshots', 'GET'),
+            (f'{guest}/snapshot', 'snapshot_create', 'POST'),
+            (f'{guest}/snapshot/<snapname>', 'snapshot_delete', 'DELETE'),
+            (f'{guest}/snapshot/<snapname>/rollback', 'snapshot_rollback', 'POST'),
+            (f'{guest}/vncproxy', 'vncproxy', 'POST'),
+            (f'{guest}/firewall/options', 'firewall_options', 'GET'),
+            (f'{guest}/firewall/options', 'firewall_options_update', 'PUT'),
+            (f'{guest}/firewall/rules', 'firewall_rules', 'GET'),
+            (f'{guest}/firewall/rules', 'firewall_rule_create', 'POST'),
+        ]
+        return Map([Rule(path, endpoint=endpoint, methods=[method]) for path, endpoint, method in rules],
+                   strict_slashes=False)
+
+    # ------------------------------------------------------------------
+    # HELPERS
+    # ------------------------------------------------------------------
+    def _node(self, node):
+        if node not in self.nodes:
+            raise PVEError(500, f"hostname lookup '{node}' failed - failed to get address info")
+        return self.nodes[node]
+
+    def _guest(self, node, gtype, vmid):
+        guest = self.guests.get(int(vmid))
+        if guest is None or guest['type'] != gtype or guest['node'] != node:
+            kind = 'lxc' if gtype == 'lxc' else 'qemu-server'
+            raise PVEError(500, f"Configuration file 'nodes/{node}/{kind}/{vmid}.conf' does not exist")
+        return guest
+
+    def _guest_name(self, guest):
+        return guest['config'].get('hostname') or guest['config'].get('name') or f"{guest['type']}{guest['vmid']}"
+
+    def _pool_of(self, vmid):
+        return next((pid for pid, pool in self.pools.items() if vmid in pool['members']), None)
+
+    @staticmethod
+    def _disk_gb(guest):
+        key = 'rootfs' if guest['type'] == 'lxc' else 'scsi0'
+        match = re.search(r'size=(\d+)G', guest['config'].get(key, ''))
+        return int(match.group(1)) if match else 8
+
+    def _resource(self, guest):
+        running = guest['status'] == 'running'
+        maxmem = int(guest['config'].get('memory', 512)) * MiB
+        maxdisk = self._disk_gb(guest) * GiB
+        resource = {
+            'id': f"{guest['type']}/{guest['vmid']}", 'type': guest['type'], 'vmid': guest['vmid'],
+            'node': guest['node'], 'name': self._guest_name(guest), 'status': guest['status'],
+            'template': int(guest['config'].get('template', 0)),
+            'maxcpu': int(guest['config'].get('cores', 1)), 'maxmem': maxmem, 'maxdisk': maxdisk,
+            'cpu': 0.03 if running else 0, 'mem': maxmem // 4 if running else 0,
+            'disk': maxdisk // 5, 'uptime': int(time.time() - guest['started']) if running else 0,
+            'netin': 0, 'netout': 0, 'diskread': 0, 'diskwrite': 0,
+        }
+        pool = self._pool_of(guest['vmid'])
+        if pool:
+            resource['pool'] = pool
+        return resource
+
+    def _storage_status(self, storage, node):
+        used = sum(v['size'] for v in storage['volumes'].get(node, {}).values())
+        return {'storage': storage['storage'], 'type': storage['type'], 'content': storage['content'],
+                'shared': storage['shared'], 'active': 1, 'enabled': 1, 'total': storage['total'],
+                'used': used, 'avail': storage['total'] - used}
+
+    def _add_to_pool(self, poolid, vmid):
+        if not poolid:
+            return
+        if poolid not in self.pools:
+            raise PVEError(500, f"pool '{poolid}' does not exist")
+        self.pools[poolid]['members'].add(vmid)
+
+    def _reserve_vmid(self, vmid):
+        # Como o lock de criação do PVE: o vmid fica ocupado até a tarefa terminar
+        vmid = int(vmid)
+        if vmid in self.guests or vmid in self._reserved:
+            raise PVEError(500, f"VM {vmid} already exists")
+        self._reserved.add(vmid)
+        return vmid
+
+    def _guest_disk(self, gtype, storage, vmid, size_gb):
+        return {'rootfs' if gtype == 'lxc' else 'scsi0': f'{storage}:vm-{vmid}-disk-0,size={size_gb}G'}
+
+    # ------------------------------------------------------------------
+    # ENDPOINTS: CLUSTER / ACESSO / POOLS
+    # ------------------------------------------------------------------
+    def _api_version(self, params):
+        return {'version': '8.2.2', 'release': '8.2', 'repoid': 'standin'}
+
+    def _api_standin_load(self, params):
+        # Fora da API do PVE: carga em massa vinda de outro processo (flask seed-scale)
+        nodes = itertools.cycle(self.nodes)
+        for guest in params.get('guests', []):
+            guest = dict(guest)
+            self.add_guest(guest.pop('vmid'), guest.pop('type', 'lxc'), node=guest.pop('node', None) or next(nodes),
+                           **guest)
+        for volume in params.get('volumes', []):
+            self.add_volume(**volume)
+        return {'guests': len(self.guests), 'volumes': sum(len(v) for s in self.storages.values()
+                                                           for v in s['volumes'].values())}
+
+    def _api_ticket(self, params):
+        username = params.get('username', 'root@pam')
+        return {'username': username, 'ticket': f'PVE:{username}:STANDIN::ticket',
+                'CSRFPreventionToken': 'STANDIN:csrf', 'cap': {}}
+
+    def _api_users(self, params):
+        return list(self.users.values())
+
+    def _api_user_create(self, params):
+        userid = params['userid']
+        if userid in self.users:
+            raise PVEError(500, f"create user failed: user '{userid}' already exists")
+        self.users[userid] = {'userid': userid, 'enable': int(params.get('enable', 1)),
+                              'comment': params.get('comment', '')}
+        return None
+
+    def _api_acl(self, params):
+        return [{'path': path, 'ugid': ugid, 'roleid': role, 'type': 'user', 'propagate': 1}
+                for path, ugid, role in sorted(self.acls)]
+
+    def _api_acl_update(self, params):
+        ugids = [u for u in params.get('users', '').split(',') if u]
+        for ugid in ugids:
+            if ugid not in self.users:
+                raise PVEError(500, f"user '{ugid}' does not exist")
+        for role in params.get('roles', '').split(','):
+            for ugid in ugids:
+                entry = (params['path'], ugid, role)
+                if params.get('delete') in ('1', 'true'):
+                    self.acls.discard(entry)
+                else:
+                    self.acls.add(entry)
+        return None
+
+    def _api_cluster_resources(self, params):
+        kind = params.get('type')
+        resources = []
+        if kind in (None, 'node'):
+            resources.extend(dict(node, mem=node['maxmem'] // 8) for node in self.nodes.values())
+        if kind in (None, 'vm'):
+            resources.extend(self._resource(g) for g in sorted(self.guests.values(), key=lambda g: g['vmid']))
+        if kind in (None, 'storage'):
+            for storage in self.storages.values():
+                for node in self.nodes:
+                    status = self._storage_status(storage, node)
+                    resources.append({'id': f"storage/{node}/{storage['storage']}", 'type': 'storage',
+                                      'node': node, 'storage': storage['storage'], 'status': 'available',
+                                      'maxdisk': status['total'], 'disk': status['used'],
+                                      'content': storage['content'], 'shared': storage['shared']})
+        if kind in (None, 'pool'):
+            resources.extend({'id': f'/pool/{pid}', 'type': 'pool', 'pool': pid} for pid in self.pools)
+        return resources
+
+    def _api_nextid(self, params):
+        vmid = 100
+        while vmid in self.guests or vmid in self._reserved:
+            vmid += 1
+        return str(vmid)
+
+    def _api_cluster_tasks(self, params):
+        tasks = sorted(self.tasks.values(), key=lambda t: t.starttime, reverse=True)
+        return [t.to_dict() for t in tasks[:1000]]
+
+    def _api_pools(self, params):
+        return [{'poolid': pid, 'comment': pool['comment']} for pid, pool in sorted(self.pools.items())]
+
+    def _api_pool_create(self, params):
+        poolid = params['poolid']
+        if poolid in self.pools:
+            raise PVEError(500, f"create pool failed: pool '{poolid}' already exists")
+        self.add_pool(poolid, params.get('comment', ''))
+        return None
+
+    def _api_pool(self, params, poolid):
+        pool = self.pools.get(poolid)
+        if pool is None:
+            raise PVEError(500, f"pool '{poolid}' does not exist")
+        members = [self._resource(self.guests[v]) for v in sorted(pool['members']) if v in self.guests]
+        return {'comment': pool['comment'], 'members': members}
+
+    def _api_pool_update(self, params, poolid):
+        if poolid not in self.pools:
+            raise PVEError(500, f"pool '{poolid}' does not exist")
+        pool = self.pools[poolid]
+        if 'comment' in params:
+            pool['comment'] = params['comment']
+        vmids = {int(v) for v in re.split(r'[,;\s]+', params.get('vms', '')) if v}
+        if params.get('delete') in ('1', 'true'):
+            pool['members'] -= vmids
+        else:
+            pool['members'] |= vmids
+        return None
+
+    def _api_pool_delete(self, params, poolid):
+        pool = self.pools.get(poolid)
+        if pool is None:
+            raise PVEError(500, f"pool '{poolid}' does not exist")
+        if pool['members'] & set(self.guests):
+            raise PVEError(500, f"delete pool failed: pool '{poolid}' is not empty")
+        del self.pools[poolid]
+        return None
+
+    # ------------------------------------------------------------------
+    # ENDPOINTS: NODES / STORAGE / TAREFAS
+    # ------------------------------------------------------------------
+    def _api_nodes(self, params):
+        return [dict(node, mem=node['maxmem'] // 8) for node in self.nodes.values()]
+
+    def _api_node_status(self, params, node):
+        info = self._node(node)
+        return {'cpu': info['cpu'], 'cpuinfo': {'cpus': info['maxcpu']}, 'uptime': info['uptime'],
+                'memory': {'total': info['maxmem'], 'used': info['maxmem'] // 8,
+                           'free': info['maxmem'] - info['maxmem'] // 8},
+                'pveversion': 'pve-manager/8.2.2/standin'}
+
+    def _api_storage(self, params):
+        return [{k: v for k, v in s.items() if k not in ('volumes', 'total')} for s in self.storages.values()]
+
+    def _api_node_storage(self, params, node):
+        self._node(node)
+        content = params.get('content')
+        return [self._storage_status(s, node) for s in self.storages.values()
+                if not content or content in s['content'].split(',')]
+
+    def _api_storage_content(self, params, node, storage):
+        self._node(node)
+        if storage not in self.storages:
+            raise PVEError(500, f"storage '{storage}' does not exist")
+        volumes = self.storages[storage]['volumes'].get(node, {}).values()
+        content = params.get('content')
+        return [dict(v) for v in volumes if not content or v['content'] == content]
+
+    def _api_node_tasks(self, params, node):
+        self._node(node)
+        return [t.to_dict() for t in self.tasks.values() if t.node == node]
+
+    def _api_task_status(self, params, node, upid):
+        task = self.tasks.get(upid)
+        if task is None or task.node != node:
+            raise PVEError(500, "unable to open file - No such file or directory")
+        return task.to_dict()
+
+    def _api_rrddata(self, params, node, gtype=None, vmid=None):
+        # Série sintética (pontos por minuto na última hora), determinística por alvo
+        self._node(node)
+        step = {'hour': 60, 'day': 1800, 'week': 3 * 3600}.get(params.get('timeframe', 'hour'), 60)
+        seed = vmid or sum(map(ord, node))
+        now = int(time.time()) // step * step
+        points = []
+        for i in range(70):
+            wave = (i * 7 + seed) % 10 / 10
+            points.append({'time': now - (69 - i) * step, 'cpu': round(0.05 + wave * 0.3, 4), 'maxcpu': 2,
+                           'mem': int((0.2 + wave * 0.4) * GiB), 'maxmem': 2 * GiB,
+                           'netin': wave * 1e5, 'netout': wave * 5e4,
+                           'diskread': wave * 2e5, 'diskwrite': wave * 1e5})
+        return points
+
+    # ------------------------------------------------------------------
+    # ENDPOINTS: GUESTS
+    # ------------------------------------------------------------------
+    def _api_guests(self, params, node, gtype):
+        self._node(node)
+        guests = [g for g in self.guests.values() if g['node'] == node and g['type'] == gtype]
+        return [self._resource(g) for g in sorted(guests, key=lambda g: g['vmid'])]
+
+    def _api_guest_create(self, params, node, gtype):
+        self._node(node)
+        if gtype == 'lxc':
+            ostemplate = params.get('ostemplate', '')
+            storage_id, _, _ = ostemplate.partition(':')
+            volumes = self.storages.get(storage_id, {}).get('volumes', {}).get(node, {})
+            if ostemplate not in volumes:
+                raise PVEError(500, f"volume '{ostemplate}' does not exist")
+        pool = params.get('pool')
+        if pool and pool not in self.pools:
+            raise PVEError(500, f"pool '{pool}' does not exist")
+        vmid = self._reserve_vmid(params['vmid'])
+        config = {k: v for k, v in params.items() if k not in ('vmid', 'pool', 'storage', 'password', 'ostemplate')}
+        storage = params.get('storage', 'local-lvm')
+        # 'local-lvm:8' (alocar 8G) vira o volume criado
+        disk_key = 'rootfs' if gtype == 'lxc' else 'scsi0'
+        size = re.search(r':(\d+)$', config.get(disk_key, ''))
+        config.update(self._guest_disk(gtype, storage, vmid, size.group(1) if size else 8))
+
+        def done():
+            self.add_guest(vmid, gtype, node=node, storage=storage, **config)
+            self._add_to_pool(pool, vmid)
+
+        return self._start_task(node, TASK_TYPES[(gtype, 'create')], vmid, done,
+                                on_end=lambda: self._reserved.discard(vmid))
+
+    def _api_guest(self, params, node, gtype, vmid):
+        self._guest(node, gtype, vmid)
+        return [{'subdir': s} for s in ('config', 'status', 'snapshot', 'firewall', 'rrddata', 'vncproxy')]
+
+    def _api_guest_delete(self, params, node, gtype, vmid):
+        guest = self._guest(node, gtype, vmid)
+        if guest['status'] == 'running':
+            raise PVEError(500, f"{'CT' if gtype == 'lxc' else 'VM'} {vmid} is running - destroy failed")
+
+        def done():
+            self.guests.pop(guest['vmid'], None)
+            for pool in self.pools.values():
+                pool['members'].discard(guest['vmid'])
+
+        return self._start_task(node, TASK_TYPES[(gtype, 'destroy')], vmid, done)
+
+    def _api_guest_config(self, params, node, gtype, vmid):
+        guest = self._guest(node, gtype, vmid)
+        return dict(guest['config'], digest='standin')
+
+    def _api_guest_config_update(self, params, node, gtype, vmid):
+        guest = self._guest(node, gtype, vmid)
+        for key in params.pop('delete', '').split(','):
+            guest['config'].pop(key.strip(), None)
+        params.pop('digest', None)
+        guest['config'].update(params)
+        return None
+
+    def _api_guest_status(self, params, node, gtype, vmid):
+        guest = self._guest(node, gtype, vmid)
+        status = self._resource(guest)
+        if gtype == 'qemu':
+            status['qmpstatus'] = guest['status']
+        if guest['config'].get('lock'):
+            status['lock'] = guest['config']['lock']
+        return status
+
+    def _api_guest_power(self, params, node, gtype, vmid, action):
+        guest = self._guest(node, gtype, vmid)
+        if guest['config'].get('template'):
+            raise PVEError(500, f"{action} failed: guest {vmid} is a template")
+        running = guest['status'] == 'running'
+        if action == 'start' and running:
+            raise PVEError(500, f"{'CT' if gtype == 'lxc' else 'VM'} {vmid} already running")
+        if action in ('reboot', 'reset', 'shutdown') and not running:
+            raise PVEError(500, f"{'CT' if gtype == 'lxc' else 'VM'} {vmid} not running")
+
+        def done():
+            if action in ('start', 'reboot', 'reset'):
+                guest['status'], guest['started'] = 'running', time.time()
+            else:
+                guest['status'], guest['started'] = 'stopped', None
+
+        return self._start_task(node, TASK_TYPES[(gtype, action)], vmid, done)
+
+    def _api_guest_clone(self, params, node, gtype, vmid):
+        source = self._guest(node, gtype, vmid)
+        target = params.get('target', node)
+        self._node(target)
+        pool = params.get('pool')
+        if pool and pool not in self.pools:
+            raise PVEError(500, f"pool '{pool}' does not exist")
+        newid = self._reserve_vmid(params['newid'])
+        name_key = 'hostname' if gtype == 'lxc' else 'name'
+        config = {k: v for k, v in source['config'].items() if k not in ('template', 'lock', name_key)}
+        config[name_key] = params.get(name_key) or f'copy-of-{self._guest_name(source)}'
+        config.update(self._guest_disk(gtype, params.get('storage') or 'local-lvm', newid, self._disk_gb(source)))
+
+        def done():
+            self.add_guest(newid, gtype, node=target, **config)
+            self._add_to_pool(pool, newid)
+
+        return self._start_task(node, TASK_TYPES[(gtype, 'clone')], vmid, done,
+                                on_end=lambda: self._reserved.discard(newid))
+
+    def _api_guest_resize(self, params, node, gtype, vmid):
+        guest = self._guest(node, gtype, vmid)
+        disk = params.get('disk', 'rootfs' if gtype == 'lxc' else 'scsi0')
+        if disk not in guest['config']:
+            raise PVEError(400, f"disk '{disk}' does not exist")
+        match = re.fullmatch(r'(\+?)(\d+)G', params.get('size', ''))
+        if not match:
+            raise PVEError(400, "Parameter verification failed. size: invalid format")
+        current = self._disk_gb(guest)
+        new_size = current + int(match.group(2)) if match.group(1) else int(match.group(2))
+        if new_size < current:
+            raise PVEError(500, "unable to shrink disk size")
+
+        def done():
+            guest['config'][disk] = re.sub(r'size=\d+G', f'size={new_size}G', guest['config'][disk])
+
+        return self._start_task(node, TASK_TYPES[(gtype, 'resize')], vmid, done)
+
+    def _api_snapshots(self, params, node, gtype, vmid):
+        guest = self._guest(node, gtype, vmid)
+        snaps = [{k: v for k, v in s.items() if k != 'config'} for s in guest['snapshots'].values()]
+        return snaps + [{'name': 'current', 'description': 'You are here!', 'running': int(guest['status'] == 'running')}]
+
+    def _api_snapshot_create(self, params, node, gtype, vmid):
+        guest = self._guest(node, gtype, vmid)
+        snapname = params['snapname']
+        if snapname in guest['snapshots']:
+            raise PVEError(500, f"snapshot name '{snapname}' already used")
+
+        def done():
+            guest['snapshots'][snapname] = {'name': snapname, 'description': params.get('description', ''),
+                                            'snaptime': int(time.time()), 'vmstate': int(params.get('vmstate', 0)),
+                                            'config': dict(guest['config'])}
+
+        return self._start_task(node, TASK_TYPES[(gtype, 'snapshot')], vmid, done)
+
+    def _snapshot(self, guest, snapname):
+        if snapname not in guest['snapshots']:
+            raise PVEError(500, f"snapshot '{snapname}' does not exist")
+        return guest['snapshots'][snapname]
+
+    def _api_snapshot_delete(self, params, node, gtype, vmid, snapname):
+        guest = self._guest(node, gtype, vmid)
+        self._snapshot(guest, snapname)
+        return self._start_task(node, TASK_TYPES[(gtype, 'delsnapshot')], vmid,
+                                lambda: guest['snapshots'].pop(snapname, None))
+
+    def _api_snapshot_rollback(self, params, node, gtype, vmid, snapname):
+        guest = self._guest(node, gtype, vmid)
+        snapshot = self._snapshot(guest, snapname)
+
+        def done():
+            guest['config'] = dict(snapshot['config'])
+            guest['status'] = 'running' if snapshot['vmstate'] else 'stopped'
+
+        return self._start_task(node, TASK_TYPES[(gtype, 'rollback')], vmid, done)
+
+    def _api_vncproxy(self, params, node, gtype, vmid):
+        self._guest(node, gtype, vmid)
+        upid = self._start_task(node, TASK_TYPES[(gtype, 'vncproxy')], vmid)
+        return {'port': str(5900 + int(vmid) % 100), 'ticket': f'PVEVNC:STANDIN::{vmid}',
+                'user': 'root@pam', 'cert': '', 'upid': upid}
+
+    def _api_firewall_options(self, params, node, gtype, vmid):
+        return dict(self._guest(node, gtype, vmid)['firewall']['options'])
+
+    def _api_firewall_options_update(self, params, node, gtype, vmid):
+        self._guest(node, gtype, vmid)['firewall']['options'].update(params)
+        return None
+
+    def _api_firewall_rules(self, params, node, gtype, vmid):
+        rules = self._guest(node, gtype, vmid)['firewall']['rules']
+        return [dict(rule, pos=pos) for pos, rule in enumerate(rules)]
+
+    def _api_firewall_rule_create(self, params, node, gtype, vmid):
+        if params.get('type') not in ('in', 'out', 'group') or not params.get('action'):
+            raise PVEError(400, 'Parameter verification failed. type/action: property is missing')
+        self._guest(node, gtype, vmid)['firewall']['rules'].insert(int(params.pop('pos', 0)), params)
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8006)
+    parser.add_argument('--nodes', default='pve1', help='Nomes separados por vírgula')
+    parser.add_argument('--latency', type=float, default=0.0, help='Atraso por requisição (s)')
+    parser.add_argument('--task-duration', type=float, default=1.0, help='Duração das tarefas (s)')
+    parser.add_argument('--guests', type=int, default=0, help='Guests extras para popular o cluster')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Probabilidade de erro 500 em POSTs')
+    args = parser.parse_args()
+
+    standin = PVEStandIn(nodes=args.nodes.split(','), port=args.port, latency=args.latency,
+                         task_duration=args.task_duration)
+    if args.guests:
+        standin.populate(args.guests)
+    if args.fail_rate:
+        standin.fail(r'.', method='POST', probability=args.fail_rate)
+    standin.start()
+    print(f"PVE stand-in em {standin.url} (Ctrl+C para sair)")
+    for key, value in standin.app_config().items():
+        print(f"  {key}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.stop()
+        for endpoint, count in standin.stats.most_common():
+            print(f"{count:>8}  {endpoint}")
+
+
+if __name__ == '__main__':
+    main()
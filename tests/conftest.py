@@ -38,7 +38,7 @@ def app():
     # Contexto da Aplicação
     with app.app_context():
         # --- CRUCIAL: Importar Models aqui para o SQLAlchemy criar as tabelas ---
-        from app.models import User, ResourceQuota, ServiceTemplate, VirtualResource
+        from app.models import User, ServiceTemplate, VirtualResource
         
         db.create_all()  # Cria o schema no SQLite em memória
         
@@ -93,4 +93,37 @@ def service(app, mock_pve_connection):
     svc = ProxmoxService()
     # Injeta o mock para garantir que não use a conexão real
     svc._connection = mock_pve_connection
-    return svc
\ No newline at end of file
+    return svc
+
+@pytest.fixture(scope='module')
+def pve(request):
+    """
+    PVE stand-in (benchmarks/pve_standin.py), um por módulo de teste.
+    O módulo pode definir PVE_LAYOUT para montar o cluster:
+    {'nodes': (...), 'storages': [kwargs de add_storage], 'volumes': [...], 'guests': [...]}.
+    """
+    from benchmarks.pve_standin import PVEStandIn
+
+    layout = getattr(request.module, 'PVE_LAYOUT', {})
+    with PVEStandIn(nodes=layout.get('nodes', ('pve1',))) as standin:
+        for storage in layout.get('storages', ()):
+            standin.add_storage(**storage)
+        for volume in layout.get('volumes', ()):
+            standin.add_volume(**volume)
+        for guest in layout.get('guests', ()):
+            standin.add_guest(**guest)
+        yield standin
+
+
+@pytest.fixture
+def pve_service(app, pve):
+    """ProxmoxService real (proxmoxer + HTTPS), só a configuração aponta para o stand-in."""
+    from app.proxmox import ProxmoxService
+
+    pve.clear_failures()
+    pve.reset_stats()
+    pve.path_latency.clear()
+    app.config.update(pve.app_config())
+    svc = ProxmoxService()
+    svc.init_app(app)
+    return svc
@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import patch
+
+from app.services import credential_cache as cache_module
+from app.services.credential_cache import CredentialCache
+
+LDAP_USER = {'username': 'aluno', 'email': 'aluno@nubemox.local', 'fullname': 'Aluno'}
+
+
+def _cache(**kwargs):
+    # n baixo só para o teste ficar rápido
+    return CredentialCache(scrypt_n=16, **kwargs)
+
+
+def test_positive_negative_and_invalidation():
+    cache = _cache()
+    cache.store('aluno', 'certa', ok=True, data=LDAP_USER)
+    cache.store('aluno', 'errada', ok=False)
+
+    assert cache.lookup('aluno', 'certa') == (True, LDAP_USER)
+    assert cache.lookup('aluno', 'errada') == (False, None)
+    assert cache.lookup('aluno', 'outra') is None
+    assert cache.lookup('outro', 'certa') is None
+
+    cache.invalidate('aluno')
+    assert cache.lookup('aluno', 'certa') is None
+
+
+def test_entries_expire_and_lru_is_bounded(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: clock[0])
+    cache = _cache(ttl=60, negative_ttl=5, max_users=2)
+
+    cache.store('a', 'x', ok=True)
+    cache.store('a', 'y', ok=False)
+    clock[0] += 10
+    assert cache.lookup('a', 'y') is None          # negativa expirou
+    assert cache.lookup('a', 'x') == (True, None)  # positiva ainda vale
+
+    cache.store('b', 'x', ok=True)
+    cache.lookup('a', 'x')
+    cache.store('c', 'x', ok=True)                 # 'a' foi usado depois de 'b': 'b' sai
+    assert len(cache) == 2
+    assert cache.lookup('b', 'x') is None
+    assert cache.lookup('a', 'x') == (True, None)
+
+
+@pytest.fixture
+def login_cache(app, monkeypatch):
+    app.config.update(LOGIN_CACHE_ENABLED=True, LOGIN_CACHE_SCRYPT_N=16)
+    monkeypatch.setattr(cache_module, '_cache', None)
+    yield
+    monkeypatch.setattr(cache_module, '_cache', None)
+
+
+def test_repeated_login_skips_directory(client, login_cache):
+    with patch('app.api.auth.routes.LDAPService') as MockService:
+        service = MockService.return_value
+        service.authenticate.return_value = LDAP_USER
+        service.last_error = None
+
+        for _ in range(3):
+            response = client.post('/api/auth/login', json={'username': 'aluno', 'password': 'certa'})
+            assert response.status_code == 200
+
+    assert service.authenticate.call_count == 1
+
+
+def test_wrong_password_not_cached_when_directory_is_down(client, login_cache):
+    with patch('app.api.auth.routes.LDAPService') as MockService:
+        service = MockService.return_value
+        service.authenticate.return_value = None
+        service.last_error = 'timed out'
+
+        for _ in range(2):
+            response = client.post('/api/auth/login', json={'username': 'aluno', 'password': 'x'})
+            assert response.status_code == 401
+
+    assert service.authenticate.call_count == 2
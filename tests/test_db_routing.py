@@ -0,0 +1,139 @@
+import pytest
+from flask import g
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import User
+
+
+class ReplicaConfig(TestingConfig):
+    JWT_SECRET_KEY = 'test-secret-key'
+    SQLALCHEMY_REPLICA_URIS = ['sqlite://']
+
+
+@pytest.fixture
+def replica_app():
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_reads_go_to_primary_by_default(replica_app):
+    with replica_app.test_request_context('/api/admin/users'):
+        assert db.session.get_bind(mapper=User) is db.engines[None]
+
+
+def _replica(app):
+    return app.extensions['db_replicas'][0]
+
+
+def test_marked_reads_go_to_replica_until_a_write(replica_app):
+    with replica_app.test_request_context('/api/admin/users'):
+        g.db_read_replica = True
+        assert db.session.get_bind(mapper=User) is _replica(replica_app)
+
+        user = User(username='aluno', email='aluno@nubemox.local')
+        db.session.add(user)
+        db.session.flush()
+
+        # Depois de escrever, a requisição fica fixa no primário
+        assert db.session.get_bind(mapper=User) is db.engines[None]
+        db.session.rollback()
+
+
+def test_read_replica_decorator_only_flags_get(replica_app):
+    from app.db_routing import read_replica
+
+    @read_replica
+    def view():
+        return g.get('db_read_replica', False)
+
+    # Cada requisição real ganha um app context (e um `g`) novo
+    with replica_app.app_context(), replica_app.test_request_context('/x', method='GET'):
+        assert view() is True
+    with replica_app.app_context(), replica_app.test_request_context('/x', method='POST'):
+        assert view() is False
+
+
+def test_bulk_execute_pins_primary(replica_app):
+    from sqlalchemy import insert
+
+    with replica_app.test_request_context('/api/admin/templates/import', method='POST'):
+        g.db_read_replica = True
+        # INSERT em massa não passa pelo flush
+        db.session.execute(insert(User), [{'username': 'a1', 'email': 'a1@nubemox.local'}])
+        assert g.db_pinned_primary is True
+        assert db.session.get_bind(mapper=User) is db.engines[None]
+        db.session.rollback()
+
+
+def test_write_mark_sticks_on_another_worker(replica_app):
+    from flask import Response
+    from flask_jwt_extended import create_access_token, verify_jwt_in_request
+    from sqlalchemy import update
+    from app.db_routing import WRITE_MARK_COOKIE, WRITE_MARK_HEADER, read_replica
+
+    @read_replica
+    def view():
+        return g.get('db_read_replica', False)
+
+    def add_users():
+        for name in ('admin', 'aluno'):
+            db.session.add(User(username=name, email=f'{name}@nubemox.local'))
+        db.session.commit()
+
+    add_users()
+    headers = {'Authorization': f"Bearer {create_access_token(identity='1')}"}
+    with replica_app.test_request_context('/api/admin/templates/import', method='POST', headers=headers):
+        verify_jwt_in_request()
+        db.session.execute(update(User).where(User.id == 0).values(is_admin=True))
+        db.session.rollback()
+        response = replica_app.process_response(Response())
+    mark = response.headers[WRITE_MARK_HEADER]
+    assert WRITE_MARK_COOKIE in response.headers['Set-Cookie']
+
+    # Outro processo (sem estado em comum): a marca vem do cliente
+    other = create_app(ReplicaConfig)
+    with other.app_context():
+        db.create_all()
+        add_users()
+    for extra in ({WRITE_MARK_HEADER: mark}, {'Cookie': f'{WRITE_MARK_COOKIE}={mark}'}):
+        with other.app_context(), other.test_request_context('/api/admin/templates', headers={**headers, **extra}):
+            verify_jwt_in_request()
+            assert view() is False
+    with other.app_context(), other.test_request_context('/api/admin/templates', headers=headers):
+        verify_jwt_in_request()
+        assert view() is True
+
+    # A marca é do usuário que escreveu
+    other_user = {'Authorization': f"Bearer {create_access_token(identity='2')}", WRITE_MARK_HEADER: mark}
+    with other.app_context(), other.test_request_context('/api/admin/templates', headers=other_user):
+        verify_jwt_in_request()
+        assert view() is True
+    with other.app_context():
+        db.drop_all()
+
+
+def test_resource_listing_syncs_on_primary(replica_app, mocker):
+    from flask_jwt_extended import create_access_token
+    from app.models import VirtualResource
+
+    pve = mocker.patch('app.api.provisioning.routes.proxmox_client')
+    pve._resolve_node_id.return_value = 'pve1'
+    pve.connection.nodes.return_value.lxc.return_value.status.current.get.return_value = {'status': 'stopped'}
+    user = User(username='aluno', email='aluno@nubemox.local')
+    db.session.add(user)
+    db.session.flush()
+    resource = VirtualResource(proxmox_vmid=300, name='ct', type='lxc', owner_id=user.id, status='running')
+    db.session.add(resource)
+    db.session.commit()
+
+    # A réplica (sqlite:// vazio) nem tem as tabelas: a listagem só funciona lendo do primário
+    response = replica_app.test_client().get(
+        '/api/provisioning/resources', headers={'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    )
+    assert response.status_code == 200 and response.get_json()[0]['status'] == 'stopped'
+    assert db.session.get(VirtualResource, resource.id).status == 'stopped'
@@ -0,0 +1,63 @@
+"""
+Orçamento de chamadas ao PVE por deploy (DEPLOY_PVE_CALL_BUDGET), medido pelo
+cronômetro de app/deploy_timing.py com o deploy real contra o PVE stand-in.
+Se uma mudança acrescentar round-trips ao caminho do deploy, estes testes falham.
+"""
+from flask_jwt_extended import create_access_token
+import pytest
+
+from app.extensions import db
+from app.models import ServiceTemplate, User
+
+PHASES = ['validation', 'vmid', 'pool_user', 'create', 'onboot', 'start', 'status', 'db_commit']
+
+
+@pytest.fixture
+def deploy(app, client, pve_service, monkeypatch):
+    app.config['DEPLOY_TIMING_IN_RESPONSE'] = True
+    monkeypatch.setattr('app.api.provisioning.routes.proxmox_client', pve_service)
+
+    user = User(username='tiago', email='tiago@test.local', password_hash='!')
+    db.session.add_all([
+        user,
+        ServiceTemplate(name='Debian (clone)', type='lxc', proxmox_template_volid='9000', deploy_mode='clone'),
+        ServiceTemplate(name='Debian (arquivo)', type='lxc', deploy_mode='file',
+                        proxmox_template_volid='local:vztmpl/debian-12-standard_12.2-1_amd64.tar.zst'),
+    ])
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+    def run(template_id, name):
+        response = client.post('/api/provisioning/deploy', headers=headers,
+                               json={'template_id': template_id, 'name': name})
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['timings']
+    return run
+
+
+def _phase_calls(timings):
+    return {s['name']: s['pve_calls'] for s in timings['steps']}
+
+
+@pytest.mark.parametrize('template_id', [1, 2], ids=['clone', 'file'])
+def test_deploy_within_call_budget(app, deploy, template_id):
+    budget = app.config['DEPLOY_PVE_CALL_BUDGET']
+    timings = deploy(template_id, 'web01')
+
+    assert [s['name'] for s in timings['steps']] == PHASES
+    assert timings['pve_calls'] <= budget, _phase_calls(timings)
+    # Cada tarefa (clone/create e start) terminou na primeira consulta de status
+    assert timings['task_polls'] == 2
+
+
+def test_repeat_deploy_skips_pool_and_user(app, deploy):
+    first = _phase_calls(deploy(1, 'web01'))
+    second = _phase_calls(deploy(1, 'web02'))
+
+    # Cache de existência: pool e usuário já conhecidos não voltam ao PVE
+    assert first['pool_user'] > 0 and second['pool_user'] == 0
+    assert second['validation'] == second['db_commit'] == 0
+
+    metrics = app.extensions['deploy_metrics'].snapshot()
+    assert metrics['deploys']['count'] == 2 and metrics['deploys']['over_budget'] == 0
+    assert metrics['phases']['vmid']['pve_calls_max'] == 1
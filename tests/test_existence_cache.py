@@ -0,0 +1,56 @@
+from app.proxmox import cache as cache_module
+
+
+def _setup(app, service):
+    realm = app.config['PROXMOX_AUTH_REALM']
+    conn = service.connection
+    conn.pools.get.return_value = [{'poolid': 'vps-outro'}]
+    conn.access.users.get.return_value = [{'userid': f'outro@{realm}'}]
+    conn.access.acl.get.return_value = []
+    return conn
+
+
+def _ensure_all(service, username):
+    poolid = service.ensure_user_pool(username)
+    userid = service.ensure_pve_user(username)
+    return poolid, userid
+
+
+def test_repeat_deploy_skips_pve_calls(app, service):
+    conn = _setup(app, service)
+
+    _ensure_all(service, 'tiago')
+    assert conn.pools.post.call_count == 1
+    assert conn.access.users.post.call_count == 1
+
+    conn.reset_mock()
+    _ensure_all(service, 'tiago')
+    assert conn.method_calls == []
+
+
+def test_bulk_listing_serves_other_users(app, service):
+    conn = _setup(app, service)
+
+    _ensure_all(service, 'tiago')
+    conn.reset_mock()
+    # 'outro' já existia na listagem: nenhuma chamada ao PVE
+    _ensure_all(service, 'outro')
+    assert conn.pools.get.call_count == 0 and conn.access.users.get.call_count == 0
+    conn.pools.post.assert_not_called()
+    conn.access.users.post.assert_not_called()
+
+
+def test_own_delete_and_ttl_invalidate(app, service, monkeypatch):
+    conn = _setup(app, service)
+    clock = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: clock[0])
+
+    service.ensure_user_pool('tiago')
+    service.delete_pool('vps-tiago')
+    service.ensure_user_pool('tiago')
+    assert conn.pools.post.call_count == 2
+    assert conn.pools.get.call_count == 1
+
+    clock[0] += service.existence.ttl + 1
+    service.ensure_user_pool('tiago')
+    assert conn.pools.get.call_count == 2
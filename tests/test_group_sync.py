@@ -0,0 +1,88 @@
+import pytest
+from ldap3 import Server, Connection, MOCK_SYNC
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import User, UserGroup
+from app.services.group_sync import LDAPGroupSync, normalize_filter
+
+BASE = 'ou=users,dc=test'
+
+
+@pytest.fixture
+def directory():
+    conn = Connection(Server('mock'), client_strategy=MOCK_SYNC)
+    conn.strategy.add_entry(BASE, {'objectClass': 'organizationalUnit', 'ou': 'users'})
+
+    def add(uid, kind):
+        conn.strategy.add_entry(f'cn={uid},{BASE}', {
+            'objectClass': 'inetOrgPerson', 'uid': uid, 'cn': uid,
+            'mail': f'{uid}@escola.local', 'employeeType': kind
+        })
+
+    for i in range(25):
+        add(f'aluno{i}', 'aluno')
+    add('prof', 'docente')
+    conn.bind()
+    return conn
+
+
+def _groups():
+    docentes = UserGroup(name='Docentes', ldap_filter='(employeeType=docente)')
+    alunos = UserGroup(name='Alunos', ldap_filter='employeeType=aluno')
+    db.session.add_all([docentes, alunos])
+    db.session.commit()
+    return docentes, alunos
+
+
+def _sync(app, directory, **kwargs):
+    app.config['LDAP_BASE_DN'] = BASE
+    return LDAPGroupSync(connection=directory, page_size=10).run(**kwargs)
+
+
+def test_normalize_filter():
+    assert normalize_filter('memberOf=cn=x') == '(memberOf=cn=x)'
+    assert normalize_filter(' (uid=a) ') == '(uid=a)'
+
+
+def test_sync_creates_shadow_users_and_assigns_groups(app, directory):
+    docentes, alunos = _groups()
+    existing = User(username='aluno0', email='aluno0@escola.local')
+    existing.set_password('x')
+    db.session.add(existing)
+    db.session.commit()
+
+    stats = _sync(app, directory)
+
+    assert stats['entries'] == 26
+    assert stats['created'] == 25 and stats['assigned'] == 1
+    assert User.query.filter_by(group_id=alunos.id).count() == 25
+    assert User.query.filter_by(username='prof').one().group_id == docentes.id
+
+
+def test_sync_prunes_and_uses_constant_statements(app, directory):
+    docentes, alunos = _groups()
+    _sync(app, directory)
+
+    # 'prof' deixa de ser docente no diretório
+    directory.strategy.remove_entry(f'cn=prof,{BASE}')
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        stats = _sync(app, directory)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert stats['removed'] == 1 and stats['created'] == 0 and stats['assigned'] == 0
+    assert User.query.filter_by(username='prof').one().group_id is None
+    # grupos + mapeamento + 1 SELECT de prune por grupo + 1 UPDATE (não cresce com os usuários)
+    assert len(statements) <= 6
+
+
+def test_dry_run_writes_nothing(app, directory):
+    _groups()
+    stats = _sync(app, directory, dry_run=True)
+    assert stats['created'] == 26
+    assert User.query.count() == 0
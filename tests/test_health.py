@@ -0,0 +1,145 @@
+import time
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.extensions import db, proxmox_client
+from app.models import User
+from app.services.health import get_system_health
+from app.services.health.base import HealthCheckProvider, percentile
+from app.services.health.providers.database import DatabaseHealthCheck
+from app.services.health.providers.tasks import TaskQueueHealthCheck
+from app.services.identity import identity_claims
+
+
+class SlowCheck(HealthCheckProvider):
+    def __init__(self, seconds, timeout=None):
+        self.seconds = seconds
+        self.timeout = timeout
+
+    @property
+    def name(self):
+        return f"Lento {self.seconds}s"
+
+    @property
+    def category(self):
+        return "test"
+
+    def check(self):
+        time.sleep(self.seconds)
+        return {'status': 'healthy'}
+
+
+def test_providers_run_concurrently(app):
+    start = time.monotonic()
+    report = get_system_health([SlowCheck(0.3), SlowCheck(0.3), SlowCheck(0.3)])
+    elapsed = time.monotonic() - start
+
+    assert report['status'] == 'healthy'
+    assert elapsed < 0.6  # Serial seria 0.9s
+
+
+def test_timed_out_provider_is_degraded(app):
+    start = time.monotonic()
+    report = get_system_health([SlowCheck(0.05), SlowCheck(2, timeout=0.1)], deadline=1)
+    elapsed = time.monotonic() - start
+
+    fast, slow = report['checks']
+    assert fast['status'] == 'healthy'
+    assert slow['status'] == 'degraded' and 'Sem resposta' in slow['error']
+    assert report['status'] == 'degraded'
+    assert elapsed < 0.5
+
+
+def test_health_endpoint_runs_pve_calls_in_parallel(client, monkeypatch, mock_pve_connection):
+    def slow(value):
+        def call():
+            time.sleep(0.3)
+            return value
+        return call
+
+    mock_pve_connection.nodes.get.side_effect = slow([{'node': 'pve1'}])
+    mock_pve_connection.version.get.side_effect = slow({'version': '8.2'})
+    monkeypatch.setattr(proxmox_client, '_connection', mock_pve_connection)
+
+    start = time.monotonic()
+    data = client.get('/api/health').get_json()
+    elapsed = time.monotonic() - start
+
+    assert data['database'] == 'connected' and data['proxmox'] == 'connected'
+    assert data['details'] == {'nodes_online': 1, 'pve_version': '8.2'}
+    assert elapsed < 0.55
+
+
+def test_health_served_from_snapshot_with_fresh_bypass(app, client, monkeypatch, mock_pve_connection):
+    app.config['HEALTH_CACHE_INTERVAL'] = 60  # Sem refresh em background durante o teste
+    mock_pve_connection.nodes.get.return_value = [{'node': 'pve1'}]
+    mock_pve_connection.version.get.return_value = {'version': '8.2'}
+    monkeypatch.setattr(proxmox_client, '_connection', mock_pve_connection)
+
+    first = client.get('/health').get_json()
+    second = client.get('/api/health').get_json()
+    assert mock_pve_connection.nodes.get.call_count == 1
+    assert first['cached'] is False and second['cached'] is True
+    assert second['checked_at'] == first['checked_at']
+    assert second['stale'] is False and second['age_seconds'] >= 0
+
+    # Anônimo não força verificação ao vivo (rota pública)
+    assert client.get('/health?fresh=1').status_code == 403
+    assert mock_pve_connection.nodes.get.call_count == 1
+
+    admin = User(username='admin', email='admin@nubemox.local', password_hash='x', is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    token = create_access_token(identity=str(admin.id), additional_claims=identity_claims(admin))
+    fresh = client.get('/health?fresh=1', headers={'Authorization': f'Bearer {token}'}).get_json()
+    assert fresh['cached'] is False and fresh['age_seconds'] == 0
+    assert mock_pve_connection.nodes.get.call_count == 2
+    app.extensions['health_snapshot'].stop()
+
+
+def test_run_reports_rolling_percentiles():
+    assert [percentile(list(range(1, 101)), q) for q in (50, 95, 99)] == [50, 95, 99]
+
+    provider = SlowCheck(0)
+    provider.window_size = 3
+    for latency in (10, 20, 30, 40):
+        provider.record_latency(latency)
+    assert provider.latency_percentiles() == {'p50': 30, 'p95': 40, 'p99': 40, 'samples': 3}
+
+    result = provider.run()
+    assert result['latency']['samples'] == 3 and result['latency']['p50'] == 30  # [~0, 30, 40]
+
+
+def test_database_provider_reports_pool_saturation(app, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=2, max_overflow=0)
+    held = engine.connect()
+    try:
+        result = DatabaseHealthCheck(engine).run()
+        assert result['status'] == 'healthy'
+        assert result['details']['pool']['saturation'] == 0.5
+        assert result['details']['checkout_ms'] >= 0
+
+        app.config['HEALTH_DB_POOL_SATURATION_WARN'] = 0.5
+        assert DatabaseHealthCheck(engine).run()['status'] == 'degraded'
+    finally:
+        held.close()
+        engine.dispose()
+
+
+def test_task_queue_provider_counts_running_tasks(app, monkeypatch, mock_pve_connection):
+    mock_pve_connection.cluster.tasks.get.return_value = [
+        {'type': 'vzcreate', 'upid': 'UPID:a'},
+        {'type': 'qmclone', 'upid': 'UPID:b'},
+        {'type': 'vzcreate', 'upid': 'UPID:c', 'endtime': 1700000000, 'status': 'OK'},
+    ]
+    monkeypatch.setattr(proxmox_client, '_connection', mock_pve_connection)
+
+    result = TaskQueueHealthCheck().run()
+    assert result['status'] == 'healthy'
+    assert result['details']['running'] == 2
+    assert result['details']['by_type'] == {'vzcreate': 1, 'qmclone': 1}
+
+    app.config['HEALTH_TASK_QUEUE_WARN'] = 2
+    assert TaskQueueHealthCheck().run()['status'] == 'degraded'
@@ -0,0 +1,116 @@
+from unittest.mock import patch
+
+from flask_jwt_extended import create_access_token, decode_token
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import User, UserGroup, VirtualResource
+from app.services.identity import identity_claims, invalidate_policy
+
+
+def _user(username, is_admin=False, group=None):
+    user = User(username=username, email=f'{username}@nubemox.local', is_admin=is_admin, group=group)
+    user.set_password('x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _headers(user):
+    token = create_access_token(identity=str(user.id), additional_claims=identity_claims(user))
+    return {'Authorization': f'Bearer {token}'}
+
+
+def _count_statements(fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return response, statements
+
+
+def test_login_token_carries_claims(client):
+    user = _user('aluno')
+    with patch('app.api.auth.routes.LDAPService') as MockService:
+        MockService.return_value.authenticate.return_value = None
+        response = client.post('/api/auth/login', json={'username': 'aluno', 'password': 'x'})
+
+    claims = decode_token(response.get_json()['access_token'])
+    assert claims['sub'] == str(user.id)
+    assert claims['adm'] is False and claims['gid'] is None and claims['pv'] == 0
+
+
+def test_authorization_uses_claims_without_user_queries(client):
+    admin = _user('admin', is_admin=True)
+    other = _user('aluno')
+    db.session.add(VirtualResource(proxmox_vmid=200, name='ct', type='lxc', owner_id=other.id))
+    db.session.commit()
+    headers = _headers(admin)
+
+    url = f'/api/provisioning/resources?owner_id={other.id}'
+    client.get(url, headers=headers)  # aquece o cache de versões
+    response, statements = _count_statements(lambda: client.get(url, headers=headers))
+
+    assert response.status_code == 200
+    assert not [s for s in statements if 'FROM user' in s]
+
+
+def test_demoted_admin_loses_access_with_old_token(client):
+    admin = _user('admin', is_admin=True)
+    headers = _headers(admin)
+    assert client.get('/api/admin/users', headers=headers).status_code == 200
+
+    # A mudança pelo ORM sobe a versão e limpa o cache sozinha
+    admin.is_admin = False
+    db.session.commit()
+
+    assert admin.policy_version == 1
+    assert client.get('/api/admin/users', headers=headers).status_code == 403
+
+
+def test_group_change_bumps_policy_version_once(client):
+    alunos, ti = UserGroup(name='Alunos'), UserGroup(name='TI')
+    user = _user('tecnico', group=alunos)
+    assert user.policy_version == 0
+    db.session.add(ti)
+    db.session.commit()
+    headers = _headers(user)
+    assert client.post('/api/catalog/admin/templates', json={}, headers=headers).status_code == 403
+
+    user = db.session.get(User, user.id)
+    user.group = ti
+    user.is_admin = False  # Sem mudança: não conta
+    db.session.commit()
+    assert user.policy_version == 1
+    assert client.post('/api/catalog/admin/templates', json={}, headers=headers).status_code != 403
+
+    user.group_id = None
+    user.is_admin = True
+    db.session.commit()
+    assert user.policy_version == 2
+
+
+def test_group_rename_updates_catalog_access(client):
+    group = UserGroup(name='Suporte')
+    user = _user('tecnico', group=group)
+    admin = _user('admin', is_admin=True)
+    headers = _headers(user)
+    assert client.post('/api/catalog/admin/templates', json={}, headers=headers).status_code == 403
+
+    response = client.put(f'/api/admin/groups/{group.id}', json={'name': 'TI'}, headers=_headers(admin))
+    assert response.status_code == 200
+    assert db.session.get(User, user.id).policy_version == 1
+    assert client.post('/api/catalog/admin/templates', json={}, headers=headers).status_code != 403
+
+
+def test_deleted_user_token_is_revoked(client):
+    user = _user('aluno')
+    headers = _headers(user)
+    db.session.delete(user)
+    db.session.commit()
+    invalidate_policy(user.id)
+
+    assert client.get('/api/provisioning/resources', headers=headers).status_code == 401
@@ -0,0 +1,139 @@
+import pytest
+from ldap3 import MOCK_SYNC, Connection
+
+from app.services.health.providers.ldap import LDAPHealthCheck
+from app.services.ldap_service import LDAPConnectionPool, LDAPServerSet, LDAPService, parse_ldap_servers
+
+USER_DN = 'cn=tiago,ou=users,dc=test'
+
+
+def _mock_pool(url='ldap://mock'):
+    pool = LDAPConnectionPool(url, size=2, client_strategy=MOCK_SYNC)
+    Connection(pool.server, client_strategy=MOCK_SYNC).strategy.add_entry(USER_DN, {
+        'objectClass': 'inetOrgPerson', 'cn': 'Tiago Silva', 'uid': 'tiago',
+        'mail': 'tiago@nubemox.local', 'userPassword': '123456'
+    })
+    return pool
+
+
+def _dead_pool():
+    # Porta 1 no loopback: conexão recusada na hora
+    return LDAPConnectionPool('ldap://127.0.0.1:1', size=2, connect_timeout=0.5)
+
+
+@pytest.fixture
+def pool():
+    pool = _mock_pool()
+    yield pool
+    pool.close()
+
+
+def test_authenticate_reuses_pooled_connection(app_context, pool):
+    service = LDAPService(pool=pool)
+
+    first = service.authenticate('tiago', '123456')
+    conn, _ = pool._idle.queue[0]
+    second = service.authenticate('tiago', '123456')
+
+    assert first == {'username': 'tiago', 'email': 'tiago@nubemox.local', 'fullname': 'Tiago Silva'}
+    assert second == first
+    # Uma única conexão aberta, reaproveitada via rebind
+    assert pool._idle.qsize() == 1
+    assert pool._idle.queue[0][0] is conn
+
+
+def test_invalid_password_keeps_connection_in_pool(app_context, pool):
+    service = LDAPService(pool=pool)
+
+    assert service.authenticate('tiago', 'errada') is None
+    assert pool._idle.qsize() == 1
+    assert service.authenticate('tiago', '123456')['username'] == 'tiago'
+
+
+def test_empty_password_never_binds(app_context, pool, mocker):
+    spy = mocker.spy(pool, 'check_credentials')
+    assert LDAPService(pool=pool).authenticate('tiago', '') is None
+    spy.assert_not_called()
+
+
+def test_parse_ldap_servers():
+    assert parse_ldap_servers('ldap://a:389, ldaps://b:636|1.5,', 3) == [
+        ('ldap://a:389', 3), ('ldaps://b:636', 1.5)
+    ]
+
+
+def test_failover_skips_unreachable_server(app_context, mocker):
+    dead, alive = _dead_pool(), _mock_pool('ldap://replica')
+    servers = LDAPServerSet([dead, alive], cooldown=60)
+    spy = mocker.spy(dead, 'check_credentials')
+    service = LDAPService(pool=servers)
+
+    assert service.authenticate('tiago', '123456')['username'] == 'tiago'
+    assert service.authenticate('tiago', '123456')['username'] == 'tiago'
+    assert service.last_error is None
+    # O servidor fora do ar só custou o primeiro login
+    assert spy.call_count == 1
+    assert [s['healthy'] for s in servers.status()] == [False, True]
+
+
+def test_round_robin_alternates_replicas(app_context, mocker):
+    first, second = _mock_pool('ldap://a'), _mock_pool('ldap://b')
+    servers = LDAPServerSet([first, second], strategy='round_robin')
+    spies = [mocker.spy(first, 'check_credentials'), mocker.spy(second, 'check_credentials')]
+
+    for _ in range(4):
+        assert LDAPService(pool=servers).authenticate('tiago', '123456')
+
+    assert [spy.call_count for spy in spies] == [2, 2]
+
+
+def test_all_servers_down_falls_back_quickly(app_context):
+    servers = LDAPServerSet([_dead_pool()], cooldown=60)
+    service = LDAPService(pool=servers)
+
+    assert service.authenticate('tiago', '123456') is None
+    assert service.last_error
+    # Em cooldown: nem tenta conectar
+    assert service.authenticate('tiago', '123456') is None
+    assert 'cooldown' in service.last_error
+
+
+def test_probe_restores_server_and_health_reports_degraded():
+    alive, dead = _mock_pool('ldap://a'), _dead_pool()
+    servers = LDAPServerSet([alive, dead], cooldown=60)
+    servers.mark_down(alive, 'timeout')
+
+    result = LDAPHealthCheck(servers=servers).run()
+
+    assert result['status'] == 'degraded'
+    assert [s['healthy'] for s in result['details']['servers']] == [True, False]
+    assert servers.candidates() == [alive]
+
+
+def test_health_reports_login_bind_latency(app_context):
+    servers = LDAPServerSet([_mock_pool()])
+    assert LDAPHealthCheck(servers=servers).run()['details']['bind_latency_ms']['samples'] == 0
+
+    LDAPService(pool=servers).authenticate('tiago', '123456')
+    LDAPService(pool=servers).authenticate('tiago', 'errada')
+
+    latency = LDAPHealthCheck(servers=servers).run()['details']['bind_latency_ms']
+    assert latency['samples'] == 2 and latency['p50'] >= 0
+    servers.close()
+
+
+def test_locked_account_is_a_login_failure_not_a_dead_server(app_context, mocker):
+    first, second = _mock_pool('ldap://a'), _mock_pool('ldap://b')
+    servers = LDAPServerSet([first, second], cooldown=60)
+    # Conta bloqueada pela política de senha: o servidor responde 53 (unwillingToPerform)
+    locked = mocker.MagicMock(closed=False, result={'result': 53, 'description': 'unwillingToPerform',
+                                                    'message': 'account locked'})
+    locked.rebind.return_value = False
+    mocker.patch.object(first, '_take', return_value=(locked, False))
+    service = LDAPService(pool=servers)
+
+    assert service.authenticate('bloqueado', '123456') is None
+    assert service.last_error is None
+    # Nenhuma réplica saiu da seleção: os outros usuários continuam entrando
+    assert [s['healthy'] for s in servers.status()] == [True, True]
+    assert servers.candidates() == [first, second]
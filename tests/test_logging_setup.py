@@ -0,0 +1,58 @@
+import json
+import logging
+
+import pytest
+
+from app.logging_setup import JSONFormatter, install_logging, parse_levels, shutdown_logging
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(JSONFormatter())
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(self.format(record)))
+
+
+@pytest.fixture
+def captured():
+    root = logging.getLogger()
+    previous = root.level, logging.getLogger('app.quiet').level
+    handler = ListHandler()
+    install_logging({'LOG_LEVEL': 'INFO', 'LOG_LEVELS': 'app.quiet=ERROR'}, handlers=[handler])
+    yield handler
+    shutdown_logging()
+    root.setLevel(previous[0])
+    logging.getLogger('app.quiet').setLevel(previous[1])
+
+
+def test_records_carry_request_and_trace_ids(app, captured):
+    with app.test_request_context('/api/health', headers={'X-Request-Id': 'req-123'}):
+        app.preprocess_request()
+        logging.getLogger('app.api').warning('lento: %s', 'scan', extra={'vmid': 101})
+        try:
+            raise RuntimeError('boom')
+        except RuntimeError:
+            logging.getLogger('app.api').exception('falhou')
+    logging.getLogger('app.quiet').warning('filtrado pelo nível do módulo')
+    shutdown_logging()  # Esvazia a fila
+
+    first, second = captured.lines
+    assert first['message'] == 'lento: scan' and first['level'] == 'WARNING'
+    assert first['request_id'] == 'req-123' and first['http_path'] == '/api/health'
+    assert first['vmid'] == 101
+    assert 'RuntimeError: boom' in second['exception'] and second['message'] == 'falhou'
+
+
+def test_request_id_is_returned(client):
+    generated = client.get('/').headers['X-Request-Id']
+    assert len(generated) == 32
+    assert client.get('/', headers={'X-Request-Id': 'abc'}).headers['X-Request-Id'] == 'abc'
+
+
+def test_parse_levels():
+    assert parse_levels('app.x=debug, proxmoxer=WARNING,,') == {'app.x': 'DEBUG', 'proxmoxer': 'WARNING'}
+    with pytest.raises(ValueError):
+        parse_levels('app.x=verbose')
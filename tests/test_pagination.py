@@ -0,0 +1,150 @@
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.models import User, ServiceTemplate, VirtualResource
+
+
+def _auth_header(user):
+    token = create_access_token(identity=str(user.id))
+    return {'Authorization': f'Bearer {token}'}
+
+
+def _make_user(username, is_admin=False):
+    user = User(username=username, email=f'{username}@nubemox.local', is_admin=is_admin)
+    user.set_password('x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_admin_users_keyset_pagination(client, app_context):
+    admin = _make_user('admin', is_admin=True)
+    for i in range(4):
+        _make_user(f'aluno{i}')
+
+    headers = _auth_header(admin)
+    first = client.get('/api/admin/users?limit=2&fields=id,username', headers=headers)
+    assert first.status_code == 200
+    assert [u['username'] for u in first.get_json()] == ['admin', 'aluno0']
+    assert set(first.get_json()[0].keys()) == {'id', 'username'}
+
+    cursor = first.headers['X-Next-Cursor']
+    second = client.get(f'/api/admin/users?limit=2&cursor={cursor}&fields=username', headers=headers)
+    assert [u['username'] for u in second.get_json()] == ['aluno1', 'aluno2']
+
+    last = client.get(f"/api/admin/users?limit=2&cursor={second.headers['X-Next-Cursor']}", headers=headers)
+    assert [u['username'] for u in last.get_json()] == ['aluno3']
+    assert 'X-Next-Cursor' not in last.headers
+
+
+def test_admin_users_usage_is_aggregated(client, app_context):
+    admin = _make_user('admin', is_admin=True)
+    aluno = _make_user('aluno')
+    db.session.add_all([
+        VirtualResource(proxmox_vmid=101, name='a', type='lxc', owner_id=aluno.id, cpu_cores=1, memory_mb=512, storage_gb=8),
+        VirtualResource(proxmox_vmid=102, name='b', type='lxc', owner_id=aluno.id, cpu_cores=2, memory_mb=1024, storage_gb=8),
+    ])
+    db.session.commit()
+
+    response = client.get('/api/admin/users?q=alu&fields=username,usage', headers=_auth_header(admin))
+    data = response.get_json()
+    assert data == [{'username': 'aluno', 'usage': {'cpu': 3, 'memory': 1536, 'storage': 16, 'count': 2}}]
+
+
+def test_admin_users_query_count_does_not_grow_with_users(client, app_context):
+    from sqlalchemy import event
+    from app.models import UserGroup
+
+    admin = _make_user('admin', is_admin=True)
+    group = UserGroup(name='Alunos', max_cpu=4, max_memory=4096, max_storage=40)
+    db.session.add(group)
+    db.session.commit()
+    headers, group_id = _auth_header(admin), group.id
+
+    def statements():
+        db.session.expunge_all()  # Mesma sessão do teste: começa sem nada no identity map
+        seen = []
+        listener = lambda *args: seen.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            data = client.get('/api/admin/users', headers=headers).get_json()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return data, len(seen)
+
+    for i in range(3):
+        user = _make_user(f'aluno{i}')
+        user.group_id = group_id if i else None
+    db.session.commit()
+    statements()  # Aquece o cache de políticas do admin
+    _, few = statements()
+
+    for i in range(3, 13):
+        user = _make_user(f'aluno{i}')
+        user.group_id = group_id if i % 2 else None
+        user.quota_cpu_override = 8 if i == 3 else None
+    db.session.commit()
+    data, many = statements()
+
+    assert many == few
+    limits = {u['username']: u['limits'] for u in data}
+    assert limits['aluno3']['cpu'] == 8 and limits['aluno5']['cpu'] == 4
+    assert limits['aluno4'] == {'cpu': 2, 'memory': 2048, 'storage': 20}
+
+
+def test_unknown_field_is_rejected(client, app_context):
+    admin = _make_user('admin', is_admin=True)
+    response = client.get('/api/admin/users?fields=password_hash', headers=_auth_header(admin))
+    assert response.status_code == 400
+
+
+def test_catalog_filters_by_type(client, app_context):
+    user = _make_user('aluno')
+    db.session.add_all([
+        ServiceTemplate(name='Debian', type='lxc', proxmox_template_volid='local:vztmpl/debian.tar.zst', is_active=True),
+        ServiceTemplate(name='Ubuntu', type='qemu', proxmox_template_volid='9000', is_active=True),
+        ServiceTemplate(name='Alpine', type='lxc', proxmox_template_volid='local:vztmpl/alpine.tar.zst', is_active=False),
+    ])
+    db.session.commit()
+
+    response = client.get('/api/catalog/templates?type=lxc&fields=name', headers=_auth_header(user))
+    assert response.get_json() == [{'name': 'Debian'}]
+
+
+def test_resources_owner_filter_requires_admin(client, app_context, mocker):
+    mocker.patch('app.api.provisioning.routes.proxmox_client._resolve_node_id', side_effect=Exception('offline'))
+    aluno = _make_user('aluno')
+    outro = _make_user('outro')
+    db.session.add(VirtualResource(proxmox_vmid=200, name='ct', type='lxc', owner_id=outro.id, status='running'))
+    db.session.commit()
+
+    denied = client.get(f'/api/provisioning/resources?owner={outro.id}', headers=_auth_header(aluno))
+    assert denied.status_code == 403
+
+    own = client.get('/api/provisioning/resources?status=running', headers=_auth_header(aluno))
+    assert own.status_code == 200
+    assert own.get_json() == []
+
+
+def test_without_limit_returns_everything(client, app_context):
+    admin = _make_user('admin', is_admin=True)
+    for i in range(5):
+        _make_user(f'aluno{i}')
+    client.application.config['API_MAX_PAGE_SIZE'] = 2
+
+    response = client.get('/api/admin/users?fields=username', headers=_auth_header(admin))
+    assert len(response.get_json()) == 6
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_resources_status_filter_uses_synced_status(client, app_context, mocker):
+    pve = mocker.patch('app.api.provisioning.routes.proxmox_client')
+    pve._resolve_node_id.return_value = 'pve1'
+    pve.connection.nodes.return_value.lxc.return_value.status.current.get.return_value = {'status': 'stopped'}
+    aluno = _make_user('aluno')
+    db.session.add(VirtualResource(proxmox_vmid=300, name='ct', type='lxc', owner_id=aluno.id, status='running'))
+    db.session.commit()
+
+    running = client.get('/api/provisioning/resources?status=running', headers=_auth_header(aluno))
+    assert running.get_json() == []
+    stopped = client.get('/api/provisioning/resources?status=stopped&fields=vmid,status', headers=_auth_header(aluno))
+    assert stopped.get_json() == [{'vmid': 300, 'status': 'stopped'}]
@@ -0,0 +1,66 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.extensions import db
+from app.models import User
+from app.services.passwords import DIRECTORY_MANAGED, PasswordPolicy, parse_hash
+
+# Custos baixos só para o teste ficar rápido
+LOW_COST = {'scrypt': 1024, 'pbkdf2': 1000, 'bcrypt': 4}
+
+
+@pytest.mark.parametrize('scheme', sorted(LOW_COST))
+def test_schemes_round_trip_and_detect_rehash(scheme):
+    policy = PasswordPolicy(scheme, LOW_COST[scheme])
+    stored = policy.hash('segredo')
+
+    assert parse_hash(stored) == (scheme, LOW_COST[scheme])
+    assert policy.verify(stored, 'segredo') and not policy.verify(stored, 'outra')
+    assert not policy.needs_rehash(stored)
+    assert PasswordPolicy(scheme, LOW_COST[scheme] * 2).needs_rehash(stored)
+
+
+def test_directory_managed_accounts_never_verify(app):
+    user = User(username='aluno', email='aluno@nubemox.local')
+    user.set_directory_managed()
+
+    assert user.password_hash == DIRECTORY_MANAGED
+    assert not user.check_password(DIRECTORY_MANAGED)
+    assert not user.password_needs_rehash()
+
+    # Hash antigo da senha-marcador dos shadow users: continua sem valer
+    user.password_hash = PasswordPolicy('pbkdf2', 1000).hash('ldap-managed-account')
+    assert not user.check_password('ldap-managed-account')
+
+
+def _login(client, username, password):
+    with patch('app.api.auth.routes.LDAPService') as MockService:
+        MockService.return_value.authenticate.return_value = None
+        MockService.return_value.last_error = None
+        return client.post('/api/auth/login', json={'username': username, 'password': password})
+
+
+def test_login_rehashes_when_policy_changes(app, client):
+    app.config.update(PASSWORD_HASH_SCHEME='pbkdf2', PASSWORD_HASH_COST=1000)
+    user = User(username='admin', email='admin@nubemox.local')
+    user.set_password('admin123')
+    db.session.add(user)
+    db.session.commit()
+
+    app.config.update(PASSWORD_HASH_SCHEME='bcrypt', PASSWORD_HASH_COST=4)
+    assert _login(client, 'admin', 'errada').status_code == 401
+    assert parse_hash(db.session.get(User, user.id).password_hash) == ('pbkdf2', 1000)
+
+    assert _login(client, 'admin', 'admin123').status_code == 200
+    assert parse_hash(db.session.get(User, user.id).password_hash) == ('bcrypt', 4)
+    assert _login(client, 'admin', 'admin123').status_code == 200
+
+
+def test_ldap_shadow_user_has_no_local_password(client):
+    with patch('app.api.auth.routes.LDAPService') as MockService:
+        MockService.return_value.authenticate.return_value = {'username': 'aluno', 'email': 'aluno@escola.local'}
+        MockService.return_value.last_error = None
+        assert client.post('/api/auth/login', json={'username': 'aluno', 'password': 'x'}).status_code == 200
+
+    assert User.query.filter_by(username='aluno').one().is_directory_managed
@@ -0,0 +1,131 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from ldap3 import Server, Connection, MOCK_SYNC
+
+from app.extensions import db
+from app.models import User, UserGroup
+from app.services.preprovision import PreProvisioner
+
+BASE = 'ou=users,dc=test'
+
+
+@pytest.fixture
+def alunos(app):
+    group = UserGroup(name='Alunos')
+    db.session.add(group)
+    for i in range(3):
+        db.session.add(User(username=f'aluno{i}', email=f'aluno{i}@escola.local',
+                            password_hash='x', group=group))
+    db.session.commit()
+    return group
+
+
+@pytest.fixture
+def pve(app, service):
+    conn = service.connection
+    realm = app.config['PROXMOX_AUTH_REALM']
+    # aluno0 já está completo; aluno1 só tem o pool
+    conn.pools.get.return_value = [{'poolid': 'vps-aluno0'}, {'poolid': 'vps-aluno1'}]
+    conn.access.users.get.return_value = [{'userid': f'aluno0@{realm}'}, {'userid': 'root@pam'}]
+    conn.access.acl.get.return_value = [
+        {'path': '/pool/vps-aluno0', 'ugid': f'aluno0@{realm}', 'roleid': 'PVEVMUser', 'type': 'user'}
+    ]
+    return service
+
+
+def test_diff_against_single_listing_creates_only_missing(alunos, pve):
+    stats = PreProvisioner(pve, workers=2, batch_size=2).run(group=alunos)
+
+    conn = pve.connection
+    assert stats['users'] == 3 and stats['shadow_created'] == 0
+    assert (stats['pools_created'], stats['pve_users_created'], stats['acls_created']) == (1, 2, 2)
+    assert conn.pools.get.call_count == 1 and conn.access.users.get.call_count == 1
+    assert conn.pools.post.call_count == 1
+    assert conn.access.users.post.call_count == 2
+    assert conn.access.acl.put.call_count == 2
+    assert stats['errors'] == []
+
+
+def test_ldap_filter_creates_shadow_users_and_dry_run_writes_nothing(app, alunos, pve):
+    directory = Connection(Server('mock'), client_strategy=MOCK_SYNC)
+    for uid in ('aluno0', 'novato'):
+        directory.strategy.add_entry(f'cn={uid},{BASE}', {
+            'objectClass': 'inetOrgPerson', 'uid': uid, 'cn': uid, 'mail': f'{uid}@escola.local'
+        })
+    directory.bind()
+    app.config['LDAP_BASE_DN'] = BASE
+    provisioner = PreProvisioner(pve, directory=directory)
+
+    dry = provisioner.run(ldap_filter='(objectClass=inetOrgPerson)', dry_run=True)
+    assert dry['users'] == 2 and dry['shadow_created'] == 1
+    assert User.query.filter_by(username='novato').first() is None
+    pve.connection.pools.post.assert_not_called()
+
+    stats = provisioner.run(ldap_filter='(objectClass=inetOrgPerson)')
+    assert stats['shadow_created'] == 1
+    assert User.query.filter_by(username='novato').one().group_id is None
+    assert stats['pools_created'] == 1
+
+
+def test_endpoint_requires_target(client, alunos):
+    admin = User(username='admin', email='admin@nubemox.local', password_hash='x', is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(admin.id))}'}
+
+    assert client.post('/api/admin/preprovision', json={}, headers=headers).status_code == 400
+    assert client.post('/api/admin/preprovision', json={'group_id': 999}, headers=headers).status_code == 404
+
+
+def test_endpoint_runs_in_background_job(app, client, alunos, pve, monkeypatch):
+    from app.services.preprovision import get_preprovision_jobs
+
+    monkeypatch.setattr('app.api.admin.routes.proxmox_client', pve)
+    admin = User(username='admin', email='admin@nubemox.local', password_hash='x', is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(admin.id))}'}
+
+    started = client.post('/api/admin/preprovision', json={'group_id': alunos.id}, headers=headers)
+    assert started.status_code == 202 and started.get_json()['status'] == 'running'
+    job_id = started.get_json()['id']
+    assert get_preprovision_jobs(app).wait(job_id, timeout=5)['status'] == 'done'
+
+    job = client.get(f'/api/admin/preprovision/{job_id}', headers=headers).get_json()
+    assert job['stats']['pools_created'] == 1 and job['finished_at'] is not None
+    assert client.get('/api/admin/preprovision/999', headers=headers).status_code == 404
+
+
+def test_failed_job_reports_error(app, client, alunos, pve, monkeypatch):
+    from app.services.preprovision import get_preprovision_jobs
+
+    monkeypatch.setattr('app.api.admin.routes.proxmox_client', pve)
+    pve.connection.pools.get.side_effect = RuntimeError('PVE fora do ar')
+    admin = User(username='admin', email='admin@nubemox.local', password_hash='x', is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(admin.id))}'}
+
+    job_id = client.post('/api/admin/preprovision', json={'group_id': alunos.id}, headers=headers).get_json()['id']
+    job = get_preprovision_jobs(app).wait(job_id, timeout=5)
+    assert job['status'] == 'failed' and 'PVE fora do ar' in job['error']
+
+
+def test_one_job_at_a_time(app, client, alunos, pve, monkeypatch):
+    import threading
+    from app.services.preprovision import get_preprovision_jobs
+
+    monkeypatch.setattr('app.api.admin.routes.proxmox_client', pve)
+    release = threading.Event()
+    listing = pve.connection.pools.get.return_value
+    pve.connection.pools.get.side_effect = lambda *a, **k: release.wait(5) and listing
+    admin = User(username='admin', email='admin@nubemox.local', password_hash='x', is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(admin.id))}'}
+
+    job_id = client.post('/api/admin/preprovision', json={'group_id': alunos.id}, headers=headers).get_json()['id']
+    busy = client.post('/api/admin/preprovision', json={'group_id': alunos.id}, headers=headers)
+    assert busy.status_code == 409 and busy.get_json()['job']['id'] == job_id
+    release.set()
+    assert get_preprovision_jobs(app).wait(job_id, timeout=5)['status'] == 'done'
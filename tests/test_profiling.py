@@ -0,0 +1,93 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import User
+from app.services.identity import identity_claims
+
+
+@pytest.fixture
+def profiled_app():
+    class ProfilingConfig(TestingConfig):
+        PROFILING_ENABLED = True
+
+    app = create_app(ProfilingConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _headers(username, is_admin):
+    user = User(username=username, email=f'{username}@nubemox.local', password_hash='x', is_admin=is_admin)
+    db.session.add(user)
+    db.session.commit()
+    token = create_access_token(identity=str(user.id), additional_claims=identity_claims(user))
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_admin_header_profiles_request_and_lists_slowest(profiled_app):
+    client = profiled_app.test_client()
+    admin = _headers('admin', True)
+
+    response = client.get('/api/admin/users', headers={**admin, 'X-Profile': '1'})
+    assert response.status_code == 200
+    profile_id = int(response.headers['X-Profile-Id'])
+
+    listing = client.get('/api/admin/profiles', headers=admin).get_json()
+    assert listing['sampling'] is True and listing['skipped'] == 0
+    summary = listing['profiles'][0]
+    assert summary['id'] == profile_id and summary['route'] == '/api/admin/users'
+    assert summary['status'] == 200 and summary['duration_ms'] > 0
+    assert summary['user_id'] is not None and 'functions' not in summary
+
+    detail = client.get(f'/api/admin/profiles/{profile_id}', headers=admin).get_json()
+    assert detail['functions'] and {'function', 'calls', 'cumtime_ms'} <= set(detail['functions'][0])
+    assert client.get('/api/admin/profiles/999', headers=admin).status_code == 404
+
+
+def test_header_ignored_for_non_admin(profiled_app):
+    client = profiled_app.test_client()
+    aluno = _headers('aluno', False)
+
+    response = client.get('/', headers={**aluno, 'X-Profile': '1'})
+    assert 'X-Profile-Id' not in response.headers
+    assert len(profiled_app.extensions['profiler'].slowest()) == 0
+
+
+def test_admin_header_works_without_restart(app, client):
+    # PROFILING_ENABLED=False só desliga a amostragem; o header de admin vale em runtime
+    admin = _headers('admin', True)
+    response = client.get('/api/admin/users', headers={**admin, 'X-Profile': '1'})
+    assert 'X-Profile-Id' in response.headers
+    assert 'X-Profile-Id' not in client.get('/api/admin/users', headers=admin).headers
+
+
+def test_sampling_toggled_at_runtime(app, client):
+    admin = _headers('admin', True)
+    assert 'X-Profile-Id' not in client.get('/').headers
+
+    assert client.put('/api/admin/profiles/settings', json={'sample_rate': 2}, headers=admin).status_code == 400
+    settings = client.put('/api/admin/profiles/settings', json={'sampling': True, 'sample_rate': 1},
+                          headers=admin).get_json()
+    assert settings == {'sampling': True, 'sample_rate': 1.0, 'skipped': 0}
+    assert 'X-Profile-Id' in client.get('/').headers
+
+    aluno = _headers('aluno', False)
+    assert client.put('/api/admin/profiles/settings', json={'sampling': False}, headers=aluno).status_code == 403
+
+
+def test_one_profile_at_a_time(app, client):
+    from app.profiling import _profiler_lock
+
+    admin = _headers('admin', True)
+    # Outra requisição perfilando: esta segue sem perfil em vez de estourar 500
+    with _profiler_lock:
+        response = client.get('/api/admin/users', headers={**admin, 'X-Profile': '1'})
+    assert response.status_code == 200 and 'X-Profile-Id' not in response.headers
+    assert app.extensions['profiler'].skipped == 1
+
+    assert 'X-Profile-Id' in client.get('/api/admin/users', headers={**admin, 'X-Profile': '1'}).headers
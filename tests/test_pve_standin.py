@@ -0,0 +1,52 @@
+import pytest
+
+from app.proxmox.client import ProxmoxTaskFailedError
+
+
+def test_deploy_flow_against_standin(pve_service, pve):
+    realm = pve_service.config['PROXMOX_AUTH_REALM']
+    poolid = pve_service.ensure_user_pool('tiago')
+    userid = pve_service.ensure_pve_user('tiago')
+    pve_service.set_pool_permission(poolid, userid, pve_service.config['PROXMOX_POOL_ROLE'])
+
+    vmid = pve_service.get_next_vmid()
+    pve_service.clone_container(source_vmid=9000, new_vmid=vmid, name='web01', poolid=poolid)
+    pve_service.start_container(vmid)
+
+    status = pve_service.get_container_status(vmid)['data']
+    assert status['status'] == 'running' and status['name'] == 'web01'
+    assert pve.pools[poolid]['members'] == {vmid}
+    assert (f'/pool/{poolid}', f'tiago@{realm}', pve_service.config['PROXMOX_POOL_ROLE']) in pve.acls
+    assert pve_service.get_next_vmid() == vmid + 1
+
+    # Toda tarefa passou pelo status com UPID do PVE
+    assert pve.stats['GET /nodes/{node}/tasks/{upid}/status'] == 2
+    assert all(upid.startswith('UPID:pve1:') for upid in pve.tasks)
+
+
+def test_create_from_file_template(pve_service, pve):
+    vmid = pve_service.get_next_vmid()
+    pve_service.create_container({
+        'vmid': vmid, 'template': 'local:vztmpl/debian-12-standard_12.2-1_amd64.tar.zst',
+        'name': 'db01', 'memory': 1024, 'cores': 2, 'disk_size': 16,
+    })
+    config = pve_service.get_container_config(vmid)['data']
+    assert config['hostname'] == 'db01' and config['rootfs'].endswith('size=16G')
+
+    pve_service.resize_disk(vmid, 20)
+    assert pve.guests[vmid]['config']['rootfs'].endswith('size=20G')
+
+
+def test_failure_injection(pve_service, pve):
+    pve.fail(r'^/cluster/nextid$', times=1, message='cluster not ready')
+    with pytest.raises(Exception, match='cluster not ready'):
+        pve_service.get_next_vmid()
+    assert isinstance(pve_service.get_next_vmid(), int)
+
+    vmid = pve_service.get_next_vmid()
+    pve.fail_task('vzclone', 'clone failed: storage full')
+    with pytest.raises(ProxmoxTaskFailedError, match='storage full'):
+        pve_service.clone_container(source_vmid=9000, new_vmid=vmid, name='web02')
+    # Tarefa com erro não deixa o guest nem reserva o vmid
+    assert vmid not in pve.guests
+    assert pve_service.get_next_vmid() == vmid
@@ -0,0 +1,35 @@
+from collections import Counter
+
+from app.extensions import db
+from app.models import ServiceTemplate, User, UserGroup, VirtualResource
+from app.services.seed_scale import ScaleSeeder
+from benchmarks.pve_standin import PVEStandIn
+
+
+def test_seed_scale_counts_and_distributions(app):
+    stats = ScaleSeeder(prefix='t', batch_size=300).run(groups=5, users=1000, templates=20, resources=2000)
+    assert stats == {'groups': 5, 'users': 1000, 'templates': 20, 'resources': 2000}
+    assert UserGroup.query.filter(UserGroup.name.startswith('t-')).count() == 5
+
+    users = User.query.filter(User.username.startswith('t-')).all()
+    assert sum(1 for u in users if u.group_id is not None) > 800
+    # Cauda longa: o dono mais carregado tem muito mais que a média (2 por usuário)
+    owners = Counter(r.owner_id for r in VirtualResource.query.all())
+    assert max(owners.values()) > 20 and len(owners) < len(users)
+    assert {r.type for r in ServiceTemplate.query.all()} == {'lxc', 'qemu'}
+
+    # Segunda rodada com outro prefixo não colide (vmids continuam depois dos existentes)
+    ScaleSeeder(prefix='u').run(groups=1, users=10, templates=2, resources=10)
+    vmids = [vmid for (vmid,) in db.session.query(VirtualResource.proxmox_vmid)]
+    assert len(vmids) == len(set(vmids)) == 2010
+
+
+def test_seed_scale_populates_pve_standin(app):
+    seeder = ScaleSeeder(prefix='p')
+    seeder.run(groups=2, users=20, templates=10, resources=50, pve=True)
+    with PVEStandIn(seed=False) as pve:
+        assert seeder.populate_pve(pve.url, batch_size=20)['guests'] == len(seeder.guests)
+        for resource in VirtualResource.query.all():
+            guest = pve.guests[resource.proxmox_vmid]
+            assert resource.proxmox_vmid in pve.pools[f'vps-{resource.owner.username}']['members']
+            assert (guest['status'] == 'running') == (resource.status == 'running')
@@ -0,0 +1,81 @@
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app.extensions import db
+from app.models import User, ServiceTemplate
+
+
+def _admin_headers():
+    admin = User(username='admin', email='admin@nubemox.local', is_admin=True)
+    admin.set_password('x')
+    db.session.add(admin)
+    db.session.commit()
+    return {'Authorization': f'Bearer {create_access_token(identity=str(admin.id))}'}
+
+
+def _candidates(n):
+    return [
+        {'volid': f'local:iso/img-{i}.iso', 'name': f'img-{i}', 'type': 'qemu', 'origin': 'file', 'detected_size_gb': 2}
+        for i in range(n)
+    ]
+
+
+def test_import_uses_constant_number_of_statements(client, app_context):
+    headers = _admin_headers()
+    db.session.add(ServiceTemplate(name='já existe', type='qemu', proxmox_template_volid='local:iso/img-0.iso'))
+    db.session.commit()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = client.post('/api/admin/templates/import', json={'templates': _candidates(200)}, headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert response.status_code == 200
+    assert response.get_json()['created'] == 199
+    # Permissão + IN de existência + INSERT em lote (o número não cresce com os itens)
+    assert len(statements) <= 4
+    assert ServiceTemplate.query.count() == 200
+
+
+def test_import_upsert_updates_existing(client, app_context):
+    headers = _admin_headers()
+    tmpl = ServiceTemplate(name='Curado', type='lxc', proxmox_template_volid='101', deploy_mode='file', default_storage=4)
+    db.session.add(tmpl)
+    db.session.commit()
+
+    payload = {'mode': 'upsert', 'templates': [
+        {'volid': '101', 'name': 'nome-do-pve', 'type': 'lxc', 'origin': 'vm', 'detected_size_gb': 10},
+        {'volid': '101', 'name': 'nome-do-pve', 'type': 'lxc', 'origin': 'vm', 'detected_size_gb': 12},
+    ]}
+    data = client.post('/api/admin/templates/import', json=payload, headers=headers).get_json()
+
+    assert data['created'] == 0 and data['updated'] == 1
+    db.session.refresh(tmpl)
+    assert tmpl.name == 'Curado'
+    assert tmpl.deploy_mode == 'clone'
+    assert tmpl.default_storage == 12
+
+
+def test_import_rejects_incomplete_items(client, app_context):
+    headers = _admin_headers()
+    response = client.post('/api/admin/templates/import', json={'templates': [{'volid': 'x'}]}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_import_coerces_detected_size(client, app_context):
+    headers = _admin_headers()
+    db.session.add(ServiceTemplate(name='Curado', type='lxc', proxmox_template_volid='101', deploy_mode='clone', default_storage=4))
+    db.session.commit()
+    payload = {'mode': 'upsert', 'templates': [
+        {'volid': '101', 'name': 'ct', 'type': 'lxc', 'origin': 'vm', 'detected_size_gb': None},
+        {'volid': 'local:iso/a.iso', 'name': 'a', 'type': 'qemu', 'detected_size_gb': '8'},
+    ]}
+    response = client.post('/api/admin/templates/import', json=payload, headers=headers)
+    assert response.status_code == 200
+    assert ServiceTemplate.query.filter_by(proxmox_template_volid='101').one().default_storage == 4
+    assert ServiceTemplate.query.filter_by(proxmox_template_volid='local:iso/a.iso').one().default_storage == 8
+
+    bad = {'templates': [{'volid': 'local:iso/b.iso', 'name': 'b', 'type': 'qemu', 'detected_size_gb': 'muito'}]}
+    assert client.post('/api/admin/templates/import', json=bad, headers=headers).status_code == 400
@@ -0,0 +1,120 @@
+import time
+
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.models import ServiceTemplate, User
+from app.services.identity import identity_claims
+from app.services.template_scan import TemplateScanner
+
+
+# Dois nós; 'nfs' compartilhado (mesmos arquivos nos dois), 'isos' só no pve2
+PVE_LAYOUT = {
+    'nodes': ('pve1', 'pve2'),
+    'storages': [
+        {'storage': 'nfs', 'type': 'nfs', 'content': 'vztmpl,backup', 'shared': 1},
+        {'storage': 'isos', 'type': 'dir', 'content': 'iso'},
+    ],
+    'volumes': [
+        {'storage': 'nfs', 'volid': 'nfs:vztmpl/rocky-9-default_20240101_amd64.tar.xz', 'content': 'vztmpl'},
+        {'storage': 'isos', 'volid': 'isos:iso/windows-2022.iso', 'content': 'iso', 'node': 'pve2'},
+    ],
+    'guests': [
+        {'vmid': 9100, 'type': 'qemu', 'node': 'pve2', 'name': 'tpl-win', 'template': True},
+    ],
+}
+
+
+def test_scan_covers_what_the_deploy_node_reaches(pve_service, pve):
+    result = TemplateScanner(pve_service).scan()
+    by_volid = {c['volid']: c for c in result['candidates']}
+
+    # O deploy roda no pve1: a ISO do 'isos' do pve2 e o template 9100 (pve2) ficam de fora
+    assert result['node'] == 'pve1'
+    assert set(by_volid) == {
+        'local:vztmpl/debian-12-standard_12.2-1_amd64.tar.zst',
+        'local:vztmpl/ubuntu-22.04-standard_22.04-1_amd64.tar.zst',
+        'local:vztmpl/alpine-3.19-default_20240207_amd64.tar.xz',
+        'local:iso/debian-12.5.0-amd64-netinst.iso',
+        'nfs:vztmpl/rocky-9-default_20240101_amd64.tar.xz',
+        '9000', '9001',
+    }
+    assert len(result['candidates']) == len(by_volid) and result['errors'] == []
+    assert result['skipped'] == 1
+    assert by_volid['nfs:vztmpl/rocky-9-default_20240101_amd64.tar.xz'] == {
+        'volid': 'nfs:vztmpl/rocky-9-default_20240101_amd64.tar.xz', 'name': 'rocky-9-default_20240101_amd64',
+        'type': 'lxc', 'detected_size_gb': 1, 'origin': 'file', 'node': 'pve1', 'storage': 'nfs'}
+    assert by_volid['9000']['node'] == 'pve1' and by_volid['9000']['type'] == 'lxc'
+
+    # 'local', 'isos' e 'nfs' do pve1; local-lvm fica de fora e o pve2 não é listado
+    assert pve.stats['GET /nodes/{node}/storage/{storage}/content'] == 3
+    assert pve.stats['GET /cluster/resources'] == 1
+
+
+def test_listings_run_concurrently(pve_service, pve):
+    pve.path_latency[r'/storage/[^/]+/content$'] = 0.5
+    start = time.monotonic()
+    result = TemplateScanner(pve_service, max_workers=8).scan()
+    # 3 listagens de 0,5 s: em série levariam 1,5 s
+    assert time.monotonic() - start < 1.0
+    assert len(result['candidates']) == 7
+
+
+def test_failed_listing_is_reported_and_skipped(pve_service, pve):
+    pve.fail(r'/nodes/pve1/storage/nfs/content$')
+    result = TemplateScanner(pve_service).scan()
+    assert 'nfs:vztmpl/rocky-9-default_20240101_amd64.tar.xz' not in {c['volid'] for c in result['candidates']}
+    assert len(result['errors']) == 1 and 'pve1/nfs' in result['errors'][0]
+
+
+def test_scan_route_serves_index_and_hides_imported(app, client, pve_service, pve, monkeypatch):
+    monkeypatch.setattr('app.api.admin.routes.proxmox_client', pve_service)
+    app.config['TEMPLATE_SCAN_INTERVAL'] = 3600
+    admin = User(username='admin', email='admin@test.local', password_hash='!', is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    headers = {'Authorization': f"Bearer {create_access_token(identity=str(admin.id), additional_claims=identity_claims(admin))}"}
+
+    try:
+        # Primeira varredura em background: a requisição não espera o cluster
+        pve.path_latency[r'/storage/[^/]+/content$'] = 0.3
+        pending = client.get('/api/admin/templates/scan', headers=headers)
+        assert pending.status_code == 202 and pending.get_json() == []
+        assert pending.headers['X-Scan-Pending'] == '1'
+        assert app.extensions['template_index'].ready.wait(5)
+
+        first = client.get('/api/admin/templates/scan', headers=headers)
+        assert first.status_code == 200 and len(first.get_json()) == 7
+        assert first.headers['X-Scan-Skipped'] == '1'
+        listings = pve.total_calls
+
+        # Template importado some na hora, sem nova varredura
+        db.session.add(ServiceTemplate(name='Debian', type='lxc', proxmox_template_volid='9000', deploy_mode='clone'))
+        db.session.commit()
+        cached = client.get('/api/admin/templates/scan', headers=headers)
+        assert '9000' not in {c['volid'] for c in cached.get_json()} and len(cached.get_json()) == 6
+        assert pve.total_calls == listings
+
+        client.get('/api/admin/templates/scan?fresh=1', headers=headers)
+        assert pve.total_calls > listings
+    finally:
+        app.extensions['template_index'].stop()
+
+
+def test_failed_first_scan_is_an_error_not_pending(app, client, pve_service, pve, monkeypatch):
+    monkeypatch.setattr('app.api.admin.routes.proxmox_client', pve_service)
+    app.config['TEMPLATE_SCAN_INTERVAL'] = 3600
+    admin = User(username='admin', email='admin@test.local', password_hash='!', is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    headers = {'Authorization': f"Bearer {create_access_token(identity=str(admin.id), additional_claims=identity_claims(admin))}"}
+
+    pve.fail(r'/nodes$')  # Nem o nó de deploy é resolvido
+    try:
+        assert client.get('/api/admin/templates/scan', headers=headers).status_code == 202
+        assert app.extensions['template_index'].ready.wait(5)
+
+        failed = client.get('/api/admin/templates/scan', headers=headers)
+        assert failed.status_code == 500 and 'varredura' in failed.get_json()['error']
+    finally:
+        app.extensions['template_index'].stop()
@@ -0,0 +1,127 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from proxmoxer import ProxmoxAPI
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db, proxmox_client
+from app.tracing import OTLPExporter, Span, span, traced
+from benchmarks.otlp_standin import OTLPStandIn
+
+TRACE_ID = '0af7651916cd43dd8448eb211c80319c'
+SAMPLED = {'traceparent': f'00-{TRACE_ID}-b7ad6b7169203331-01'}
+
+
+@pytest.fixture
+def traced_app(tmp_path):
+    class TracingConfig(TestingConfig):
+        TRACING_ENABLED = True
+        TRACING_SAMPLE_RATE = 0.0  # Só o que vier com traceparent amostrado
+        TRACING_FILE = str(tmp_path / 'traces.jsonl')
+
+    app = create_app(TracingConfig)
+    app.config.update(PROXMOX_HOST='mock.pve', PROXMOX_USER='test@pam')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    app.extensions['tracing'].exporter.close()
+
+
+def _exported(app):
+    with open(app.config['TRACING_FILE']) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_sampled_request_exports_span_tree(traced_app, monkeypatch, mock_pve_connection):
+    monkeypatch.setattr(proxmox_client, '_connection', mock_pve_connection)
+    mock_pve_connection.nodes.get.return_value = []
+    mock_pve_connection.version.get.return_value = {'version': '8.2'}
+
+    response = traced_app.test_client().get('/api/health', headers=SAMPLED)
+
+    assert response.headers['X-Trace-Id'] == TRACE_ID
+    spans = _exported(traced_app)
+    root = spans[0]
+    assert root['name'] == 'GET /api/health' and root['parent_id'] == 'b7ad6b7169203331'
+    assert root['attributes']['http.status_code'] == 200
+    # O SELECT 1 roda numa thread do health check e continua no mesmo trace
+    sql = [s for s in spans if s['kind'] == 'sql']
+    assert sql and sql[0]['name'] == 'sql SELECT' and sql[0]['parent_id'] == root['span_id']
+    assert all(s['trace_id'] == TRACE_ID for s in spans)
+
+
+def test_unsampled_request_only_gets_trace_id(traced_app):
+    response = traced_app.test_client().get('/')
+
+    assert len(response.headers['X-Trace-Id']) == 32
+    assert response.headers['traceparent'].endswith('-00')
+    assert _exported(traced_app) == []
+
+
+def test_proxmoxer_calls_and_service_spans_are_nested(traced_app):
+    api = ProxmoxAPI('mock.pve', user='test@pam', token_name='t', token_value='v', verify_ssl=False)
+    api._store['session'].request = MagicMock(return_value=MagicMock(
+        status_code=200, content=b'{"data": [{"node": "pve1"}]}', text='{"data": [{"node": "pve1"}]}'
+    ))
+
+    @traced()
+    def deploy():
+        return api.nodes.get()
+
+    with traced_app.test_request_context('/deploy', headers=SAMPLED):
+        traced_app.preprocess_request()
+        with span('outer'):
+            assert deploy() == [{'node': 'pve1'}]
+        traced_app.do_teardown_request()
+
+    spans = {s['name']: s for s in _exported(traced_app)}
+    pve = spans['PVE GET /nodes']
+    assert pve['kind'] == 'pve' and pve['attributes']['pve.path'] == '/nodes'
+    assert pve['parent_id'] == spans['test_proxmoxer_calls_and_service_spans_are_nested.<locals>.deploy']['span_id']
+    assert spans['outer']['parent_id'] == spans['GET /deploy']['span_id']
+
+
+def test_tracing_and_deploy_timing_share_one_proxmoxer_hook(traced_app):
+    from proxmoxer.core import ProxmoxResource
+    from app.deploy_timing import StepTimer
+
+    # Tracing e cronômetro inscritos no mesmo patch, qualquer que seja a ordem de init
+    assert not hasattr(ProxmoxResource._request.__wrapped__, '__wrapped__')
+
+    api = ProxmoxAPI('mock.pve', user='test@pam', token_name='t', token_value='v', verify_ssl=False)
+    api._store['session'].request = MagicMock(return_value=MagicMock(
+        status_code=200, content=b'{"data": [{"node": "pve1"}]}', text='{"data": [{"node": "pve1"}]}'
+    ))
+
+    timer = StepTimer()
+    with traced_app.test_request_context('/deploy', headers=SAMPLED):
+        traced_app.preprocess_request()
+        with timer.step('create'):
+            api.nodes.get()
+        traced_app.do_teardown_request()
+
+    spans = {s['name']: s for s in _exported(traced_app)}
+    assert spans['PVE GET /nodes']['parent_id'] == spans['deploy.create']['span_id']
+    assert timer.steps[0]['pve_calls'] == 1
+
+
+def test_otlp_exporter_posts_batches_to_collector():
+    with OTLPStandIn() as collector:
+        exporter = OTLPExporter(collector.endpoint, interval=60)
+        root = Span(TRACE_ID, 'GET /x', 'request')
+        child = Span(TRACE_ID, 'sql SELECT', 'sql', root.span_id, {'db.statement': 'SELECT 1'})
+        child.error = 'OperationalError: boom'
+        for item in (child, root):
+            item.finish()
+        exporter.export([root, child])
+        exporter.close()
+
+        spans = collector.traces()[TRACE_ID]
+    by_name = {s['name']: s for s in spans}
+    assert by_name['GET /x']['kind'] == 2 and 'parentSpanId' not in by_name['GET /x']
+    assert by_name['sql SELECT']['parentSpanId'] == root.span_id
+    assert by_name['sql SELECT']['status'] == {'code': 2, 'message': 'OperationalError: boom'}
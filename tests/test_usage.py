@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.models import User, VirtualResource, UsageRollup
+from app.services.usage import UsageCollector, get_cluster_usage
+from app.services.usage.aggregation import HOUR, downsample, points_to_columns
+
+
+def _hour_start(hours_ago=0):
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return int((now - timedelta(hours=hours_ago)).timestamp())
+
+
+def _points(start, count, cpu=0.5, mem=1024.0):
+    return [{'time': start + 60 * i, 'cpu': cpu, 'mem': mem, 'maxmem': 4096.0,
+             'disk': 0.0, 'maxdisk': 8.0, 'netin': 10.0, 'netout': 5.0}
+            for i in range(count)]
+
+
+def test_downsample_groups_targets_and_ignores_gaps():
+    start = _hour_start(3)
+    points = _points(start, 60, cpu=0.2) + [{'time': start + 3600}]  # ponto vazio (guest desligado)
+    points += [{'time': start + 3660, 'cpu': 0.8, 'mem': 10.0}]
+    times, columns = points_to_columns(points)
+    codes = np.zeros(len(times), dtype=np.int64)
+    codes[-1] = 1
+
+    group_codes, buckets, samples, result = downsample(codes, times, columns, HOUR)
+
+    assert list(group_codes) == [0, 0, 1]
+    assert list(samples) == [60, 0, 1]
+    assert result['cpu_avg'][0] == pytest.approx(0.2)
+    assert np.isnan(result['cpu_avg'][1])
+    assert result['cpu_max'][2] == 0.8
+
+
+def test_downsample_weights_average_by_samples():
+    times = np.array([0, 3600])
+    columns = {m: np.array([np.nan, np.nan]) for m in ('disk', 'netin', 'netout', 'maxmem', 'maxdisk', 'mem')}
+    columns['cpu'] = np.array([0.1, 0.7])
+    _, _, samples, result = downsample([0, 0], times, columns, 86400, weights=[30, 10])
+    assert samples[0] == 40
+    assert abs(result['cpu_avg'][0] - 0.25) < 1e-9
+
+
+def _mock_cluster(conn, guest_points, node_points):
+    conn.nodes.get.return_value = [{'node': 'pve-node', 'status': 'online'}]
+    conn.cluster.resources.get.return_value = [
+        {'vmid': 101, 'node': 'pve-node', 'type': 'lxc'},
+        {'vmid': 9000, 'node': 'pve-node', 'type': 'qemu', 'template': 1},
+    ]
+    conn.nodes.return_value.lxc.return_value.rrddata.get.return_value = guest_points
+    conn.nodes.return_value.rrddata.get.return_value = node_points
+
+
+def test_collect_writes_hourly_rollups_in_batches(service, mock_pve_connection):
+    start = _hour_start(1)
+    node_points = [{'time': start + 60 * i, 'cpu': 0.1, 'memused': 2.0, 'memtotal': 8.0} for i in range(60)]
+    _mock_cluster(mock_pve_connection, _points(start, 60), node_points)
+
+    stats = UsageCollector(service, batch_size=1, workers=2).collect()
+
+    assert stats == {'targets': 2, 'rows': 2}
+    guest = UsageRollup.query.filter_by(scope='guest', target='101').one()
+    node = UsageRollup.query.filter_by(scope='node', target='pve-node').one()
+    assert guest.samples == 60 and guest.cpu_avg == 0.5 and guest.maxmem == 4096.0
+    assert node.mem_avg == 2.0 and node.maxmem == 8.0
+
+    cluster = get_cluster_usage('hour', days=1)
+    assert list(cluster['nodes']) == ['pve-node']
+    assert cluster['cluster'][0]['maxmem'] == 8.0
+
+
+def test_partial_hour_does_not_overwrite_complete_one(service, mock_pve_connection):
+    start = _hour_start(2)
+    _mock_cluster(mock_pve_connection, _points(start, 60, cpu=0.5), [])
+    collector = UsageCollector(service)
+    collector.collect()
+
+    # Próxima coleta: a janela só pega o fim da mesma hora
+    _mock_cluster(mock_pve_connection, _points(start + 50 * 60, 10, cpu=0.9), [])
+    collector.collect()
+
+    row = UsageRollup.query.filter_by(scope='guest', target='101').one()
+    assert row.samples == 60 and row.cpu_avg == 0.5
+
+
+def test_daily_rollup_prune_and_usage_endpoint(client, service, mock_pve_connection):
+    owner = User(username='aluno', email='aluno@nubemox.local')
+    owner.set_password('x')
+    db.session.add(owner)
+    db.session.commit()
+    db.session.add(VirtualResource(proxmox_vmid=101, name='ct', type='lxc', owner_id=owner.id,
+                                   cpu_cores=1, memory_mb=512, storage_gb=8))
+    old = datetime.utcnow() - timedelta(days=30)
+    db.session.add(UsageRollup(scope='guest', target='101', resolution='hour', bucket=old, samples=60))
+    db.session.commit()
+
+    start = _hour_start(0)
+    _mock_cluster(mock_pve_connection, _points(start, 5, cpu=0.4), [])
+    collector = UsageCollector(service)
+    collector.collect()
+    assert collector.rollup_daily() == 1
+    assert collector.prune() == 1
+
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(owner.id))}'}
+    data = client.get('/api/provisioning/resources/101/usage?resolution=day', headers=headers).get_json()
+    assert len(data['points']) == 1
+    assert data['points'][0]['samples'] == 5
+    assert abs(data['summary']['cpu']['max'] - 0.4) < 1e-9
+
+    assert client.get('/api/provisioning/resources/101/usage?resolution=week', headers=headers).status_code == 400